@@ -2,4 +2,26 @@ from .utils import *
 from .digital_io import *
 from .analog_io import *
 from .requestor import *
+from .profiles import *
 from .adam import *
+from .async_requestor import *
+from .async_adam import *
+from .fleet import *
+from .shadow import *
+from .snapshot import *
+from .memo import *
+from .metrics import *
+from .resilience import *
+from .scheduler import *
+from .singleflight import *
+from .modbus import *
+from .parser import *
+from .subscription import *
+from .stream import *
+from .history import *
+from .samplelog import *
+from .sharedstate import *
+from .scaling import *
+from .coalesce import *
+from .pulse import *
+from .waveform import *
@@ -2,125 +2,241 @@
 ADAM 6050-D
 ===========
 Main ADAM module to make the requests for input and output operations
-"""
 
-from xml.etree import ElementTree
+The ADAM classes are put together from the channels of their DeviceProfile (see profiles.py),
+Adam6050D and Adam6024D are written out, any other registered model gets its class from
+device_class("6052").
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 
 from .digital_io import DigitalInput, DigitalOutput
 from .analog_io import AnalogInput, AnalogInputRange, AnalogOutput, AnalogOutputRange
+from .memo import ResponseCache
+from .metrics import TimingHook
+from .modbus import ModbusRequestor
+from .parser import check_update
+from .profiles import DeviceProfile, get_profile
 from .requestor import Requestor
+from .resilience import DEFAULT_TIMEOUT, CircuitBreaker, RetryPolicy
+from .scheduler import RequestScheduler, request_priority
+from .scaling import AI_FULL_SCALE, AO_FULL_SCALE, RangeTable
+from .shadow import ShadowRegister
+from .singleflight import SingleFlight
+from .snapshot import read_snapshot
 from .utils import valid_ipv4
-from typing import Optional
+from typing import Optional, Sequence
 
 
-class Adam6050D:
+def _parsed(response_class, response):
     """
-    Only the ADAM6050D module is supported.
+    :return: response as a response_class, ModbusRequestor already hands back parsed objects
+    """
+    return response if isinstance(response, response_class) else response_class(xml_string=response)
+
+
+def _write_output(request, output_class, output, shadow: Optional[ShadowRegister] = None):
+    """
+    Read-modify-write of the output state, the values that are None in output are left as they are.
+    With a valid shadow register the read is skipped, and writes that change nothing are not sent.
+    The read goes at the priority of the write when ADAM has a RequestScheduler.
+
+    :param request: requestor method, called without data it reads, with data it posts
+    :param output_class: DigitalOutput or AnalogOutput, parses the responses
+    :param output: the values to set
+    :param shadow: the shadow register of this output, None always reads first
+    :return: True for success, raises an exception if unsuccessful
     """
+    with request_priority(RequestScheduler.ACTUATION):
+        if shadow is None and getattr(request.__self__, "PARTIAL_WRITES", False):
+            # only the channels that are set are written, nothing to merge with
+            check_update(request(output.as_dict()))
+            return True
 
-    DO_COUNT = 6
-    DI_COUNT = 12
+        if shadow is None:
+            current = _parsed(output_class, request()).as_dict()
+            current.update(output.as_dict())
+            check_update(request(current))
+            return True
 
-    def __init__(self, ip: str, username: str, password: str):
+        with shadow.lock:
+            if shadow.valid():
+                current = shadow.values
+            else:
+                current = _parsed(output_class, request()).as_dict()
+                shadow.refresh(current)
+            merged = dict(current)
+            merged.update(output.as_dict())
+            if merged == current:
+                return True
+            try:
+                response = request(merged)
+                parsed = check_update(response)
+            except Exception:
+                shadow.invalidate()
+                raise
+            # ADAM may echo the new state, otherwise trust what was posted
+            if parsed.records:
+                shadow.refresh(_parsed(output_class, response).as_dict())
+            else:
+                shadow.refresh(merged)
+        return True
+
+
+class AdamDevice:
+    """
+    Connection to an ADAM, the channel counts come from the PROFILE of the subclass
+    """
+
+    PROFILE = None  # type: Optional[DeviceProfile]
+    DI_COUNT = 0
+    DO_COUNT = 0
+    AI_COUNT = 0
+    AO_COUNT = 0
+    _SNAPSHOT_READS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        profile = cls.__dict__.get("PROFILE")
+        if profile is None:
+            return
+        cls.DI_COUNT = profile.di
+        cls.DO_COUNT = profile.do
+        cls.AI_COUNT = profile.ai
+        cls.AO_COUNT = profile.ao
+        # on() and off() always set every output, their state and POST body are built once per model
+        cls._ALL_DO = {value: {f"DO{index}": value for index in range(profile.do)} for value in (0, 1)}
+        cls._ALL_DO_BODY = {value: urlencode(state).encode('utf-8') for value, state in cls._ALL_DO.items()}
+        # read method of every channel type of the model, in the order snapshot() reads them
+        cls._SNAPSHOT_READS = tuple((kind, method) for kind, method, count in
+                                    (("di", "d_input", profile.di), ("do", "d_output", profile.do),
+                                     ("ai", "a_input", profile.ai), ("ao", "a_output", profile.ao)) if count)
+
+    def __init__(self, ip: str, username: str, password: str, port: int = 80, pool_size: int = 2,
+                 shadow: bool = False, shadow_max_age: Optional[float] = None,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 modbus: bool = False, modbus_port: int = 502, scheduler: Optional[RequestScheduler] = None,
+                 single_flight: bool = False, single_flight_max_age: Optional[float] = None, memoize: bool = False):
         """
         Username and password should already be setup from APEX(?)
         :param ip: ip address of ADAM, should be of the form 0.0.0.0
         :param username: username for ADAM
         :param password: password for ADAM
+        :param port: port of the ADAM web server
+        :param pool_size: number of persistent connections kept open to ADAM, the web server only takes a few;
+            snapshot() makes up to pool_size of its reads at once, one per channel type needs a pool_size of 4
+            on a model with DI, DO, AI and AO
+        :param shadow: keep the last known output state so that writes are a single POST,
+            only use it if nothing else changes the outputs of this ADAM
+        :param shadow_max_age: seconds the shadowed output state is trusted, None trusts it until a write fails
+        :param timeout: seconds a call to ADAM may take, retries included, None blocks forever;
+            request_timeout overrides it for the calls of a thread, see resilience.py
+        :param retry: RetryPolicy of the reads that fail on a connection error or a timeout, None does not retry
+        :param breaker: CircuitBreaker of this ADAM, fails calls fast while it is unreachable
+        :param modbus: talk Modbus/TCP instead of going through the web server, analog ranges are not available
+        :param modbus_port: Modbus/TCP port of ADAM
+        :param scheduler: RequestScheduler shared by every ADAM object of this device, writes then go before
+            reads and background polls, None sends every request right away; web server only
+        :param single_flight: threads reading the same endpoint at the same time share one request; web server only
+        :param single_flight_max_age: seconds a read is handed out again without a request, None only shares
+            the requests in flight
+        :param memoize: input reads that get the same response as an earlier one return its parsed object again,
+            read-only, see memo.py; the unchanged dictionary then tells if the latest read of an endpoint and
+            channel changed
         """
         if not valid_ipv4(ip):
             raise Exception("not a valid ip address ", ip)
-        self.requestor = Requestor(ip, username, password)
+        if modbus:
+            self.requestor = ModbusRequestor(ip, port=modbus_port, model=self.PROFILE.model, timeout=timeout)
+        else:
+            self.requestor = Requestor(ip, username, password, port=port, pool_size=pool_size, timeout=timeout,
+                                       retry=retry, breaker=breaker, scheduler=scheduler,
+                                       single_flight=SingleFlight(single_flight_max_age) if single_flight else None)
+        self.do_shadow = ShadowRegister(shadow_max_age) if shadow and self.DO_COUNT else None
+        self.ao_shadow = ShadowRegister(shadow_max_age) if shadow and self.AO_COUNT else None
+        # range metadata changes only when it is configured, it is read once and cached
+        self._ai_ranges = None
+        self._ao_ranges = None
+        self._executor = None
+        self.responses = ResponseCache() if memoize else None
+        # (endpoint, channel) to True if its latest read got the same response as the read before, with memoize only
+        self.unchanged = {}
 
         # make an initial request
         # input_response = self.input()
         # print("Initialized " + input_response.name)
 
-    def output(self, digital_output: Optional[DigitalOutput] = None):
+    def close(self):
         """
-        This prepares the data and sends it over to ADAM.
-
-        :param digital_output: DigitalOutput, if the digital_output is None, read the values, not set them.
-        :return: True for success, raises an exception if unsuccessful
+        closes the persistent connections to ADAM
         """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.requestor.close()
 
-        # set the value(s) of the current state to that of input's
-        if digital_output:
-            current_state = self.requestor.d_output()
-            current_do = DigitalOutput(xml_string=current_state)
-            for key, val in digital_output:
-                key = int(key.replace("DO", ""))
-                if val is not None:
-                    current_do[key] = digital_output[key]
-            response = self.requestor.d_output(current_do.as_dict())
-            root = ElementTree.fromstring(response)
-            status = root.attrib['status']
-            if status != "OK":
-                raise Exception("Couldn't update output: ", status)
-            return True
-        else:
-            response = self.requestor.d_output(digital_output)
-            return DigitalOutput(xml_string=response)
-
-    def input(self, digital_input_id: Optional[int] = None):
-
+    def snapshot(self):
         """
-        Read the values of the digital inputs
+        Read every channel of ADAM at once, each channel type on its own pooled connection while the pool has
+        one free; with the default pool_size of 2 the reads go two at a time
 
-        :param digital_input_id: DIx if the digital_input_id is None, read the all values
-        :return: ADAM response
+        :return: StateSnapshot with the values of every channel, when they were read and the skew between the reads
         """
-        response = self.requestor.input(digital_input_id)
-        return DigitalInput(response)
-
-    def on(self):
+        reads = {kind: getattr(self, method) for kind, method in self._SNAPSHOT_READS}
+        workers = min(len(reads), self.requestor.pool.max_size) - 1 if isinstance(self.requestor, Requestor) else 0
+        # Modbus shares one socket, its reads go one after the other anyway; the calling thread makes one read,
+        # the workers at most one per other connection of the pool
+        if workers > 0 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="adam-snapshot")
+        return read_snapshot(reads, self._executor)
+
+    def instrument(self, hook: TimingHook):
         """
-        All digital outputs to HIGH
+        :param hook: TimingHook told about every request to this ADAM, e.g. a MetricsCollector
         """
-        do = DigitalOutput(array=[1] * Adam6050D.DO_COUNT)
-        # this is also acceptable
-        # do.array([1, 1, 1, 1, 1, 1])
-        # as well as this
-        # do[0] = 1
-        # do[1] = 1
-        # do[2] = 1
-        # do[3] = 1
-        # do[4] = 1
-        # do[5] = 1
-        return self.output(do)
+        self.requestor.instrument(hook)
 
-    def off(self):
+    def _parsed_input(self, response_class, endpoint: str, channel: Optional[int], response):
         """
-        All digital outputs to LOW
+        :return: the parsed response, from the response cache when memoize is on
         """
-        do = DigitalOutput(array=[0] * Adam6050D.DO_COUNT)
-        return self.output(do)
+        if self.responses is None or not isinstance(response, bytes):
+            return _parsed(response_class, response)
+        key = (endpoint, channel)
+        result, unchanged = self.responses.parse(key, response_class, response)
+        self.unchanged[key] = unchanged
+        return result
+
+    def invalidate_ranges(self):
+        """
+        forget the cached ranges, call it when the ranges are changed from elsewhere, e.g. APEX
+        """
+        self._ai_ranges = None
+        self._ao_ranges = None
+
 
-class Adam6024D:
+class DigitalInputs:
     """
-    Only the ADAM6240D module is supported.
+    Digital input methods of the models that have them
     """
 
-    DO_COUNT = 2
-    DI_COUNT = 2
-    AO_COUNT = 2
-    AI_COUNT = 6
-
+    def d_input(self, digital_input_id: Optional[int] = None):
 
-    def __init__(self, ip: str, username: str, password: str):
         """
-        Username and password should already be setup from APEX(?)
-        :param ip: ip address of ADAM, should be of the form 0.0.0.0
-        :param username: username for ADAM
-        :param password: password for ADAM
+        Read the values of the digital inputs
+
+        :param digital_input_id: DIx if the digital_input_id is None, read the all values
+        :return: ADAM response
         """
-        if not valid_ipv4(ip):
-            raise Exception("not a valid ip address ", ip)
-        self.requestor = Requestor(ip, username, password)
+        response = self.requestor._d_input(digital_input_id)
+        return self._parsed_input(DigitalInput, "d_input", digital_input_id, response)
 
-        # make an initial request
-        # input_response = self.input()
-        # print("Initialized " + input_response.name)
+
+class DigitalOutputs:
+    """
+    Digital output methods of the models that have them
+    """
 
     def d_output(self, digital_output: Optional[DigitalOutput] = None):
         """
@@ -132,51 +248,53 @@ class Adam6024D:
 
         # set the value(s) of the current state to that of input's
         if digital_output:
-            current_state = self.requestor.d_output()
-            current_do = DigitalOutput(xml_string=current_state)
-            for key, val in digital_output:
-                key = int(key.replace("DO", ""))
-                if val is not None:
-                    current_do[key] = digital_output[key]
-            response = self.requestor.d_output(current_do.as_dict())
-            root = ElementTree.fromstring(response)
-            status = root.attrib['status']
-            if status != "OK":
-                raise Exception("Couldn't update output: ", status)
-            return True
+            return _write_output(self.requestor._d_output, DigitalOutput, digital_output, self.do_shadow)
         else:
-            response = self.requestor.d_output(digital_output)
-            return DigitalOutput(xml_string=response)
-
-    def d_input(self, digital_input_id: Optional[int] = None):
+            response = self.requestor._d_output(digital_output)
+            current_do = _parsed(DigitalOutput, response)
+            if self.do_shadow is not None:
+                self.do_shadow.refresh(current_do.as_dict())
+            return current_do
 
+    def _write_all(self, value: int):
         """
-        Read the values of the digital inputs
-
-        :param digital_input_id: DIx if the digital_input_id is None, read the all values
-        :return: ADAM response
+        Set every digital output to value, no read is needed as nothing is left as it was
         """
-        response = self.requestor.d_input(digital_input_id)
-        return DigitalInput(response)
+        state = self._ALL_DO[value]
+        # the web server gets the prebuilt body, Modbus the channels
+        data = self._ALL_DO_BODY[value] if isinstance(self.requestor, Requestor) else state
+        shadow = self.do_shadow
+        if shadow is None:
+            check_update(self.requestor._d_output(data))
+            return True
+        with shadow.lock:
+            if shadow.valid() and shadow.values == state:
+                return True
+            try:
+                check_update(self.requestor._d_output(data))
+            except Exception:
+                shadow.invalidate()
+                raise
+            shadow.refresh(dict(state))
+        return True
 
     def on(self):
         """
         All digital outputs to HIGH
         """
-        do = DigitalOutput(array=[1] * Adam6024D.DO_COUNT)
-        # this is also acceptable
-        # do.array([1, 1, 1, 1, 1, 1])
-        # as well as this
-        # do[0] = 1
-        # do[1] = 1
-        return self.d_output(do)
+        return self._write_all(1)
 
     def off(self):
         """
         All digital outputs to LOW
         """
-        do = DigitalOutput(array=[0] * Adam6024D.DO_COUNT)
-        return self.d_output(do)
+        return self._write_all(0)
+
+
+class AnalogOutputs:
+    """
+    Analog output methods of the models that have them
+    """
 
     def a_output(self, analog_output: Optional[AnalogOutput] = None):
         """
@@ -188,21 +306,13 @@ class Adam6024D:
 
         # set the value(s) of the current state to that of input's
         if analog_output:
-            current_state = self.requestor.a_output()
-            current_ao = AnalogOutput(xml_string=current_state)
-            for key, val in analog_output:
-                key = int(key.replace("AO", ""))
-                if val is not None:
-                    current_ao[key] = analog_output[key]
-            response = self.requestor.a_output(current_ao.as_dict())
-            root = ElementTree.fromstring(response)
-            status = root.attrib['status']
-            if status != "OK":
-                raise Exception("Couldn't update output: ", status)
-            return True
+            return _write_output(self.requestor._a_output, AnalogOutput, analog_output, self.ao_shadow)
         else:
-            response = self.requestor.a_output(analog_output)
-            return AnalogOutput(xml_string=response)
+            response = self.requestor._a_output(analog_output)
+            current_ao = _parsed(AnalogOutput, response)
+            if self.ao_shadow is not None:
+                self.ao_shadow.refresh(current_ao.as_dict())
+            return current_ao
 
     def a_output_range(self, analog_output: Optional[AnalogOutput] = None):
         """
@@ -214,21 +324,53 @@ class Adam6024D:
 
         # set the value(s) of the current state to that of input's
         if analog_output:
-            current_state = self.requestor.a_output_range()
+            current_state = self.requestor._a_output_range()
             current_ao = AnalogOutputRange(xml_string=current_state)
             for key, val in analog_output:
                 key = int(key.replace("AO", ""))
                 if val is not None:
                     current_ao[key] = analog_output[key]
-            response = self.requestor.a_output_range(current_ao.as_dict())
-            root = ElementTree.fromstring(response)
-            status = root.attrib['status']
-            if status != "OK":
-                raise Exception("Couldn't update output: ", status)
+            try:
+                response = self.requestor._a_output_range(current_ao.as_dict())
+                check_update(response)
+            finally:
+                self._ao_ranges = None
             return True
         else:
-            response = self.requestor.a_output_range(analog_output)
-            return AnalogOutput(xml_string=response)
+            response = self.requestor._a_output_range(analog_output)
+            self._ao_ranges = RangeTable.from_response(response, AO_FULL_SCALE)
+            return AnalogOutputRange(xml_string=response)
+
+    def ao_ranges(self, refresh: bool = False):
+        """
+        Range metadata of the analog outputs, read from ADAM the first time and cached
+
+        :param refresh: read the ranges from ADAM even if they are cached
+        :return: RangeTable
+        """
+        if refresh or self._ao_ranges is None:
+            self._ao_ranges = RangeTable.from_response(self.requestor._a_output_range(), AO_FULL_SCALE)
+        return self._ao_ranges
+
+    def a_output_scaled(self, values: Sequence[Optional[float]]):
+        """
+        Set the analog outputs in engineering units with the cached ranges
+
+        :param values: one value per analog output, None leaves the output as it is
+        :return: True for success, raises an exception if unsuccessful
+        """
+        raw = self.ao_ranges().to_raw(values)
+        ao = AnalogOutput(quantity=len(raw))
+        for channel, value in enumerate(raw):
+            if value is not None:
+                ao[channel] = value
+        return self.a_output(ao)
+
+
+class AnalogInputs:
+    """
+    Analog input methods of the models that have them
+    """
 
     def a_input(self, analog_input_id: Optional[int] = None):
 
@@ -238,8 +380,8 @@ class Adam6024D:
         :param analog_input_id: DIx if the analog_input_id is None, read the all values
         :return: ADAM response
         """
-        response = self.requestor.a_input(analog_input_id)
-        return AnalogInput(response)
+        response = self.requestor._a_input(analog_input_id)
+        return self._parsed_input(AnalogInput, "a_input", analog_input_id, response)
     
     def a_input_range(self, analog_input_id: Optional[int] = None):
 
@@ -249,5 +391,66 @@ class Adam6024D:
         :param analog_input_id: DIx if the analog_input_id is None, read the all values
         :return: ADAM response
         """
-        response = self.requestor.a_input_range(analog_input_id)
+        response = self.requestor._a_input_range(analog_input_id)
+        if not analog_input_id:
+            self._ai_ranges = RangeTable.from_response(response, AI_FULL_SCALE)
         return AnalogInputRange(response)
+
+    def ai_ranges(self, refresh: bool = False):
+        """
+        Range metadata of the analog inputs, read from ADAM the first time and cached
+
+        :param refresh: read the ranges from ADAM even if they are cached
+        :return: RangeTable
+        """
+        if refresh or self._ai_ranges is None:
+            self._ai_ranges = RangeTable.from_response(self.requestor._a_input_range(), AI_FULL_SCALE)
+        return self._ai_ranges
+
+    def a_input_scaled(self):
+        """
+        Read every analog input in engineering units (V, mA ...) with the cached ranges
+
+        :return: one value per analog input, a NumPy array if NumPy is installed otherwise a list
+        """
+        ranges = self.ai_ranges()
+        return ranges.to_engineering(self.a_input().values())
+
+
+class Adam6050D(DigitalInputs, DigitalOutputs, AdamDevice):
+    """
+    Only the ADAM6050D module is supported.
+    """
+
+    PROFILE = get_profile("6050")
+
+    # the 6050 calls its digital reads and writes input and output
+    output = DigitalOutputs.d_output
+    input = DigitalInputs.d_input
+
+
+class Adam6024D(DigitalInputs, DigitalOutputs, AnalogInputs, AnalogOutputs, AdamDevice):
+    """
+    Only the ADAM6240D module is supported.
+    """
+
+    PROFILE = get_profile("6024")
+
+
+_CLASSES = {"6050": Adam6050D, "6024": Adam6024D}
+
+
+def device_class(model: str):
+    """
+    :param model: a registered model, e.g. "6052" or "ADAM-6060"
+    :return: the ADAM class of the model, with the methods of the channels it has
+    """
+    profile = get_profile(model)
+    adam_class = _CLASSES.get(profile.model)
+    if adam_class is None or adam_class.PROFILE is not profile:
+        bases = tuple(mixin for mixin, count in ((DigitalInputs, profile.di), (DigitalOutputs, profile.do),
+                                                 (AnalogInputs, profile.ai), (AnalogOutputs, profile.ao)) if count)
+        adam_class = type(f"Adam{profile.model}", bases + (AdamDevice,),
+                          {"PROFILE": profile, "__doc__": f"{profile.name}, {profile.description}"})
+        _CLASSES[profile.model] = adam_class
+    return adam_class
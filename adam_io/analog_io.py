@@ -3,8 +3,25 @@ Analog Input/Output
 ============================
 Use this class to create the arguments to pass into the ADAM object
 """
-from xml.etree import ElementTree
-from typing import List, Optional
+from array import array
+from typing import List, Optional, Sequence, Union
+
+from .parser import parse_response, parse_values
+from .scaling import AO_FULL_SCALE
+
+# largest range code, they are sent as 4 digit HEX like the values
+RANGE_CODE_MAX = 0xFFFF
+
+
+def _hex(data: dict, maximum: int):
+    """
+    :return: data with the integer values as 4 digit HEX, raises before anything is encoded if one is out of
+        0~maximum, since f"{v:04X}" would send a negative or longer value to ADAM as is
+    """
+    for key, value in data.items():
+        if isinstance(value, int) and not 0 <= value <= maximum:
+            raise Exception(f"{key} out of range 0~{maximum:04X} ", value)
+    return {k: f"{v:04X}" if isinstance(v, int) else v for k, v in data.items() if v is not None}
 
 
 class AnalogOutput:
@@ -19,7 +36,8 @@ class AnalogOutput:
 
     """
 
-    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None, xml_string: Optional[str] = None):
+    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None,
+                 xml_string: Optional[Union[bytes, str]] = None):
         """
         :param quantity: number of analog outputs
         :param array: pass in an array with the same size as quantity to initialize the internal
@@ -28,25 +46,19 @@ class AnalogOutput:
         if xml_string:
             self._do = self.parse(xml_string)
         else:
-            self._do = {f"AO{index}": None for index in range(0, quantity + 1)}
+            self._do = {f"AO{index}": None for index in range(quantity)}
         if array:
             if len(array) != quantity:
                 raise Exception("quantity and initial array sizes are different for analog output")
             self.array(array)
 
-    def parse(self, xml_string: str):
+    def parse(self, xml_string: Union[bytes, str]):
         """
-        :param xml_string: response string from ADAM
+        :param xml_string: response from ADAM
         """
-        root = ElementTree.fromstring(xml_string)
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
-
-        # convert xml to dictionary
-        values = [int("0x"+di_element.text, 16) for di in root for di_element in di if di_element.tag == "VALUE"] # convert HEX value to int
-        keys = ["AO" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        return dict(zip(keys, values))
+        response = parse_response(xml_string)
+        # convert HEX value to int
+        return {"AO" + record["ID"]: int(record["VALUE"], 16) for record in response.records if "VALUE" in record}
 
     def __setitem__(self, do_id: int, value: int):
         # if type(value) is not int:
@@ -71,16 +83,16 @@ class AnalogOutput:
     def as_dict(self):
         """
         same as __call__
-        :return: the data ready to be sent over to ADAM
+        :return: the data ready to be sent over to ADAM, integer values 0~AO_FULL_SCALE are sent as 4 digit HEX
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        return _hex(self._do, AO_FULL_SCALE)
 
     def __call__(self):
         """
         same as as_dict
         :return: the data ready to be sent over to ADAM
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        return self.as_dict()
 
     def __getitem__(self, do_id):
         return self._do[f"AO{do_id}"]
@@ -106,7 +118,8 @@ class AnalogOutputRange:
 
     """
 
-    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None, xml_string: Optional[str] = None):
+    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None,
+                 xml_string: Optional[Union[bytes, str]] = None):
         """
         :param quantity: number of analog outputs
         :param array: pass in an array with the same size as quantity to initialize the internal
@@ -115,25 +128,19 @@ class AnalogOutputRange:
         if xml_string:
             self._do = self.parse(xml_string)
         else:
-            self._do = {f"AO{index}": None for index in range(0, quantity + 1)}
+            self._do = {f"AO{index}": None for index in range(quantity)}
         if array:
             if len(array) != quantity:
                 raise Exception("quantity and initial array sizes are different for analog output")
             self.array(array)
 
-    def parse(self, xml_string: str):
+    def parse(self, xml_string: Union[bytes, str]):
         """
-        :param xml_string: response string from ADAM
+        :param xml_string: response from ADAM
         """
-        root = ElementTree.fromstring(xml_string)
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
-
-        # convert xml to dictionary
-        ranges = [int("0x"+di_element.text, 16) for di in root for di_element in di if di_element.tag == "RANGE"] # convert HEX value to int
-        keys = ["AO" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        return dict(zip(keys, ranges))
+        response = parse_response(xml_string)
+        # convert HEX value to int
+        return {"AO" + record["ID"]: int(record["RANGE"], 16) for record in response.records if "RANGE" in record}
 
     def __setitem__(self, do_id: int, value: int):
         # if type(value) is not int:
@@ -158,16 +165,16 @@ class AnalogOutputRange:
     def as_dict(self):
         """
         same as __call__
-        :return: the data ready to be sent over to ADAM
+        :return: the data ready to be sent over to ADAM, integer range codes are sent as 4 digit HEX
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        return _hex(self._do, RANGE_CODE_MAX)
 
     def __call__(self):
         """
         same as as_dict
         :return: the data ready to be sent over to ADAM
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        return self.as_dict()
 
     def __getitem__(self, do_id):
         return self._do[f"AO{do_id}"]
@@ -195,37 +202,79 @@ class AnalogInput:
     ...  === ...
     d[11] === AI11
 
+    the raw values are kept in an array('H'), d.values(); a long running poller can reuse the object
+    with d.update(xml_str)
     """
 
-    def __init__(self, xml_string: str):
+    __slots__ = ("name", "_values", "_present")
+
+    def __init__(self, xml_string: Optional[Union[bytes, str]] = None):
+        """
+        :param xml_string: response from ADAM
+        """
+        self.name = None
+        self._values = array('H')
+        self._present = 0
+        if xml_string is not None:
+            self.update(xml_string)
+
+    @classmethod
+    def from_values(cls, values: Sequence[int], name: Optional[str] = None):
+        """
+        :param values: raw value of every analog input, AI0 first
+        :param name: name of the ADAM, e.g. ADAM-6024
+        :return: AnalogInput
+        """
+        ai = cls()
+        ai.name = name
+        ai._values = array('H', values)
+        ai._present = (1 << len(values)) - 1
+        return ai
+
+    def values(self):
+        """
+        :return: array('H') of the raw values indexed by channel, channels missing in the response are 0
         """
-        :param xml_string: response string from ADAM
+        return self._values
+
+    def update(self, xml_string: Union[bytes, str]):
         """
-        root = ElementTree.fromstring(xml_string)
-        self.name = root.tag
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
+        replace the values in place with the ones in the response
 
-        # convert xml to dictionary
-        values = [int("0x"+di_element.text, 16) for di in root for di_element in di if di_element.tag == "VALUE"] # convert HEX value to int
-        # values = [di_element.text for di in root for di_element in di if di_element.tag == "VALUE"]
-        keys = ["AI" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        self._di = dict(zip(keys, values))
+        :param xml_string: response from ADAM
+        """
+        name, pairs = parse_values(xml_string)
+        values = self._values
+        size = max(channel for channel, _ in pairs) + 1 if pairs else 0
+        if len(values) != size:
+            values = self._values = array('H', bytes(2 * size))
+        present = 0
+        for channel, value in pairs:
+            # convert HEX value to int
+            values[channel] = int(value, 16)
+            present |= 1 << channel
+        self.name = name
+        self._present = present
+        return self
 
     def __getitem__(self, di_id: int):
         # if type(di_id) != int:
         #     raise TypeError("analog input id should be integer")
-        return self._di[f"AI{di_id}"]
+        if di_id < 0 or not (self._present >> di_id) & 1:
+            raise KeyError(f"AI{di_id}")
+        return self._values[di_id]
 
     def __iter__(self):
-        yield from self._di.items()
+        values = self._values
+        for index in range(len(values)):
+            if (self._present >> index) & 1:
+                yield f"AI{index}", values[index]
 
     def __str__(self):
-        return '\n'.join([f"AI[{index}]={v}" for index, v in enumerate(self._di.values())])
+        return '\n'.join([f"AI[{index}]={v}" for index, (_, v) in enumerate(self)])
 
     def __repr__(self):
-        return '\n'.join([f"AI[{index}]={v}" for index, v in enumerate(self._di.values())])
+        return '\n'.join([f"AI[{index}]={v}" for index, (_, v) in enumerate(self)])
 
 class AnalogInputRange:
     """
@@ -233,22 +282,16 @@ class AnalogInputRange:
 
     """
 
-    def __init__(self, xml_string: str):
+    def __init__(self, xml_string: Union[bytes, str]):
         """
-        :param xml_string: response string from ADAM
+        :param xml_string: response from ADAM
         """
-        root = ElementTree.fromstring(xml_string)
-        self.name = root.tag
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
-
-        # convert xml to dictionary
-        ranges = [int("0x"+di_element.text, 16) for di in root for di_element in di if di_element.tag == "RANGE"] # convert HEX value to int
-        # values = [di_element.text for di in root for di_element in di if di_element.tag == "VALUE"]
-        keys = ["AI" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        units = [di_element.text for di in root for di_element in di if di_element.tag == "UNIT"]
-        self._di = dict(zip(keys, ranges, units))
+        response = parse_response(xml_string)
+        self.name = response.name
+        records = [record for record in response.records if "RANGE" in record]
+        # convert HEX value to int
+        self._di = {"AI" + record["ID"]: int(record["RANGE"], 16) for record in records}
+        self.units = {"AI" + record["ID"]: record.get("UNIT") for record in records}
 
     def __getitem__(self, di_id: int):
         # if type(di_id) != int:
@@ -0,0 +1,183 @@
+"""
+Async ADAM
+==========
+asyncio versions of the ADAM modules, same methods as Adam6050D and Adam6024D but awaitable
+"""
+
+from .digital_io import DigitalInput, DigitalOutput
+from .analog_io import AnalogInput, AnalogInputRange, AnalogOutput
+from .async_requestor import AsyncRequestor
+from .parser import check_update
+from .profiles import PROFILES
+from .resilience import DEFAULT_TIMEOUT
+from .utils import valid_ipv4
+from typing import Optional
+
+
+class AsyncAdam6050D:
+    """
+    asyncio version of Adam6050D
+    """
+
+    DO_COUNT = PROFILES["6050"].do
+    DI_COUNT = PROFILES["6050"].di
+
+    def __init__(self, ip: str, username: str, password: str, port: int = 80, pool_size: int = 2,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        :param ip: ip address of ADAM, should be of the form 0.0.0.0
+        :param username: username for ADAM
+        :param password: password for ADAM
+        :param port: port of the ADAM web server
+        :param pool_size: number of persistent connections kept open to ADAM
+        :param timeout: seconds connecting to ADAM and its response may take each, None waits forever
+        """
+        if not valid_ipv4(ip):
+            raise Exception("not a valid ip address ", ip)
+        self.requestor = AsyncRequestor(ip, username, password, port=port, pool_size=pool_size,
+                                       timeout=timeout)
+
+    async def output(self, digital_output: Optional[DigitalOutput] = None):
+        """
+        :param digital_output: DigitalOutput, if the digital_output is None, read the values, not set them.
+        :return: True for success, raises an exception if unsuccessful
+        """
+        if digital_output:
+            current_state = await self.requestor._d_output()
+            current_do = DigitalOutput(xml_string=current_state)
+            for key, val in digital_output:
+                key = int(key.replace("DO", ""))
+                if val is not None:
+                    current_do[key] = digital_output[key]
+            response = await self.requestor._d_output(current_do.as_dict())
+            check_update(response)
+            return True
+        else:
+            response = await self.requestor._d_output()
+            return DigitalOutput(xml_string=response)
+
+    async def input(self, digital_input_id: Optional[int] = None):
+        """
+        :param digital_input_id: DIx if the digital_input_id is None, read the all values
+        :return: ADAM response
+        """
+        response = await self.requestor._d_input(digital_input_id)
+        return DigitalInput(response)
+
+    async def on(self):
+        """
+        All digital outputs to HIGH
+        """
+        return await self.output(DigitalOutput(array=[1] * AsyncAdam6050D.DO_COUNT))
+
+    async def off(self):
+        """
+        All digital outputs to LOW
+        """
+        return await self.output(DigitalOutput(array=[0] * AsyncAdam6050D.DO_COUNT))
+
+    def close(self):
+        self.requestor.close()
+
+
+class AsyncAdam6024D:
+    """
+    asyncio version of Adam6024D
+    """
+
+    DO_COUNT = PROFILES["6024"].do
+    DI_COUNT = PROFILES["6024"].di
+    AO_COUNT = PROFILES["6024"].ao
+    AI_COUNT = PROFILES["6024"].ai
+
+    def __init__(self, ip: str, username: str, password: str, port: int = 80, pool_size: int = 2,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        :param ip: ip address of ADAM, should be of the form 0.0.0.0
+        :param username: username for ADAM
+        :param password: password for ADAM
+        :param port: port of the ADAM web server
+        :param pool_size: number of persistent connections kept open to ADAM
+        :param timeout: seconds connecting to ADAM and its response may take each, None waits forever
+        """
+        if not valid_ipv4(ip):
+            raise Exception("not a valid ip address ", ip)
+        self.requestor = AsyncRequestor(ip, username, password, port=port, pool_size=pool_size,
+                                       timeout=timeout)
+
+    async def d_output(self, digital_output: Optional[DigitalOutput] = None):
+        """
+        :param digital_output: DigitalOutput, if the digital_output is None, read the values, not set them.
+        :return: True for success, raises an exception if unsuccessful
+        """
+        if digital_output:
+            current_state = await self.requestor._d_output()
+            current_do = DigitalOutput(xml_string=current_state)
+            for key, val in digital_output:
+                key = int(key.replace("DO", ""))
+                if val is not None:
+                    current_do[key] = digital_output[key]
+            response = await self.requestor._d_output(current_do.as_dict())
+            check_update(response)
+            return True
+        else:
+            response = await self.requestor._d_output()
+            return DigitalOutput(xml_string=response)
+
+    async def d_input(self, digital_input_id: Optional[int] = None):
+        """
+        :param digital_input_id: DIx if the digital_input_id is None, read the all values
+        :return: ADAM response
+        """
+        response = await self.requestor._d_input(digital_input_id)
+        return DigitalInput(response)
+
+    async def on(self):
+        """
+        All digital outputs to HIGH
+        """
+        return await self.d_output(DigitalOutput(array=[1] * AsyncAdam6024D.DO_COUNT))
+
+    async def off(self):
+        """
+        All digital outputs to LOW
+        """
+        return await self.d_output(DigitalOutput(array=[0] * AsyncAdam6024D.DO_COUNT))
+
+    async def a_output(self, analog_output: Optional[AnalogOutput] = None):
+        """
+        :param analog_output: AnalogOutput, if the analog_output is None, read the values, not set them.
+        :return: True for success, raises an exception if unsuccessful
+        """
+        if analog_output:
+            current_state = await self.requestor._a_output()
+            current_ao = AnalogOutput(xml_string=current_state)
+            for key, val in analog_output:
+                key = int(key.replace("AO", ""))
+                if val is not None:
+                    current_ao[key] = analog_output[key]
+            response = await self.requestor._a_output(current_ao.as_dict())
+            check_update(response)
+            return True
+        else:
+            response = await self.requestor._a_output()
+            return AnalogOutput(xml_string=response)
+
+    async def a_input(self, analog_input_id: Optional[int] = None):
+        """
+        :param analog_input_id: AIx if the analog_input_id is None, read the all values
+        :return: ADAM response
+        """
+        response = await self.requestor._a_input(analog_input_id)
+        return AnalogInput(response)
+
+    async def a_input_range(self, analog_input_id: Optional[int] = None):
+        """
+        :param analog_input_id: AIx if the analog_input_id is None, read the all ranges
+        :return: ADAM response
+        """
+        response = await self.requestor._a_input_range(analog_input_id)
+        return AnalogInputRange(response)
+
+    def close(self):
+        self.requestor.close()
@@ -0,0 +1,257 @@
+"""
+Async Requestor
+===============
+Non-blocking counterpart of Requestor, speaks HTTP/1.1 over asyncio streams so many requests
+to many ADAMs can be in flight from a single event loop
+"""
+import asyncio
+import base64
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+from typing import Dict, Optional
+from .requestor import PoolStats
+from .resilience import DEFAULT_TIMEOUT
+from .utils import URI
+
+
+class AsyncConnectionPool:
+    """
+    Bounded pool of persistent HTTP/1.1 stream connections to a single ADAM
+    """
+
+    def __init__(self, host: str, port: int = 80, max_size: int = 2, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        :param host: ADAM ip
+        :param port: ADAM web server port
+        :param max_size: maximum number of simultaneously open connections
+        :param timeout: seconds opening a connection and getting the response may take each, None waits forever;
+            asyncio.TimeoutError is raised when it runs out
+        """
+        if max_size < 1:
+            raise Exception("connection pool size should be at least 1")
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stats = PoolStats()
+        self._idle = []
+        # created on first use so that it belongs to the running loop
+        self._slots = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None,
+                      headers: Optional[Dict[str, str]] = None):
+        """
+        Make a request on a pooled connection.
+        A reused connection the device has closed is replaced before the request is sent. If a GET still
+        fails on a reused connection, it is retried once on a new one; a POST is not, it may have reached ADAM.
+
+        :return: (status, reason, headers, body)
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_size)
+        head = self._head(method, path, body, headers)
+        async with self._slots:
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+                if reader.at_eof():
+                    # the device closed the idle connection, nothing was sent on it yet
+                    writer.close()
+                    self.stats.reconnects += 1
+                    reused = False
+            if not reused:
+                reader, writer = await self._connect()
+            try:
+                try:
+                    response = await asyncio.wait_for(self._send(reader, writer, head, body), self.timeout)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    if not reused or method != "GET":
+                        raise
+                    writer.close()
+                    self.stats.reconnects += 1
+                    reused = False
+                    reader, writer = await self._connect()
+                    response = await asyncio.wait_for(self._send(reader, writer, head, body), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+
+            if reused:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+            status, reason, response_headers, data, will_close = response
+            if will_close:
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return status, reason, response_headers, data
+
+    async def _connect(self):
+        # a module that is off or unreachable never answers the SYN, the wait is bounded like the response
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+
+    def _head(self, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}"]
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    @staticmethod
+    async def _send(reader, writer, head, body):
+        writer.write(head + body if body else head)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by ADAM")
+        version, status, reason = (status_line.decode('latin-1').rstrip("\r\n").split(" ", 2) + [""])[:3]
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode('latin-1').partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+
+        will_close = version == "HTTP/1.0" or response_headers.get("connection", "").lower() == "close"
+        if "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        else:
+            data = await reader.read()
+            will_close = True
+        return int(status), reason, response_headers, data, will_close
+
+    def close(self):
+        """
+        closes every idle connection
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+class AsyncRequestor:
+    def __init__(self, ip: str, username: str, password: str, port: int = 80, pool_size: int = 2,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        For now no unauthorized requests are possible
+
+        :param ip: ADAM ip
+        :param username: ADAM username
+        :param password: ADAM password
+        :param port: ADAM web server port
+        :param pool_size: maximum number of persistent connections kept open to ADAM
+        :param timeout: seconds connecting and the response may take each, None waits forever
+        """
+        auth_str = f"{username}:{password}"
+        encoded_auth_str = base64.b64encode(auth_str.encode('ascii')).decode('utf-8')
+        self.headers = {"Content-Type": "application/x-www-form-urlencoded",
+                        "Authorization": "Basic " + encoded_auth_str}
+        self.base_url = f"http://{ip}" if port == 80 else f"http://{ip}:{port}"
+        self.pool = AsyncConnectionPool(ip, port, max_size=pool_size, timeout=timeout)
+        self._get_headers = {"Authorization": self.headers["Authorization"]}
+
+    async def _get(self, path: str):
+        status, reason, headers, data = await self.pool.request("GET", path, headers=self._get_headers)
+        return self._check(path, status, reason, headers, data)
+
+    async def _post(self, path: str, data: Dict[str, int]):
+        params = urlencode(data).encode('utf-8')
+        status, reason, headers, data = await self.pool.request("POST", path, body=params, headers=self.headers)
+        return self._check(path, status, reason, headers, data)
+
+    def _check(self, path, status, reason, headers, data):
+        if status >= 300:
+            raise HTTPError(self.base_url + path, status, reason, headers, None)
+        return data
+
+    def close(self):
+        """
+        closes the idle persistent connections to ADAM
+        """
+        self.pool.close()
+
+    async def d_input(self, input_channel_id: Optional[int] = None):
+        """
+        :param input_channel_id: single input is requested, none returns all digital inputs
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._d_input(input_channel_id)).decode('utf8')
+
+    async def d_output(self, data: Optional[Dict[str, int]] = None):
+        """
+        :param data: DigitalOutput object converted to dictionary as {"DO1":1,...}
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._d_output(data)).decode('utf8')
+
+    async def a_input(self, input_channel_id: Optional[int] = None):
+        """
+        :param input_channel_id: single input is requested, none returns all analog inputs
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._a_input(input_channel_id)).decode('utf8')
+
+    async def a_input_range(self, input_channel_id: Optional[int] = None):
+        """
+        :param input_channel_id: single input is requested, none returns all analog inputs
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._a_input_range(input_channel_id)).decode('utf8')
+
+    async def a_output(self, data: Optional[Dict[str, int]] = None):
+        """
+        :param data: AnalogOutput object converted to dictionary as {"AO1":1,...}
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._a_output(data)).decode('utf8')
+
+    async def a_output_range(self, data: Optional[Dict[str, int]] = None):
+        """
+        :param data: AnalogOutput object converted to dictionary as {"AO1":1,...}
+        :return: ADAM response, xml response with status code/message
+        """
+        return (await self._a_output_range(data)).decode('utf8')
+
+    # the ADAM classes read the undecoded responses, the parsers work on the raw bytes
+
+    async def _d_input(self, input_channel_id: Optional[int] = None):
+        channel = "/" + str(input_channel_id) if input_channel_id else URI.ALL
+        return await self._get(URI.DIGITAL_INPUT + channel + URI.VALUE)
+
+    async def _d_output(self, data: Optional[Dict[str, int]] = None):
+        if data:
+            return await self._post(URI.DIGITAL_OUTPUT + URI.ALL + URI.VALUE, data)
+        return await self._get(URI.DIGITAL_OUTPUT + URI.ALL + URI.VALUE)
+
+    async def _a_input(self, input_channel_id: Optional[int] = None):
+        channel = "/" + str(input_channel_id) if input_channel_id else URI.ALL
+        return await self._get(URI.ANALOG_INPUT + channel + URI.VALUE)
+
+    async def _a_input_range(self, input_channel_id: Optional[int] = None):
+        channel = "/" + str(input_channel_id) if input_channel_id else URI.ALL
+        return await self._get(URI.ANALOG_INPUT + channel + URI.RANGE)
+
+    async def _a_output(self, data: Optional[Dict[str, int]] = None):
+        if data:
+            return await self._post(URI.ANALOG_OUTPUT + URI.ALL + URI.VALUE, data)
+        return await self._get(URI.ANALOG_OUTPUT + URI.ALL + URI.VALUE)
+
+    async def _a_output_range(self, data: Optional[Dict[str, int]] = None):
+        if data:
+            return await self._post(URI.ANALOG_OUTPUT + URI.ALL + URI.RANGE, data)
+        return await self._get(URI.ANALOG_OUTPUT + URI.ALL + URI.RANGE)
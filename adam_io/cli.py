@@ -0,0 +1,390 @@
+"""
+Command Line
+============
+adam-io poll 192.168.1.10 192.168.1.11:8080 --model 6050 --rate 20 --duration 60 --output poll.jsonl
+adam-io watch 192.168.1.10 --debounce 0.02
+adam-io set 192.168.1.10 DO0=1 DO5=0
+adam-io set 192.168.1.12 AO0=0FFF --model 6024
+adam-io bench 192.168.1.10 --count 1000
+
+Credentials come from --username/--password or the ADAM_USERNAME/ADAM_PASSWORD environment variables,
+there are no default ones. The csv header is built from the channels of the model.
+Rows are written as they come, one JSON object per line (jsonl) or as csv, and a summary of the
+achieved rate and the latencies is printed to stderr at the end.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .analog_io import AnalogOutput
+from .digital_io import DigitalOutput
+from .fleet import AdamFleet
+from .metrics import Histogram
+from .profiles import PROFILES, get_profile
+from .resilience import DEFAULT_TIMEOUT
+from .subscription import InputWatcher
+from typing import Optional, Sequence
+
+# row field filled by each read method of AdamFleet.endpoints
+FIELDS = {"input": "di", "d_input": "di", "output": "do", "d_output": "do", "a_input": "ai", "a_output": "ao"}
+
+
+def _model(model: str):
+    """
+    :return: (ADAM class, endpoints) of the model as AdamFleet reads it, the endpoints as (row field, method)
+    """
+    adam_class, endpoints = AdamFleet.endpoints(model)
+    return adam_class, tuple((FIELDS[endpoint], endpoint) for endpoint in endpoints)
+
+
+def _columns(model: str):
+    """
+    :return: csv columns of a poll row, one per digital bitmask and one per analog channel of the profile
+    """
+    profile = get_profile(model)
+    columns = ["time", "device"]
+    for field, _ in _model(model)[1]:
+        if field in ("di", "do"):
+            columns.append(field)
+        else:
+            columns.extend(f"{field}{index}" for index in range(getattr(profile, field)))
+    return columns + ["latency_ms", "error"]
+
+
+# 50 us to 30 s in 10% steps, fine enough for the percentiles of the summary
+LATENCY_BUCKETS = tuple(50e-6 * 1.1 ** n for n in range(int(math.log(30 / 50e-6, 1.1)) + 1))
+
+
+def _device(spec: str):
+    """
+    :param spec: ip or ip:port
+    :return: (ip, port or None)
+    """
+    ip, _, port = spec.partition(":")
+    return ip, int(port) if port else None
+
+
+def _connect(args, spec: str):
+    ip, port = _device(spec)
+    adam_class = _model(args.model)[0]
+    kwargs = {"timeout": args.timeout}
+    if args.modbus:
+        kwargs.update(modbus=True, modbus_port=port or 502)
+    elif port:
+        kwargs["port"] = port
+    return adam_class(ip, args.username, args.password, **kwargs)
+
+
+def _value(result):
+    """
+    :return: JSON friendly value of a read, bitmasks for digital states and lists for analog ones
+    """
+    if hasattr(result, "to_mask"):
+        return result.to_mask()
+    if hasattr(result, "values"):
+        return list(result.values())
+    return [value for _, value in result]
+
+
+class RowWriter:
+    """
+    Writes rows as soon as they are made, as jsonl or csv
+    """
+
+    def __init__(self, stream, format: str = "jsonl", columns: Optional[Sequence[str]] = None):
+        """
+        :param columns: csv header, written right away so it does not depend on what the first row holds
+        """
+        self.stream = stream
+        self.format = format
+        self._csv = None
+        self._lock = threading.Lock()
+        if format == "csv":
+            if not columns:
+                raise Exception("csv output needs its columns up front")
+            self._csv = csv.DictWriter(stream, list(columns), extrasaction="ignore", restval="")
+            self._csv.writeheader()
+
+    @staticmethod
+    def _flatten(row: dict):
+        flat = {}
+        for key, value in row.items():
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    flat[f"{key}{index}"] = item
+            else:
+                flat[key] = value
+        return flat
+
+    def write(self, row: dict):
+        with self._lock:
+            if self.format == "jsonl":
+                self.stream.write(json.dumps(row) + "\n")
+            else:
+                self._csv.writerow(self._flatten(row))
+            self.stream.flush()
+
+
+class Stats:
+    """
+    Samples, errors and latencies of a run, kept in a histogram so long runs use constant memory
+    """
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.errors = 0
+        self.missed = 0
+        self.maximum = 0.0
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, latency: float, error: bool = False):
+        with self._lock:
+            self.latency.observe(latency)
+            self.maximum = max(self.maximum, latency)
+            if error:
+                self.errors += 1
+
+    def summary(self):
+        elapsed = time.monotonic() - self.start
+        count = self.latency.count
+        lines = [f"samples: {count}  errors: {self.errors}  missed ticks: {self.missed}  "
+                 f"elapsed: {elapsed:.2f}s  rate: {count / elapsed if elapsed else 0:.1f}/s"]
+        if count:
+            percentiles = "  ".join(f"p{int(q * 100)}<={self.latency.quantile(q) * 1000:.2f}ms"
+                                    for q in (0.5, 0.9, 0.99))
+            lines.append(f"latency: mean {self.latency.sum / count * 1000:.2f}ms  {percentiles}  "
+                         f"max {self.maximum * 1000:.2f}ms")
+        return "\n".join(lines)
+
+
+def _open_output(path):
+    if path is None or path == "-":
+        return sys.stdout
+    return open(path, "w", newline="")
+
+
+def _ticks(rate: float, count, duration, stats: Stats):
+    """
+    :return: generator that sleeps until each tick, skipping the ticks that are already over
+    """
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    end = None if duration is None else deadline + duration
+    done = 0
+    while (count is None or done < count) and (end is None or deadline < end):
+        yield
+        done += 1
+        deadline += period
+        now = time.monotonic()
+        if now > deadline:
+            missed = int((now - deadline) / period) + 1
+            stats.missed += missed
+            deadline += missed * period
+        time.sleep(max(deadline - now, 0))
+
+
+def poll(args):
+    adams = [(spec, _connect(args, spec)) for spec in args.devices]
+    endpoints = _model(args.model)[1]
+    stats = Stats()
+    stream = _open_output(args.output)
+    writer = RowWriter(stream, args.format, _columns(args.model))
+
+    def read(spec, adam):
+        row = {"time": time.time(), "device": spec}
+        start = time.perf_counter()
+        try:
+            for field, endpoint in endpoints:
+                row[field] = _value(getattr(adam, endpoint)())
+            error = None
+        except Exception as err:
+            error = repr(err)
+        latency = time.perf_counter() - start
+        row["latency_ms"] = round(latency * 1000, 3)
+        row["error"] = error
+        stats.add(latency, error is not None)
+        writer.write(row)
+
+    executor = ThreadPoolExecutor(max_workers=min(len(adams), args.concurrency))
+    try:
+        for _ in _ticks(args.rate, args.count, args.duration, stats):
+            for future in [executor.submit(read, spec, adam) for spec, adam in adams]:
+                future.result()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown()
+        for _, adam in adams:
+            adam.close()
+        if stream is not sys.stdout:
+            stream.close()
+        print(stats.summary(), file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
+def watch(args):
+    stream = _open_output(args.output)
+    writer = RowWriter(stream, args.format, ("time", "device", "channel", "edge"))
+    edges = [0]
+    start = time.monotonic()
+    watchers = []
+    for spec in args.devices:
+        adam = _connect(args, spec)
+        watcher = InputWatcher(adam, period=1.0 / args.rate)
+        channels = range(adam.DI_COUNT)
+
+        def on_edge(event, spec=spec):
+            edges[0] += 1
+            writer.write({"time": event.timestamp, "device": spec, "channel": event.channel, "edge": event.edge})
+
+        watcher.subscribe(channels, on_edge, debounce=args.debounce)
+        watchers.append(watcher)
+    for watcher in watchers:
+        watcher.start()
+    try:
+        if args.duration is None:
+            while True:
+                time.sleep(3600)
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+            watcher.adam.close()
+        if stream is not sys.stdout:
+            stream.close()
+        elapsed = time.monotonic() - start
+        polls = sum(watcher.polls for watcher in watchers)
+        print(f"edges: {edges[0]}  polls: {polls}  errors: {sum(watcher.errors for watcher in watchers)}  "
+              f"elapsed: {elapsed:.2f}s  rate: {polls / elapsed if elapsed else 0:.1f} polls/s", file=sys.stderr)
+    return 0
+
+
+def set_outputs(args):
+    do = DigitalOutput(quantity=0)
+    ao = AnalogOutput(quantity=0)
+    digital = analog = False
+    # the outputs to set are given among the devices, e.g. 192.168.1.10 DO0=1
+    devices = [spec for spec in args.devices if "=" not in spec]
+    for assignment in (spec for spec in args.devices if "=" in spec):
+        name, _, value = assignment.upper().partition("=")
+        if name.startswith("DO"):
+            do[int(name[2:])] = int(value)
+            digital = True
+        elif name.startswith("AO"):
+            # analog values are raw 12 bit counts in HEX, like the web server expects them
+            ao[int(name[2:])] = int(value, 16)
+            analog = True
+        else:
+            raise Exception("outputs are set as DOn=0/1 or AOn=HEX ", assignment)
+    status = 0
+    for spec in devices:
+        adam = _connect(args, spec)
+        start = time.perf_counter()
+        try:
+            if digital:
+                if hasattr(adam, "d_output"):
+                    adam.d_output(do)
+                else:
+                    adam.output(do)
+            if analog:
+                adam.a_output(ao)
+            result = "OK"
+        except Exception as err:
+            result = repr(err)
+            status = 1
+        finally:
+            adam.close()
+        print(f"{spec}: {result} in {(time.perf_counter() - start) * 1000:.2f}ms", file=sys.stderr)
+    return status
+
+
+def bench(args):
+    endpoint = _model(args.model)[1][0][1]
+    status = 0
+    for spec in args.devices:
+        adam = _connect(args, spec)
+        read = getattr(adam, endpoint)
+        stats = Stats()
+        try:
+            for _ in range(args.count):
+                start = time.perf_counter()
+                try:
+                    read()
+                    error = False
+                except Exception:
+                    error = True
+                stats.add(time.perf_counter() - start, error)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            adam.close()
+        print(f"{spec} {endpoint}:\n{stats.summary()}", file=sys.stderr)
+        if stats.errors:
+            status = 1
+    return status
+
+
+def _credential(variable: str):
+    """
+    :return: argparse keywords of a credential, taken from the environment variable or else required
+    """
+    value = os.environ.get(variable)
+    if value:
+        return {"default": value, "help": f"defaults to ${variable}"}
+    return {"required": True, "help": f"required unless ${variable} is set"}
+
+
+def _parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("devices", nargs="+", metavar="device", help="ip or ip:port of an ADAM")
+    common.add_argument("--model", default="6050", choices=sorted(PROFILES))
+    common.add_argument("--username", **_credential("ADAM_USERNAME"))
+    common.add_argument("--password", **_credential("ADAM_PASSWORD"))
+    common.add_argument("--modbus", action="store_true", help="use Modbus/TCP, the port defaults to 502")
+    common.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds a request may take")
+
+    streaming = argparse.ArgumentParser(add_help=False)
+    streaming.add_argument("--format", default="jsonl", choices=("jsonl", "csv"))
+    streaming.add_argument("--output", "-o", help="file to write the rows to, stdout by default")
+    streaming.add_argument("--duration", type=float, default=None, help="seconds to run, until ctrl-c by default")
+
+    parser = argparse.ArgumentParser(prog="adam-io", description="Poll, watch and set ADAM-6000 modules")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    command = commands.add_parser("poll", parents=[common, streaming], help="read every channel at a rate")
+    command.add_argument("--rate", type=float, default=1.0, help="polls per second of every device")
+    command.add_argument("--count", type=int, default=None, help="number of polls, until ctrl-c by default")
+    command.add_argument("--concurrency", type=int, default=16, help="devices polled at the same time")
+    command.set_defaults(run=poll)
+
+    command = commands.add_parser("watch", parents=[common, streaming], help="stream digital input edges")
+    command.add_argument("--rate", type=float, default=20.0, help="polls per second of every device")
+    command.add_argument("--debounce", type=float, default=0.0, help="seconds an input has to be stable")
+    command.set_defaults(run=watch)
+
+    command = commands.add_parser("set", parents=[common], help="set outputs, e.g. DO0=1 AO1=0FFF")
+    command.set_defaults(run=set_outputs)
+
+    command = commands.add_parser("bench", parents=[common], help="back to back reads, rate and latency")
+    command.add_argument("--count", type=int, default=1000)
+    command.set_defaults(run=bench)
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
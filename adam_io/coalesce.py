@@ -0,0 +1,113 @@
+"""
+Write Coalescing
+================
+Non-blocking output writes, merged per channel with the latest value winning
+
+writer = OutputWriteQueue(adam, window=0.005)
+future = writer.submit(do)      # returns right away
+future.result()                 # True once the merged write is acknowledged by ADAM
+
+Writes submitted within the same window are merged channel by channel and sent as a single
+request, every submitter's future resolves with the result of that request.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from .analog_io import AnalogOutput
+from .digital_io import DigitalOutput
+from typing import Union
+
+
+class OutputWriteQueue:
+    """
+    Per device queue of pending DigitalOutput / AnalogOutput writes, flushed by a background thread
+    """
+
+    def __init__(self, adam, window: float = 0.005):
+        """
+        :param adam: Adam6050D or Adam6024D
+        :param window: seconds to wait for more writes after the first pending one before flushing
+        """
+        self.adam = adam
+        self.window = window
+        self.submitted = 0
+        self.sent = 0
+        # 6024 names its digital output method d_output, 6050 names it output
+        self._write_do = adam.d_output if hasattr(adam, "d_output") else adam.output
+        self._write_ao = getattr(adam, "a_output", None)
+        self._pending = {DigitalOutput: ({}, []), AnalogOutput: ({}, [])}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="adam-write-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, output: Union[DigitalOutput, AnalogOutput]):
+        """
+        :param output: values to set, None values are left as they are
+        :return: Future resolving to True when the merged write is acknowledged, or to its exception
+        """
+        kind = AnalogOutput if isinstance(output, AnalogOutput) else DigitalOutput
+        if kind is AnalogOutput and self._write_ao is None:
+            raise Exception("this ADAM has no analog outputs")
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise Exception("write queue is closed")
+            values, futures = self._pending[kind]
+            values.update(output.as_dict())
+            futures.append(future)
+            self.submitted += 1
+            self._condition.notify()
+        return future
+
+    def _take(self):
+        with self._condition:
+            while not self._closed and not any(futures for _, futures in self._pending.values()):
+                self._condition.wait()
+            if not any(futures for _, futures in self._pending.values()):
+                return None
+        # let more writes arrive within the window
+        if self.window:
+            time.sleep(self.window)
+        with self._condition:
+            pending = self._pending
+            self._pending = {DigitalOutput: ({}, []), AnalogOutput: ({}, [])}
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._take()
+            if pending is None:
+                return
+            for kind, (values, futures) in pending.items():
+                if not futures:
+                    continue
+                output = kind(quantity=0)
+                for key, value in values.items():
+                    output[int(key[2:])] = value
+                write = self._write_do if kind is DigitalOutput else self._write_ao
+                try:
+                    result = write(output)
+                except Exception as err:
+                    for future in futures:
+                        future.set_exception(err)
+                else:
+                    for future in futures:
+                        future.set_result(result)
+                self.sent += 1
+
+    def close(self):
+        """
+        send the pending writes and stop the background thread
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
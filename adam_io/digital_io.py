@@ -2,9 +2,24 @@
 Digital Input/Output
 ============================
 Use this class to create the arguments to pass into the ADAM object
+
+Digital states are kept as integer bitmasks, bit n is the state of channel n.
 """
-from xml.etree import ElementTree
-from typing import List, Optional
+from typing import List, Optional, Union
+
+from .parser import parse_values
+
+
+def _bits(mask: int):
+    """
+    :return: indexes of the set bits of mask, lowest first
+    """
+    index = 0
+    while mask:
+        if mask & 1:
+            yield index
+        mask >>= 1
+        index += 1
 
 
 class DigitalOutput:
@@ -19,80 +34,149 @@ class DigitalOutput:
 
     """
 
-    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None, xml_string: Optional[str] = None):
+    __slots__ = ("_mask", "_set", "_slots")
+
+    def __init__(self, quantity: int = 6, array: Optional[List[int]] = None,
+                 xml_string: Optional[Union[bytes, str]] = None):
         """
         :param quantity: number of digital outputs
         :param array: pass in an array with the same size as quantity to initialize the internal
-            digital output dictionary in an ordered manner. If the sizes mismatch, throws an exception
+            digital output state in an ordered manner. If the sizes mismatch, throws an exception
         """
+        # _mask holds the values, _set marks the outputs that have a value, unset outputs are None
+        self._mask = 0
+        self._set = 0
+        self._slots = quantity
         if xml_string:
-            self._do = self.parse(xml_string)
-        else:
-            self._do = {f"DO{index}": None for index in range(0, quantity + 1)}
+            self.update(xml_string)
         if array:
             if len(array) != quantity:
                 raise Exception("quantity and initial array sizes are different for digital output")
             self.array(array)
 
-    def parse(self, xml_string: str):
+    @classmethod
+    def from_mask(cls, mask: int, quantity: int = 6):
         """
-        :param xml_string: response string from ADAM
+        :param mask: bit n is the value of DOn
+        :param quantity: number of digital outputs, every one of them is set
+        :return: DigitalOutput
         """
-        root = ElementTree.fromstring(xml_string)
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
+        do = cls(quantity)
+        do._set = (1 << quantity) - 1
+        do._mask = mask & do._set
+        return do
 
-        # convert xml to dictionary
-        values = [int(di_element.text) for di in root for di_element in di if di_element.tag == "VALUE"]
-        keys = ["DO" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        return dict(zip(keys, values))
+    def to_mask(self):
+        """
+        :return: values as a bitmask, bit n is the value of DOn, unset outputs are 0
+        """
+        return self._mask
+
+    def parse(self, xml_string: Union[bytes, str]):
+        """
+        :param xml_string: response from ADAM
+        """
+        _, pairs = parse_values(xml_string)
+        return {f"DO{channel}": int(value) for channel, value in pairs}
+
+    def update(self, xml_string: Union[bytes, str]):
+        """
+        replace the state in place with the one in the response
+
+        :param xml_string: response from ADAM
+        """
+        _, pairs = parse_values(xml_string)
+        mask = present = 0
+        slots = 0
+        for channel, value in pairs:
+            bit = 1 << channel
+            present |= bit
+            if int(value):
+                mask |= bit
+            if channel >= slots:
+                slots = channel + 1
+        self._mask = mask
+        self._set = present
+        self._slots = slots
+        return self
 
     def __setitem__(self, do_id: int, value: int):
         if type(value) is not int:
             raise TypeError("digital output only accepts integer 0 or 1")
         if type(do_id) is not int:
             raise TypeError("digital output id should be integer")
-        self._do[f"DO{do_id}"] = value
+        bit = 1 << do_id
+        self._set |= bit
+        if value:
+            self._mask |= bit
+        else:
+            self._mask &= ~bit
+        if do_id >= self._slots:
+            self._slots = do_id + 1
 
     def array(self, array: List[Optional[int]]):
         """
-        :param array: set the values of the internal digital output dictionary to the input array
+        :param array: set the values of the internal digital output state to the input array
         """
         for index, value in enumerate(array):
-            self._do[f"DO{index}"] = value
+            bit = 1 << index
+            if value is None:
+                self._set &= ~bit
+                self._mask &= ~bit
+            else:
+                self._set |= bit
+                if value:
+                    self._mask |= bit
+                else:
+                    self._mask &= ~bit
+        if len(array) > self._slots:
+            self._slots = len(array)
 
     def clear(self):
         """
-        clears the values of the internal digital output dictionary
+        clears the values of the internal digital output state
         """
-        self.array([None] * len(self._do))
+        self._mask = 0
+        self._set = 0
 
     def as_dict(self):
         """
         same as __call__
         :return: the data ready to be sent over to ADAM
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        mask = self._mask
+        return {f"DO{index}": (mask >> index) & 1 for index in _bits(self._set)}
 
     def __call__(self):
         """
         same as as_dict
         :return: the data ready to be sent over to ADAM
         """
-        return {k: v for k, v in self._do.items() if v is not None}
+        return self.as_dict()
 
     def __getitem__(self, do_id):
-        return self._do[f"DO{do_id}"]
+        if not (self._set >> do_id) & 1:
+            if do_id >= self._slots:
+                raise KeyError(f"DO{do_id}")
+            return None
+        return (self._mask >> do_id) & 1
 
     def __iter__(self):
-        yield from self._do.items()
+        for index in range(self._slots):
+            yield f"DO{index}", self[index]
+
+    def __xor__(self, other):
+        """
+        :return: bitmask of the outputs whose values differ
+        """
+        other_mask = other.to_mask() if isinstance(other, DigitalOutput) else other
+        return self._mask ^ other_mask
 
     def __str__(self):
-        return '\n'.join([f"DO[{index}]={v}" for index, v in enumerate(self._do.values())])
+        return '\n'.join([f"DO[{index}]={v}" for index, (_, v) in enumerate(self)])
 
     def __repr__(self):
-        return '\n'.join([f"DO[{index}]={v}" for index, v in enumerate(self._do.values())])
+        return '\n'.join([f"DO[{index}]={v}" for index, (_, v) in enumerate(self)])
 
 
 class DigitalInput:
@@ -108,33 +192,80 @@ class DigitalInput:
     ...  === ...
     d[11] === DI11
 
+    d.to_mask() has DIn in bit n, a long running poller can reuse the object with d.update(xml_str)
     """
 
-    def __init__(self, xml_string: str):
+    __slots__ = ("name", "_mask", "_present")
+
+    def __init__(self, xml_string: Optional[Union[bytes, str]] = None):
         """
-        :param xml_string: response string from ADAM
+        :param xml_string: response from ADAM
         """
-        root = ElementTree.fromstring(xml_string)
-        self.name = root.tag
-        status = root.attrib['status']
-        if status != 'OK':
-            raise Exception("something wrong with the response, status is:", status)
+        self.name = None
+        self._mask = 0
+        self._present = 0
+        if xml_string is not None:
+            self.update(xml_string)
 
-        # convert xml to dictionary
-        values = [int(di_element.text) for di in root for di_element in di if di_element.tag == "VALUE"]
-        keys = ["DI" + di_element.text for di in root for di_element in di if di_element.tag == "ID"]
-        self._di = dict(zip(keys, values))
+    @classmethod
+    def from_mask(cls, mask: int, quantity: int = 12, name: Optional[str] = None):
+        """
+        :param mask: bit n is the value of DIn
+        :param quantity: number of digital inputs
+        :param name: name of the ADAM, e.g. ADAM-6050
+        :return: DigitalInput
+        """
+        di = cls()
+        di.name = name
+        di._present = (1 << quantity) - 1
+        di._mask = mask & di._present
+        return di
+
+    def to_mask(self):
+        """
+        :return: values as a bitmask, bit n is the value of DIn
+        """
+        return self._mask
+
+    def update(self, xml_string: Union[bytes, str]):
+        """
+        replace the state in place with the one in the response
+
+        :param xml_string: response from ADAM
+        """
+        name, pairs = parse_values(xml_string)
+        mask = present = 0
+        for channel, value in pairs:
+            bit = 1 << channel
+            present |= bit
+            if int(value):
+                mask |= bit
+        self.name = name
+        self._mask = mask
+        self._present = present
+        return self
 
     def __getitem__(self, di_id: int):
         if type(di_id) != int:
             raise TypeError("digital input id should be integer")
-        return self._di[f"DI{di_id}"]
+        if not (self._present >> di_id) & 1:
+            raise KeyError(f"DI{di_id}")
+        return (self._mask >> di_id) & 1
 
     def __iter__(self):
-        yield from self._di.items()
+        mask = self._mask
+        for index in _bits(self._present):
+            yield f"DI{index}", (mask >> index) & 1
+
+    def __xor__(self, other):
+        """
+        :return: bitmask of the inputs whose values differ
+        """
+        other_mask = other.to_mask() if isinstance(other, DigitalInput) else other
+        return self._mask ^ other_mask
 
     def __str__(self):
-        return '\n'.join([f"DI[{index}]={v}" for index, v in enumerate(self._di.values())])
+        return '\n'.join([f"DI[{index}]={v}" for index, (_, v) in enumerate(self)])
 
     def __repr__(self):
-        return '\n'.join([f"DI[{index}]={v}" for index, v in enumerate(self._di.values())])
+        return '\n'.join([f"DI[{index}]={v}" for index, (_, v) in enumerate(self)])
@@ -0,0 +1,229 @@
+"""
+ADAM Fleet
+==========
+Polls many ADAM modules concurrently and keeps the latest state of each one
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .adam import Adam6050D, Adam6024D, device_class
+from .profiles import get_profile
+from .resilience import DEFAULT_TIMEOUT, CircuitBreaker
+from .scheduler import RequestScheduler, request_priority
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceSnapshot:
+    """
+    Latest state read from a single ADAM
+
+    - ip: the device key, its ip or ip:port
+    - values: endpoint name to parsed response, e.g. {"input": DigitalInput, "output": DigitalOutput}
+    - timestamp: time.time() when the poll of this device finished
+    - latency: seconds the poll of this device took
+    - error: the exception if the poll failed, values is then None
+    """
+
+    __slots__ = ("ip", "model", "values", "timestamp", "latency", "error")
+
+    def __init__(self, ip: str, model: str, values: Optional[Dict[str, object]], timestamp: float,
+                 latency: float, error: Optional[BaseException] = None):
+        self.ip = ip
+        self.model = model
+        self.values = values
+        self.timestamp = timestamp
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __getitem__(self, endpoint: str):
+        return self.values[endpoint]
+
+    def __repr__(self):
+        state = "OK" if self.ok else f"error={self.error!r}"
+        return f"DeviceSnapshot({self.ip}, {self.model}, {state}, latency={self.latency * 1000:.1f}ms)"
+
+
+class AdamFleet:
+    """
+    Poll a fleet of ADAMs concurrently
+
+    fleet = AdamFleet([("192.168.1.10", "6050", ("root", "00000000")),
+                       ("192.168.1.11", "6024", ("root", "00000000"))], period=0.5)
+    fleet.start()
+    fleet.latest("192.168.1.10")["input"][0] === DI0 of the first device
+    """
+
+    # read methods polled on every sweep of the models that do not follow their profile
+    MODELS = {
+        "6050": (Adam6050D, ("input", "output")),
+        "6024": (Adam6024D, ("d_input", "d_output", "a_input", "a_output")),
+    }
+
+    def __init__(self, devices: Sequence[tuple], period: float = 1.0, max_concurrency: int = 16,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, failure_threshold: Optional[int] = None,
+                 schedulers: Optional[Dict[str, RequestScheduler]] = None):
+        """
+        :param devices: list of (ip, model, (username, password)) with an optional port as fourth item,
+            model is a registered model, e.g. "6050", "6024" ("ADAM-6050D" style names are accepted too)
+        :param period: seconds between the start of two sweeps of the fleet
+        :param max_concurrency: maximum number of devices polled at the same time
+        :param timeout: seconds a single request to a device may take, None blocks forever and a device that
+            stops answering then stalls its worker thread for good
+        :param failure_threshold: failed requests in a row after which a device is skipped until it answers
+            a background probe again, None always polls every device
+        :param schedulers: device key to the RequestScheduler the device shares with its other users,
+            the sweeps then run at BACKGROUND priority behind their writes and control reads
+        """
+        if max_concurrency < 1:
+            raise Exception("max_concurrency should be at least 1")
+        self.period = period
+        self.max_concurrency = max_concurrency
+        self.devices = {}
+        for device in devices:
+            ip, model, (username, password) = device[:3]
+            port = device[3] if len(device) > 3 else 80
+            model = self.model_name(model)
+            adam_class, endpoints = self.endpoints(model)
+            # devices are known by their ip, or ip:port when they are not on the default port
+            key = ip if port == 80 else f"{ip}:{port}"
+            breaker = CircuitBreaker(failure_threshold) if failure_threshold is not None else None
+            scheduler = schedulers.get(key) if schedulers else None
+            adam = adam_class(ip, username, password, port=port, timeout=timeout, breaker=breaker,
+                              scheduler=scheduler)
+            self.devices[key] = (model, adam, endpoints)
+
+        self.sweeps = 0
+        self.overruns = 0
+        self.last_sweep_duration = 0.0
+        # called with the snapshots of every sweep, e.g. StatePublisher.publish_sweep; a listener that raises
+        # is logged and does not stop the polling
+        self.listeners = []
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def model_name(cls, model: str):
+        return get_profile(model).model
+
+    @classmethod
+    def endpoints(cls, model: str):
+        """
+        :return: (ADAM class, read methods) of a model, from MODELS or else from its profile
+        """
+        return cls.MODELS.get(model) or cls._profile_endpoints(model)
+
+    @staticmethod
+    def _profile_endpoints(model: str):
+        """
+        :return: (ADAM class, read methods) of a model from its profile
+        """
+        profile = get_profile(model)
+        endpoints = tuple(endpoint for endpoint, count in (("d_input", profile.di), ("d_output", profile.do),
+                                                          ("a_input", profile.ai), ("a_output", profile.ao)) if count)
+        return device_class(model), endpoints
+
+    def _poll_device(self, ip: str):
+        model, adam, endpoints = self.devices[ip]
+        start = time.perf_counter()
+        try:
+            # sweeps give way to writes and control reads of a shared RequestScheduler
+            with request_priority(RequestScheduler.BACKGROUND):
+                values = {endpoint: getattr(adam, endpoint)() for endpoint in endpoints}
+            error = None
+        except Exception as err:
+            values, error = None, err
+        snapshot = DeviceSnapshot(ip, model, values, time.time(), time.perf_counter() - start, error)
+        with self._lock:
+            self._snapshots[ip] = snapshot
+        return snapshot
+
+    def poll_once(self):
+        """
+        Poll every device once, at most max_concurrency at a time
+
+        :return: dictionary of device key to DeviceSnapshot
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, max(len(self.devices), 1)))
+        start = time.perf_counter()
+        snapshots = {snapshot.ip: snapshot for snapshot in self._executor.map(self._poll_device, self.devices)}
+        self.last_sweep_duration = time.perf_counter() - start
+        self.sweeps += 1
+        for listener in self.listeners:
+            try:
+                listener(snapshots)
+            except Exception:
+                logger.exception("fleet listener failed")
+        return snapshots
+
+    def latest(self, ip: Optional[str] = None):
+        """
+        :param ip: device key to get, None returns every device
+        :return: latest DeviceSnapshot of the device, or a dictionary of device key to DeviceSnapshot
+        """
+        with self._lock:
+            if ip is None:
+                return dict(self._snapshots)
+            return self._snapshots.get(ip)
+
+    def failed(self) -> List[str]:
+        """
+        :return: keys of the devices whose latest poll failed
+        """
+        with self._lock:
+            return [ip for ip, snapshot in self._snapshots.items() if not snapshot.ok]
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            self.poll_once()
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                # sweep took longer than the period, start the next one right away
+                self.overruns += 1
+                deadline = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        """
+        start polling the fleet every period in a background thread
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="adam-fleet", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        stop the background polling, release the worker threads and the device connections
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for _, adam, _ in self.devices.values():
+            adam.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,179 @@
+"""
+Input History
+=============
+Compact in-memory history of digital input states, for lookback queries over days of polls
+
+history = InputHistory(adam.DI_COUNT)
+history.append(time.time(), adam.input())     # after every poll
+
+history.state_at(t)[3]                          # DI3 at time t
+history.edges(3, t0, t1, edge=RISING)           # EdgeEvent of every rising edge of DI3 in [t0, t1)
+history.duty_cycle(3, t0, t1)                   # fraction of [t0, t1) DI3 was high
+
+Polls are kept as runs: the timestamp of the first poll of a run and the DI bitmask, in two flat arrays.
+A poll with the same state as the one before only moves the end of the history, so memory grows with
+the number of changes, not the number of polls; 10 bytes per change. Queries find their runs with a
+binary search over the run start times.
+
+The inputs are taken to hold their state between two polls.
+"""
+import bisect
+import threading
+from array import array
+
+from .digital_io import DigitalInput
+from .subscription import ANY, FALLING, RISING, EdgeEvent
+from typing import List, Optional, Union
+
+
+class InputHistory:
+    """
+    Run-length encoded history of the digital inputs of one device
+
+    - polls: number of polls appended
+    - first, last: timestamps of the first and the latest poll, None while empty
+    """
+
+    def __init__(self, channels: int):
+        """
+        :param channels: number of digital inputs of the device, at most 16, e.g. adam.DI_COUNT
+        """
+        if not 0 < channels <= 16:
+            raise Exception("the input history holds 1 to 16 channels ", channels)
+        self.channels = channels
+        self.polls = 0
+        self.last = None  # type: Optional[float]
+        self._starts = array('d')
+        self._masks = array('H')
+        self._lock = threading.Lock()
+
+    @property
+    def first(self):
+        return self._starts[0] if self._starts else None
+
+    def __len__(self):
+        """
+        :return: number of runs, one per change of state plus the first one
+        """
+        return len(self._starts)
+
+    @property
+    def nbytes(self):
+        """
+        :return: bytes used by the runs
+        """
+        return self._starts.itemsize * len(self._starts) + self._masks.itemsize * len(self._masks)
+
+    def append(self, timestamp: float, di: Union[DigitalInput, int]):
+        """
+        :param timestamp: time.time() of the poll, may not be older than the previous one
+        :param di: DigitalInput or DI bitmask
+        """
+        mask = (di.to_mask() if isinstance(di, DigitalInput) else di) & ((1 << self.channels) - 1)
+        with self._lock:
+            if self.last is not None and timestamp < self.last:
+                raise Exception("input history timestamps can not go backwards ", timestamp)
+            if not self._masks or self._masks[-1] != mask:
+                self._starts.append(timestamp)
+                self._masks.append(mask)
+            self.last = timestamp
+            self.polls += 1
+
+    def _bit(self, channel: int):
+        """
+        :return: bit of channel in the masks
+        """
+        if not 0 <= channel < self.channels:
+            raise Exception("DI channel out of range of the input history ", channel)
+        return 1 << channel
+
+    def _run(self, timestamp: float):
+        """
+        :return: index of the run holding timestamp, -1 before the first poll
+        """
+        return bisect.bisect_right(self._starts, timestamp) - 1
+
+    def state_at(self, timestamp: float):
+        """
+        :param timestamp: time.time() to look up, after the latest poll the latest state is returned
+        :return: DigitalInput of the state at timestamp, None before the first poll
+        """
+        with self._lock:
+            index = self._run(timestamp)
+            if index < 0:
+                return None
+            return DigitalInput.from_mask(self._masks[index], self.channels)
+
+    def mask_at(self, timestamp: float):
+        """
+        :return: DI bitmask at timestamp, None before the first poll
+        """
+        with self._lock:
+            index = self._run(timestamp)
+            return None if index < 0 else self._masks[index]
+
+    def edges(self, channel: int, start: Optional[float] = None, end: Optional[float] = None,
+              edge: str = ANY) -> List[EdgeEvent]:
+        """
+        :param channel: DI index
+        :param start: first timestamp included, None from the first poll
+        :param end: first timestamp excluded, None to the latest poll
+        :param edge: RISING, FALLING or ANY
+        :return: EdgeEvent of every change of the input in [start, end), timestamped with the first poll
+            that saw the new state
+        """
+        bit = self._bit(channel)
+        events = []
+        with self._lock:
+            starts, masks = self._starts, self._masks
+            # a change at the first run of the range needs the run before it to be seen
+            low = 1 if start is None else max(bisect.bisect_left(starts, start), 1)
+            high = len(starts) if end is None else bisect.bisect_left(starts, end)
+            for index in range(low, high):
+                changed = (masks[index] ^ masks[index - 1]) & bit
+                if not changed:
+                    continue
+                value = 1 if masks[index] & bit else 0
+                if edge == ANY or (edge == RISING) == bool(value):
+                    events.append(EdgeEvent(channel, value, starts[index]))
+        return events
+
+    def duty_cycle(self, channel: int, start: Optional[float] = None, end: Optional[float] = None):
+        """
+        :param channel: DI index
+        :param start: beginning of the window, None from the first poll; clipped to the first poll
+        :param end: end of the window, None to the latest poll; clipped to the latest poll
+        :return: fraction of the window the input was high, None if the window holds no history
+        """
+        bit = self._bit(channel)
+        with self._lock:
+            if not self._starts:
+                return None
+            starts, masks = self._starts, self._masks
+            start = starts[0] if start is None else max(start, starts[0])
+            end = self.last if end is None else min(end, self.last)
+            if end <= start:
+                return None
+            high = 0.0
+            index = self._run(start)
+            while index < len(starts) and starts[index] < end:
+                run_start = max(starts[index], start)
+                run_end = min(starts[index + 1] if index + 1 < len(starts) else end, end)
+                if masks[index] & bit:
+                    high += run_end - run_start
+                index += 1
+        return high / (end - start)
+
+    def trim(self, before: float):
+        """
+        drop the history older than before, the state at before is kept
+
+        :param before: time.time() of the oldest state to keep
+        """
+        with self._lock:
+            index = self._run(before)
+            if index <= 0:
+                return
+            del self._starts[:index]
+            del self._masks[:index]
+            self._starts[0] = min(before, self.last)
@@ -0,0 +1,116 @@
+"""
+Response Memoization
+====================
+Responses that are byte for byte the same as an earlier one are not parsed again
+
+adam = Adam6050D(ip, username, password, memoize=True)
+di = adam.input()
+adam.unchanged["d_input", None]   # True if the response of every DI was the same as the one before
+
+Most polls get the same xml as the poll before, nothing changed on the device. The parsed object of a
+response is kept in a small LRU per endpoint, keyed on the raw body, and handed out again when the same
+body comes back. The objects are shared between the reads, so they are frozen: update() and setting an
+attribute raise, and AnalogInput.values() returns a copy of the values.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+
+from .analog_io import AnalogInput
+from .digital_io import DigitalInput
+from typing import Dict, Hashable, Type
+
+
+def _refuse(self, *args):
+    raise Exception("responses from the response cache are shared and can not be changed ", type(self).__name__)
+
+
+class _Frozen:
+    __slots__ = ()
+
+    __setattr__ = _refuse
+    __delattr__ = _refuse
+    update = _refuse
+
+
+class FrozenDigitalInput(_Frozen, DigitalInput):
+    """
+    DigitalInput handed out by the response cache, read-only
+    """
+
+    __slots__ = ()
+
+
+class FrozenAnalogInput(_Frozen, AnalogInput):
+    """
+    AnalogInput handed out by the response cache, read-only
+    """
+
+    __slots__ = ()
+
+    def values(self):
+        """
+        :return: copy of the raw values, the array of the cached object is shared
+        """
+        return array('H', self._values)
+
+
+_FROZEN = {DigitalInput: FrozenDigitalInput, AnalogInput: FrozenAnalogInput}
+
+
+class ResponseCache:
+    """
+    LRU of parsed responses per endpoint
+
+    - hits: responses that were served from the cache
+    - misses: responses that were parsed
+    """
+
+    def __init__(self, size: int = 8):
+        """
+        :param size: parsed responses kept per endpoint, more than one helps outputs that toggle between states
+        """
+        if size < 1:
+            raise Exception("response cache size should be at least 1")
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # type: Dict[Hashable, OrderedDict]
+        self._last = {}  # type: Dict[Hashable, bytes]
+        self._lock = threading.Lock()
+
+    def parse(self, endpoint: Hashable, response_class: Type, body: bytes):
+        """
+        :param endpoint: identifies what was read, e.g. ("d_input", None)
+        :param response_class: parses the body when it is not cached, DigitalInput or AnalogInput
+        :param body: raw response of ADAM
+        :return: (parsed response, unchanged) unchanged is True if body is the same as the previous one of endpoint
+        """
+        frozen = _FROZEN.get(response_class)
+        if frozen is None:
+            raise Exception("only DigitalInput and AnalogInput responses are cached ", response_class)
+        with self._lock:
+            unchanged = self._last.get(endpoint) == body
+            self._last[endpoint] = body
+            # the dictionary hashes the body once, and compares the bytes on a hash match
+            entries = self._entries.get(endpoint)
+            if entries is None:
+                entries = self._entries[endpoint] = OrderedDict()
+            result = entries.get(body)
+            if result is not None:
+                entries.move_to_end(body)
+                self.hits += 1
+                return result, unchanged
+        result = response_class(xml_string=body)
+        object.__setattr__(result, "__class__", frozen)
+        with self._lock:
+            self.misses += 1
+            entries[body] = result
+            if len(entries) > self.size:
+                entries.popitem(last=False)
+        return result, unchanged
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last.clear()
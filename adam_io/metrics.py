@@ -0,0 +1,281 @@
+"""
+Request Metrics
+===============
+Latency histograms per device and endpoint, with the time spent in every phase of a request
+
+metrics = MetricsCollector()
+adam.instrument(metrics)
+...
+print(metrics.to_prometheus())
+
+A request goes through the phases connect (only when a new connection is opened), send,
+first_byte (waiting for the response headers, i.e. the response time of the device), body and
+parse (the first parse of the response on the same thread).
+
+Any TimingHook can be attached to a Requestor, e.g. to forward the timings to a tracer.
+Requestors without hooks take the same path as before, the only cost is an empty list check.
+"""
+import bisect
+import threading
+import time
+
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+PHASES = ("connect", "send", "first_byte", "body", "parse")
+
+# seconds, from a local simulator up to a device that is about to time out
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# number of requestors with hooks, the parser only times itself when it is not 0
+_instrumented = 0
+_hooks_lock = threading.Lock()
+_local = threading.local()
+
+
+class RequestTiming:
+    """
+    Timing of a single request
+
+    - device: ip of the device, ip:port if the port is not 80
+    - method: GET or POST
+    - endpoint: path of the request
+    - status: http status, None if the request failed before a response
+    - error: exception of the request, None if it got a response
+    - phases: phase name to seconds, see PHASES
+    - total: seconds from the start of the request to the end of the body
+    """
+
+    __slots__ = ("device", "method", "endpoint", "status", "error", "bytes_sent", "bytes_received",
+                 "phases", "total")
+
+    def __init__(self, device: str, method: str, endpoint: str):
+        self.device = device
+        self.method = method
+        self.endpoint = endpoint
+        self.status = None
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.phases = {}
+        self.total = 0.0
+
+    def __repr__(self):
+        return f"RequestTiming({self.method} {self.device}{self.endpoint}, status={self.status}, total={self.total:.6f})"
+
+
+class TimingHook:
+    """
+    Interface of the request instrumentation, override the methods that are needed
+    """
+
+    def on_request(self, timing: RequestTiming):
+        """
+        called from the requesting thread once the body of the response is read or the request failed
+        """
+
+    def on_parse(self, timing: RequestTiming, seconds: float):
+        """
+        called from the requesting thread once the response of timing is parsed
+        """
+
+
+def _add_hook(owner, hook: TimingHook):
+    """
+    :param owner: Requestor or ModbusRequestor, its hooks list is replaced instead of changed in place
+    """
+    global _instrumented
+    with _hooks_lock:
+        if not owner.hooks:
+            _instrumented += 1
+        # copy on write, the requesting threads iterate the hooks without locking
+        owner.hooks = owner.hooks + [hook]
+
+
+def _remove_hook(owner, hook: TimingHook):
+    global _instrumented
+    with _hooks_lock:
+        if hook in owner.hooks:
+            hooks = list(owner.hooks)
+            hooks.remove(hook)
+            owner.hooks = hooks
+            if not owner.hooks:
+                _instrumented -= 1
+
+
+def _finished(hooks: Sequence[TimingHook], timing: RequestTiming):
+    """
+    hand a finished request to the hooks, its response is the next one parsed on this thread
+    """
+    _local.pending = (hooks, timing) if timing.status is not None else None
+    for hook in hooks:
+        hook.on_request(timing)
+
+
+def _timed_parse(parse: Callable, *args):
+    """
+    :param parse: parser function, called with args
+    :return: what parse returns, the time it took is reported to the hooks of the pending request
+    """
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        return parse(*args)
+    _local.pending = None
+    start = time.perf_counter()
+    result = parse(*args)
+    seconds = time.perf_counter() - start
+    hooks, timing = pending
+    timing.phases["parse"] = seconds
+    for hook in hooks:
+        hook.on_parse(timing, seconds)
+    return result
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed upper bounds, as Prometheus expects it
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        # one more bucket for the values above the last bound (+Inf)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        :return: [(upper bound, number of values <= bound), ...] ending with (inf, count)
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float):
+        """
+        :param q: 0 to 1
+        :return: upper bound of the bucket holding the q quantile, None if empty
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+
+
+class EndpointMetrics:
+    """
+    Everything recorded for one device and endpoint
+    """
+
+    __slots__ = ("latency", "phases", "requests", "errors", "bytes_sent", "bytes_received")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.latency = Histogram(bounds)
+        self.phases = {phase: Histogram(bounds) for phase in PHASES}
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _bound(bound: float):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class MetricsCollector(TimingHook):
+    """
+    TimingHook that keeps histograms and counters per (device, endpoint)
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "adam"):
+        """
+        :param bounds: upper bounds of the histogram buckets in seconds
+        :param prefix: prefix of the exported metric names
+        """
+        self.bounds = tuple(bounds)
+        self.prefix = prefix
+        self.endpoints = {}  # type: Dict[Tuple[str, str], EndpointMetrics]
+        self._lock = threading.Lock()
+
+    def _endpoint(self, timing: RequestTiming):
+        key = (timing.device, timing.endpoint)
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            metrics = self.endpoints[key] = EndpointMetrics(self.bounds)
+        return metrics
+
+    def on_request(self, timing: RequestTiming):
+        with self._lock:
+            metrics = self._endpoint(timing)
+            metrics.requests += 1
+            if timing.error is not None or timing.status is None or timing.status >= 300:
+                metrics.errors += 1
+            metrics.bytes_sent += timing.bytes_sent
+            metrics.bytes_received += timing.bytes_received
+            metrics.latency.observe(timing.total)
+            for phase, seconds in timing.phases.items():
+                metrics.phases[phase].observe(seconds)
+
+    def on_parse(self, timing: RequestTiming, seconds: float):
+        with self._lock:
+            self._endpoint(timing).phases["parse"].observe(seconds)
+
+    def get(self, device: str, endpoint: str) -> Optional[EndpointMetrics]:
+        return self.endpoints.get((device, endpoint))
+
+    def to_prometheus(self):
+        """
+        :return: the metrics in the Prometheus text exposition format
+        """
+        prefix = self.prefix
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            lines = [f"# HELP {prefix}_request_duration_seconds Time from sending a request to reading its body",
+                     f"# TYPE {prefix}_request_duration_seconds histogram"]
+            for (device, endpoint), metrics in items:
+                lines += self._histogram(f"{prefix}_request_duration_seconds", metrics.latency,
+                                         device=device, endpoint=endpoint)
+            lines += [f"# HELP {prefix}_request_phase_seconds Time spent in each phase of a request",
+                      f"# TYPE {prefix}_request_phase_seconds histogram"]
+            for (device, endpoint), metrics in items:
+                for phase in PHASES:
+                    if metrics.phases[phase].count:
+                        lines += self._histogram(f"{prefix}_request_phase_seconds", metrics.phases[phase],
+                                                 device=device, endpoint=endpoint, phase=phase)
+            for name, attribute, description in (
+                    ("requests_total", "requests", "Requests made"),
+                    ("request_errors_total", "errors", "Requests that failed or got a non 2xx status"),
+                    ("sent_bytes_total", "bytes_sent", "Bytes of request bodies sent"),
+                    ("received_bytes_total", "bytes_received", "Bytes of response bodies received")):
+                lines += [f"# HELP {prefix}_{name} {description}", f"# TYPE {prefix}_{name} counter"]
+                for (device, endpoint), metrics in items:
+                    lines.append(f"{prefix}_{name}{_labels(device=device, endpoint=endpoint)} "
+                                 f"{getattr(metrics, attribute)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(name: str, histogram: Histogram, **labels):
+        lines = [f"{name}_bucket{_labels(**labels, le=_bound(bound))} {count}"
+                 for bound, count in histogram.cumulative()]
+        lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum!r}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+        return lines
@@ -0,0 +1,287 @@
+"""
+Modbus/TCP
+==========
+Binary alternative to the web server of ADAM, same data without HTTP, Basic auth or xml
+
+adam = Adam6050D(ip, username, password, modbus=True)
+adam.input()[0]         # DI0, read with a single Read Coils request
+
+Every read is a single request for the whole block of channels on one persistent socket, and the
+replies are turned straight into DigitalInput/DigitalOutput/AnalogInput/AnalogOutput objects.
+Writes only send the channels that are set, so the read before every write is not needed. A write is
+always a single request: channels left out between the ones that are set are read once and written back
+with their current state.
+"""
+import socket
+import struct
+import threading
+import time
+
+from .analog_io import AnalogInput, AnalogOutput
+from .digital_io import DigitalInput, DigitalOutput
+from . import metrics
+from .metrics import RequestTiming, TimingHook
+from .parser import ParsedResponse
+from .profiles import get_profile
+from .resilience import DEFAULT_TIMEOUT, current_timeout
+from typing import Dict, List, Optional, Union
+
+READ_COILS = 0x01
+READ_HOLDING_REGISTERS = 0x03
+WRITE_MULTIPLE_COILS = 0x0F
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# function to (method, name) of the RequestTiming of its requests, reads are reported as GET and writes as POST
+_TIMED = {READ_COILS: ("GET", "read_coils"), READ_HOLDING_REGISTERS: ("GET", "read_registers"),
+          WRITE_MULTIPLE_COILS: ("POST", "write_coils"), WRITE_MULTIPLE_REGISTERS: ("POST", "write_registers")}
+
+_MBAP = struct.Struct(">HHHB")
+
+# errors raised when the device has dropped the idle socket
+_STALE_ERRORS = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError, EOFError)
+
+
+class ModbusRequestor:
+    """
+    Same methods as Requestor, reads return the parsed objects instead of xml
+
+    Reads of a single channel return every channel of the block, it costs the same single request.
+    """
+
+    # writes only touch the channels that are sent, see adam._write_output
+    PARTIAL_WRITES = True
+
+    def __init__(self, ip: str, port: int = 502, model: str = "6050", unit: int = 1,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        :param ip: ADAM ip
+        :param port: Modbus/TCP port of ADAM
+        :param model: a registered model, its profile has the address map
+        :param unit: Modbus unit identifier
+        :param timeout: socket timeout in seconds, None blocks forever; request_timeout overrides it for single calls
+        """
+        profile = get_profile(model)
+        self.ip = ip
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        self.name = profile.name
+        self.map = profile.modbus
+        self.device = ip if port == 502 else f"{ip}:{port}"
+        self.reconnects = 0
+        self.hooks = []
+        self._sock = None
+        self._transaction = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.ip, self.port), timeout=current_timeout(self.timeout))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _receive(self, size: int):
+        data = b""
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("ADAM closed the Modbus connection")
+            data += chunk
+        return data
+
+    def _exchange(self, request: bytes, transaction: int):
+        self._sock.sendall(request)
+        header = self._receive(_MBAP.size)
+        reply_transaction, _, length, _ = _MBAP.unpack(header)
+        body = self._receive(length - 1)
+        if reply_transaction != transaction:
+            raise Exception("Modbus reply out of order, transaction ", reply_transaction)
+        return body
+
+    def instrument(self, hook: TimingHook):
+        """
+        :param hook: TimingHook told about every request from now on, e.g. a MetricsCollector
+
+        Requests are reported as GET for reads and POST for writes, on the endpoint
+        /modbus/<function>/<first address>; the status of a reply is 200.
+        """
+        metrics._add_hook(self, hook)
+
+    def uninstrument(self, hook: TimingHook):
+        metrics._remove_hook(self, hook)
+
+    def _call(self, function: int, payload: bytes):
+        """
+        :return: payload of the reply, raises an exception for a Modbus exception reply
+        """
+        if self.hooks:
+            return self._timed(function, payload)
+        return self._call_now(function, payload)
+
+    def _timed(self, function: int, payload: bytes):
+        method, name = _TIMED[function]
+        timing = RequestTiming(self.device, method, f"/modbus/{name}/{struct.unpack_from('>H', payload)[0]}")
+        timing.bytes_sent = _MBAP.size + 1 + len(payload)
+        start = time.perf_counter()
+        try:
+            reply = self._call_now(function, payload)
+        except Exception as err:
+            timing.error = err
+            timing.total = time.perf_counter() - start
+            self._finished(timing)
+            raise
+        timing.total = time.perf_counter() - start
+        timing.status = 200
+        timing.bytes_received = _MBAP.size + 1 + len(reply)
+        self._finished(timing)
+        return reply
+
+    def _finished(self, timing: RequestTiming):
+        # the replies are not parsed, so no parse time is waited for like metrics._finished does
+        for hook in self.hooks:
+            hook.on_request(timing)
+
+    def _call_now(self, function: int, payload: bytes):
+        with self._lock:
+            self._transaction = (self._transaction + 1) & 0xFFFF
+            transaction = self._transaction
+            request = _MBAP.pack(transaction, 0, len(payload) + 2, self.unit) + bytes((function,)) + payload
+            reused = self._sock is not None
+            if not reused:
+                self._sock = self._connect()
+            timeout = current_timeout(self.timeout)
+            if self._sock.gettimeout() != timeout:
+                self._sock.settimeout(timeout)
+            try:
+                try:
+                    body = self._exchange(request, transaction)
+                except _STALE_ERRORS:
+                    if not reused:
+                        raise
+                    self._sock.close()
+                    self._sock = self._connect()
+                    self.reconnects += 1
+                    body = self._exchange(request, transaction)
+            except BaseException:
+                self._sock.close()
+                self._sock = None
+                raise
+        if body[0] == function | 0x80:
+            raise Exception("Modbus exception reply, code ", body[1])
+        return body[1:]
+
+    def read_coils(self, address: int, count: int):
+        """
+        :return: the coils as a bitmask, bit n is the coil at address + n
+        """
+        reply = self._call(READ_COILS, struct.pack(">HH", address, count))
+        return int.from_bytes(reply[1:1 + reply[0]], "little")
+
+    def read_registers(self, address: int, count: int):
+        """
+        :return: list of the register values
+        """
+        reply = self._call(READ_HOLDING_REGISTERS, struct.pack(">HH", address, count))
+        return list(struct.unpack(f">{reply[0] // 2}H", reply[1:1 + reply[0]]))
+
+    def write_coils(self, address: int, values: List[int]):
+        mask = 0
+        for index, value in enumerate(values):
+            if value:
+                mask |= 1 << index
+        data = mask.to_bytes((len(values) + 7) // 8, "little")
+        self._call(WRITE_MULTIPLE_COILS, struct.pack(">HHB", address, len(values), len(data)) + data)
+
+    def write_registers(self, address: int, values: List[int]):
+        self._call(WRITE_MULTIPLE_REGISTERS,
+                   struct.pack(f">HHB{len(values)}H", address, len(values), 2 * len(values), *values))
+
+    def _block(self, tag: str):
+        if tag not in self.map:
+            raise Exception(f"{self.name} has no {tag} channels")
+        return self.map[tag]
+
+    def _write(self, tag: str, data: Dict[str, Union[int, str]]):
+        address, count = self._block(tag)
+        values = {}
+        for key, value in data.items():
+            channel = int(key[len(tag):])
+            if channel >= count:
+                raise Exception(f"{tag} channel out of range ", channel)
+            # analog values are sent to the web server as HEX text
+            values[channel] = int(value, 16) if isinstance(value, str) else int(value)
+        first, last = min(values), max(values)
+        if last - first + 1 > len(values):
+            # the channels in between keep their state, so the span goes in one request instead of one per run
+            if tag == "DO":
+                mask = self.read_coils(address + first, last - first + 1)
+                current = [(mask >> index) & 1 for index in range(last - first + 1)]
+            else:
+                current = self.read_registers(address + first, last - first + 1)
+            for index, value in enumerate(current):
+                values.setdefault(first + index, value)
+        write = self.write_coils if tag == "DO" else self.write_registers
+        write(address + first, [values[channel] for channel in range(first, last + 1)])
+        return ParsedResponse(self.name, "OK", [])
+
+    def close(self):
+        """
+        closes the Modbus connection to ADAM
+        """
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def d_input(self, input_channel_id: Optional[int] = None):
+        """
+        :param input_channel_id: ignored, every digital input is read
+        :return: DigitalInput
+        """
+        address, count = self._block("DI")
+        return DigitalInput.from_mask(self.read_coils(address, count), count, self.name)
+
+    input = d_input
+
+    def d_output(self, data: Optional[Dict[str, int]] = None):
+        """
+        :param data: DigitalOutput object converted to dictionary as {"DO1":1,...}, None reads the outputs
+        :return: DigitalOutput when reading, ParsedResponse with status OK when writing
+        """
+        if data:
+            return self._write("DO", data)
+        address, count = self._block("DO")
+        return DigitalOutput.from_mask(self.read_coils(address, count), count)
+
+    def a_input(self, input_channel_id: Optional[int] = None):
+        """
+        :param input_channel_id: ignored, every analog input is read
+        :return: AnalogInput
+        """
+        address, count = self._block("AI")
+        return AnalogInput.from_values(self.read_registers(address, count), self.name)
+
+    def a_output(self, data: Optional[Dict[str, int]] = None):
+        """
+        :param data: AnalogOutput object converted to dictionary as {"AO1":"0FFF",...}, None reads the outputs
+        :return: AnalogOutput when reading, ParsedResponse with status OK when writing
+        """
+        if data:
+            return self._write("AO", data)
+        address, count = self._block("AO")
+        ao = AnalogOutput(quantity=count)
+        ao._do = {f"AO{index}": value for index, value in enumerate(self.read_registers(address, count))}
+        return ao
+
+    def a_input_range(self, input_channel_id: Optional[int] = None):
+        raise Exception("analog ranges are only available through the web server")
+
+    def a_output_range(self, data: Optional[Dict[str, int]] = None):
+        raise Exception("analog ranges are only available through the web server")
+
+    # the ADAM classes call the private reads of Requestor, the replies here are parsed already
+    _d_input = d_input
+    _d_output = d_output
+    _a_input = a_input
+    _a_output = a_output
+    _a_input_range = a_input_range
+    _a_output_range = a_output_range
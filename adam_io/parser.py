@@ -0,0 +1,142 @@
+"""
+Response Parser
+===============
+Single pass parser of the xml responses of ADAM
+
+ADAM-6000 responses always have the same flat layout, a root tag with a status attribute and
+one element per channel;
+
+<ADAM-6024 status="OK"><AI><ID>0</ID><RANGE>0143</RANGE><NAME>+/- 10 V</NAME>...</AI>...</ADAM-6024>
+
+so the fields are pulled out of the raw bytes with a single regular expression scan.
+Anything that does not look like that layout is handed to ElementTree.
+"""
+import re
+from xml.etree import ElementTree
+
+from . import metrics as _metrics
+from typing import Dict, List, Optional, Tuple, Union
+
+FIELDS = ("ID", "VALUE", "RANGE", "NAME", "MIN", "MAX", "UNIT")
+
+_ROOT = re.compile(rb'<([A-Za-z][\w.-]*)\s+status="([^"]*)"')
+_FIELD = re.compile(rb'<(ID|VALUE|RANGE|NAME|MIN|MAX|UNIT)>([^<]*)</\1>')
+_ID_VALUE = re.compile(rb'<ID>\s*(\d+)\s*</ID>\s*<VALUE>\s*([^<\s]*)\s*</VALUE>')
+
+
+class ParsedResponse:
+    """
+    Fields of an ADAM response
+
+    - name: root tag, e.g. ADAM-6024
+    - status: status attribute of the root, "OK" if the request was successful
+    - records: one dictionary per channel, field tag to text, e.g. {"ID": "0", "VALUE": "1"}
+    """
+
+    __slots__ = ("name", "status", "records")
+
+    def __init__(self, name: str, status: Optional[str], records: List[Dict[str, str]]):
+        self.name = name
+        self.status = status
+        self.records = records
+
+    def column(self, tag: str):
+        """
+        :param tag: one of ID, VALUE, RANGE, NAME, MIN, MAX, UNIT
+        :return: text of the tag for every channel that has it
+        """
+        return [record[tag] for record in self.records if tag in record]
+
+    def __repr__(self):
+        return f"ParsedResponse({self.name}, status={self.status}, records={self.records})"
+
+
+def parse_response(xml: Union[bytes, str], check_status: bool = True):
+    """
+    :param xml: response of ADAM, raw bytes or decoded string
+    :param check_status: raise an exception if the status of the response is not OK
+    :return: ParsedResponse
+    """
+    if _metrics._instrumented:
+        return _metrics._timed_parse(_parse_response, xml, check_status)
+    return _parse_response(xml, check_status)
+
+
+def _parse_response(xml, check_status):
+    if isinstance(xml, str):
+        xml = xml.encode('utf8')
+    response = _parse_fast(xml)
+    if response is None:
+        response = _parse_tree(xml)
+    if check_status and response.status != 'OK':
+        raise Exception("something wrong with the response, status is:", response.status)
+    return response
+
+
+def check_update(xml: Union[bytes, str, ParsedResponse]):
+    """
+    :param xml: response of ADAM to an update (POST) request, or its ParsedResponse
+    :return: ParsedResponse, raises an exception if the update was not successful
+    """
+    response = xml if isinstance(xml, ParsedResponse) else parse_response(xml, check_status=False)
+    if response.status != "OK":
+        raise Exception("Couldn't update output: ", response.status)
+    return response
+
+
+def parse_values(xml: Union[bytes, str]) -> Tuple[str, List[Tuple[int, Union[bytes, str]]]]:
+    """
+    Lighter parse for the value responses, only the ID and VALUE pairs are pulled out.
+    The values are left as text (bytes on the fast path), int() accepts both.
+
+    :param xml: response of ADAM, raw bytes or decoded string
+    :return: (name, [(id, value text), ...]), raises an exception if the status is not OK
+    """
+    if _metrics._instrumented:
+        return _metrics._timed_parse(_parse_values, xml)
+    return _parse_values(xml)
+
+
+def _parse_values(xml):
+    if isinstance(xml, str):
+        xml = xml.encode('utf8')
+    if b"&" not in xml and b"<!" not in xml:
+        root = _ROOT.search(xml)
+        if root is not None and root.group(2) == b"OK" and xml.rstrip().endswith(b"</" + root.group(1) + b">"):
+            pairs = _ID_VALUE.findall(xml, root.end())
+            if len(pairs) == xml.count(b"<ID>"):
+                return root.group(1).decode('ascii'), [(int(channel), value) for channel, value in pairs]
+    response = _parse_response(xml, True)
+    return response.name, [(int(record["ID"]), record["VALUE"]) for record in response.records if "VALUE" in record]
+
+
+def _parse_fast(xml: bytes):
+    # entities, CDATA and comments need a real xml parser
+    if b"&" in xml or b"<!" in xml:
+        return None
+    root = _ROOT.search(xml)
+    if root is None:
+        return None
+    name = root.group(1)
+    if not xml.rstrip().endswith(b"</" + name + b">"):
+        return None
+
+    records = []
+    record = None
+    for match in _FIELD.finditer(xml, root.end()):
+        tag = match.group(1).decode('ascii')
+        if tag == "ID":
+            record = {}
+            records.append(record)
+        elif record is None or tag in record:
+            # not the fixed layout, every channel starts with its ID
+            return None
+        record[tag] = match.group(2).decode('utf8').strip()
+    return ParsedResponse(name.decode('ascii'), root.group(2).decode('ascii'), records)
+
+
+def _parse_tree(xml: bytes):
+    root = ElementTree.fromstring(xml)
+    records = [{element.tag: (element.text or "").strip() for element in channel if element.tag in FIELDS}
+               for channel in root]
+    return ParsedResponse(root.tag, root.attrib.get('status'), [record for record in records if record])
@@ -0,0 +1,86 @@
+"""
+Device Profiles
+===============
+Channels of every supported ADAM-6000 model, the ADAM classes, the Modbus address maps and the
+simulator are all built from these.
+
+profile = get_profile("6052")
+profile.do          # 8
+adam = device_class("6052")(ip, username, password)
+
+New models are added with register_profile(DeviceProfile("6056", do=12)).
+"""
+from typing import Dict, Optional, Tuple
+
+
+class DeviceProfile:
+    """
+    Channel counts of an ADAM model
+
+    - model: model number, e.g. "6050"
+    - di, do, ai, ao: number of digital inputs, digital outputs, analog inputs and analog outputs
+    - modbus: channel type to (first address, count), coils for DI/DO and holding registers for AI/AO
+    """
+
+    __slots__ = ("model", "di", "do", "ai", "ao", "description", "modbus")
+
+    def __init__(self, model: str, di: int = 0, do: int = 0, ai: int = 0, ao: int = 0, description: str = "",
+                 modbus: Optional[Dict[str, Tuple[int, int]]] = None):
+        """
+        :param modbus: address map, defaults to the common ADAM-6000 one; DI from 00001, DO from 00017,
+            AI from 40001 and AO from 40011
+        """
+        self.model = model
+        self.di = di
+        self.do = do
+        self.ai = ai
+        self.ao = ao
+        self.description = description
+        if modbus is None:
+            modbus = {tag: (address, count) for tag, address, count in
+                      (("DI", 0, di), ("DO", 16, do), ("AI", 0, ai), ("AO", 10, ao)) if count}
+        self.modbus = modbus
+
+    @property
+    def name(self):
+        return f"ADAM-{self.model}"
+
+    def __repr__(self):
+        return f"DeviceProfile({self.model}, di={self.di}, do={self.do}, ai={self.ai}, ao={self.ao})"
+
+
+PROFILES = {}  # type: Dict[str, DeviceProfile]
+
+
+def register_profile(profile: DeviceProfile):
+    """
+    :param profile: profile of a model, replaces the one registered under the same model
+    :return: profile
+    """
+    PROFILES[profile.model] = profile
+    return profile
+
+
+def get_profile(model: str):
+    """
+    :param model: "6050", "ADAM-6050" and "ADAM-6050D" are all accepted
+    :return: DeviceProfile
+    """
+    name = str(model).upper().replace("ADAM-", "").replace("ADAM", "").rstrip("D")
+    if name not in PROFILES:
+        raise Exception("unsupported ADAM model ", model)
+    return PROFILES[name]
+
+
+for _profile in (
+        DeviceProfile("6015", ai=7, description="7 RTD inputs"),
+        DeviceProfile("6017", ai=8, do=2, description="8 analog inputs, 2 digital outputs"),
+        DeviceProfile("6018", ai=8, do=8, description="8 thermocouple inputs, 8 digital outputs"),
+        DeviceProfile("6024", di=2, do=2, ai=6, ao=2, description="6 analog inputs, 2 analog outputs, 2 DI, 2 DO"),
+        DeviceProfile("6050", di=12, do=6, description="12 digital inputs, 6 digital outputs"),
+        DeviceProfile("6051", di=12, do=2, description="12 digital inputs, 2 digital outputs"),
+        DeviceProfile("6052", di=8, do=8, description="8 digital inputs, 8 digital outputs"),
+        DeviceProfile("6060", di=6, do=6, description="6 digital inputs, 6 relay outputs"),
+        DeviceProfile("6066", di=6, do=6, description="6 digital inputs, 6 power relay outputs"),
+):
+    register_profile(_profile)
@@ -0,0 +1,231 @@
+"""
+Pulses and Sequences
+====================
+Timed digital output patterns without a sleeping thread per pulse
+
+scheduler = PulseScheduler(adam)
+scheduler.start()
+gate = scheduler.pulse(2, 0.350)                            # DO2 high for 350 ms
+wave = scheduler.sequence([(0.0, 0, 1), (0.1, 1, 1), (0.2, 0, 0), (0.3, 1, 0)])
+wave.wait()
+for step in wave.steps:
+    print(step.channel, step.value, step.lateness)
+
+Steps are kept in a heap ordered by deadline (time.monotonic()) and run by a single timer thread.
+Steps that are due together are merged into one DigitalOutput and written with one request; a step
+is never sent before its deadline, and two steps of the same channel always go in separate requests,
+so a pulse shorter than a request still reaches the output.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .digital_io import DigitalOutput
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Step:
+    """
+    A single output change of a sequence
+
+    - scheduled: time.monotonic() the change was due
+    - actual: time.monotonic() at the middle of the request that made the change, None until it ran
+    - error: exception of the request, if it failed
+    """
+
+    __slots__ = ("channel", "value", "scheduled", "actual", "error")
+
+    def __init__(self, channel: int, value: int, scheduled: float):
+        self.channel = channel
+        self.value = value
+        self.scheduled = scheduled
+        self.actual = None
+        self.error = None
+
+    @property
+    def lateness(self):
+        """
+        :return: seconds between the scheduled and the actual actuation, None until it ran
+        """
+        return None if self.actual is None else self.actual - self.scheduled
+
+    def __repr__(self):
+        return f"Step(DO{self.channel}={self.value}, scheduled={self.scheduled:.3f}, actual={self.actual})"
+
+
+class OutputSequence:
+    """
+    Steps scheduled together, done once every one of them ran
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self._remaining = len(steps)
+        self._done = threading.Event()
+        if not steps:
+            self._done.set()
+
+    def _step_done(self):
+        self._remaining -= 1
+        if not self._remaining:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        :param timeout: seconds to wait, None to wait until the last step ran
+        :return: True if every step ran
+        """
+        return self._done.wait(timeout)
+
+    def report(self):
+        """
+        :return: [(channel, value, scheduled, actual), ...] in the order of the steps
+        """
+        return [(step.channel, step.value, step.scheduled, step.actual) for step in self.steps]
+
+
+class PulseScheduler:
+    """
+    Runs pulses and sequences on the digital outputs of an ADAM from one timer thread
+    """
+
+    def __init__(self, adam, tick: float = 0.002):
+        """
+        :param adam: Adam6050D or Adam6024D
+        :param tick: kept for compatibility, steps are only written once their deadline passed and the ones
+            due at the same time share a request
+        """
+        self.adam = adam
+        self.tick = tick
+        self.writes = 0
+        self.errors = 0
+        # 6024 names its digital output method d_output, 6050 names it output
+        self._write = adam.d_output if hasattr(adam, "d_output") else adam.output
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    def sequence(self, steps: Iterable[Tuple[float, int, int]], start: Optional[float] = None):
+        """
+        :param steps: (offset in seconds from start, DO index, value)
+        :param start: time.monotonic() of offset 0, defaults to now
+        :return: OutputSequence
+        """
+        start = time.monotonic() if start is None else start
+        scheduled = []
+        for offset, channel, value in steps:
+            if type(value) is not int or type(channel) is not int:
+                raise TypeError("digital output id and value should be integer")
+            scheduled.append(Step(channel, value, start + offset))
+        sequence = OutputSequence(scheduled)
+        with self._condition:
+            for step in scheduled:
+                heapq.heappush(self._heap, (step.scheduled, next(self._counter), step, sequence))
+            self._condition.notify()
+        return sequence
+
+    def pulse(self, channel: int, duration: float, delay: float = 0.0, value: int = 1):
+        """
+        :param channel: DO index
+        :param duration: seconds the output is held at value
+        :param delay: seconds before the pulse starts
+        :param value: value during the pulse, the output is set to the other value afterwards
+        :return: OutputSequence of the two steps
+        """
+        return self.sequence([(delay, channel, value), (delay + duration, channel, 0 if value else 1)])
+
+    def pending(self):
+        with self._condition:
+            return len(self._heap)
+
+    def _due(self):
+        """
+        :return: the entries whose deadline passed, at most one per channel, None once stopped
+        """
+        with self._condition:
+            while True:
+                if self._stop:
+                    return None
+                if self._heap:
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+            now = time.monotonic()
+            due = []
+            channels = set()
+            # the next step of a channel already in the batch goes in the next request, merging them
+            # would only write the last value
+            while self._heap and self._heap[0][0] <= now and self._heap[0][2].channel not in channels:
+                entry = heapq.heappop(self._heap)
+                channels.add(entry[2].channel)
+                due.append(entry)
+        return due
+
+    def _run_due(self, due):
+        """
+        write the entries with one request
+        """
+        output = DigitalOutput(quantity=0)
+        for _, _, step, _ in due:
+            output[step.channel] = step.value
+        start = time.monotonic()
+        error = None
+        try:
+            self._write(output)
+        except Exception as err:
+            error = err
+            self.errors += 1
+            logger.exception("scheduled digital output write failed")
+        actual = (start + time.monotonic()) / 2
+        self.writes += 1
+        for _, _, step, sequence in due:
+            step.actual = actual
+            step.error = error
+            sequence._step_done()
+
+    def _run(self):
+        while True:
+            due = self._due()
+            if due is None:
+                return
+            self._run_due(due)
+
+    def start(self):
+        """
+        start the timer thread
+        """
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="adam-pulse", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        stop the timer thread, steps not yet due stay scheduled
+        """
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
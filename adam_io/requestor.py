@@ -1,25 +1,414 @@
 import base64
+import select
+import threading
+import time
+from http.client import HTTPConnection, HTTPException
+from urllib.error import HTTPError
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
+from . import metrics
+from .metrics import RequestTiming, TimingHook
+from .resilience import DEFAULT_TIMEOUT, CircuitBreaker, RetryPolicy, current_timeout
+from .scheduler import RequestScheduler, current_priority
+from .singleflight import SingleFlight
 from .utils import URI
 
+# errors raised when the device has silently dropped an idle keep-alive socket
+STALE_CONNECTION_ERRORS = (HTTPException, ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+# errors worth retrying a read for, timeouts included; HTTPError is an OSError too but means ADAM answered
+RETRYABLE_ERRORS = (OSError, HTTPException)
+
+
+class LocalTimeoutError(TimeoutError):
+    """
+    the deadline of a request ran out before it was sent, waiting for a connection of the pool;
+    it says nothing about the device
+    """
+
+
+class PoolStats:
+    """
+    Counters of a ConnectionPool
+
+    - hits: requests served on an already open connection
+    - misses: requests that had to open a new connection
+    - reconnects: requests retried on a new connection because the device dropped the idle one
+    """
+
+    __slots__ = ("hits", "misses", "reconnects")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "reconnects": self.reconnects}
+
+    def __repr__(self):
+        return f"PoolStats(hits={self.hits}, misses={self.misses}, reconnects={self.reconnects})"
+
+
+class ConnectionPool:
+    """
+    Bounded pool of persistent HTTP/1.1 connections to a single ADAM
+
+    ADAM web servers only accept a handful of sockets, so at most max_size connections are open
+    at any time; callers block until one is released.
+    """
+
+    def __init__(self, host: str, port: int = 80, max_size: int = 2, timeout: Optional[float] = None):
+        """
+        :param host: ADAM ip
+        :param port: ADAM web server port
+        :param max_size: maximum number of simultaneously open connections
+        :param timeout: socket timeout in seconds, None blocks forever
+        """
+        if max_size < 1:
+            raise Exception("connection pool size should be at least 1")
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stats = PoolStats()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        return HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self, deadline: Optional[float] = None):
+        """
+        :param deadline: time.monotonic() to give up waiting for a free connection, None waits forever
+        :return: (connection, reused) reused is False if the connection was just created
+        """
+        if deadline is None:
+            self._slots.acquire()
+        elif not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise LocalTimeoutError("deadline exceeded waiting for a connection to ADAM")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def release(self, connection: HTTPConnection, reusable: bool = True):
+        """
+        :param connection: connection taken with acquire
+        :param reusable: False closes the connection instead of returning it to the pool
+        """
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None,
+                timing: Optional[RequestTiming] = None, deadline: Optional[float] = None):
+        """
+        Make a request on a pooled connection.
+        A reused connection the device has closed is replaced before the request is sent. If a GET still
+        fails on a reused connection, it is retried once on a new one; a POST is not, it may have reached ADAM.
+
+        :param timing: if given, the phases of the request are recorded in it
+        :param deadline: time.monotonic() the request has to be done by, every blocking socket operation
+            is bounded by the time left. None uses the timeout of the pool
+        :return: (status, reason, headers, body)
+        """
+        send = self._send if timing is None else self._send_timed
+        connection, reused = self.acquire(deadline)
+        try:
+            if reused and self._dropped(connection):
+                # nothing was sent yet, so even a write can go on a new connection
+                connection.close()
+                with self._lock:
+                    self.stats.reconnects += 1
+                reused = False
+            try:
+                self._set_timeout(connection, deadline)
+                response = send(connection, method, path, body, headers, timing)
+            except STALE_CONNECTION_ERRORS:
+                if not reused or method != "GET":
+                    raise
+                connection.close()
+                with self._lock:
+                    self.stats.reconnects += 1
+                reused = False
+                self._set_timeout(connection, deadline)
+                response = send(connection, method, path, body, headers, timing)
+        except BaseException:
+            self.release(connection, reusable=False)
+            raise
+
+        with self._lock:
+            if reused:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        status, reason, response_headers, data, will_close = response
+        self.release(connection, reusable=not will_close)
+        return status, reason, response_headers, data
+
+    @staticmethod
+    def _dropped(connection: HTTPConnection):
+        """
+        :return: True if the device closed the idle connection, an idle socket only turns readable then
+        """
+        sock = connection.sock
+        if sock is None:
+            return False
+        try:
+            return bool(select.select([sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _set_timeout(self, connection: HTTPConnection, deadline: Optional[float]):
+        if deadline is None:
+            timeout = self.timeout
+        else:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                raise LocalTimeoutError("deadline exceeded before the request to ADAM was sent")
+        if connection.timeout != timeout:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+
+    @staticmethod
+    def _send(connection, method, path, body, headers, timing):
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        return response.status, response.reason, response.headers, data, response.will_close
+
+    @staticmethod
+    def _send_timed(connection, method, path, body, headers, timing):
+        phases = timing.phases
+        phases.clear()
+        start = time.perf_counter()
+        if connection.sock is None:
+            connection.connect()
+            phases["connect"] = time.perf_counter() - start
+        mark = time.perf_counter()
+        connection.request(method, path, body=body, headers=headers or {})
+        now = time.perf_counter()
+        phases["send"], mark = now - mark, now
+        response = connection.getresponse()
+        now = time.perf_counter()
+        phases["first_byte"], mark = now - mark, now
+        data = response.read()
+        now = time.perf_counter()
+        phases["body"] = now - mark
+        timing.total = now - start
+        timing.status = response.status
+        timing.bytes_sent = len(body) if body else 0
+        timing.bytes_received = len(data)
+        return response.status, response.reason, response.headers, data, response.will_close
+
+    def close(self):
+        """
+        closes every idle connection, connections in use are closed when they are released
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
 
 class Requestor:
-    def __init__(self, ip: str, username: str, password: str):
+    def __init__(self, ip: str, username: str, password: str, port: int = 80, pool_size: int = 2,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, scheduler: Optional[RequestScheduler] = None,
+                 single_flight: Optional[SingleFlight] = None):
         """
         For now no unauthorized requests are possible
 
         :param ip: ADAM ip
         :param username: ADAM username
         :param password: ADAM password
+        :param port: ADAM web server port
+        :param pool_size: maximum number of persistent connections kept open to ADAM
+        :param timeout: seconds a call may take, retries included, None blocks forever;
+            request_timeout overrides it for single calls
+        :param retry: retries of the reads that fail on a connection error or a timeout, None does not retry
+        :param breaker: circuit breaker of this ADAM, None never fails fast
+        :param scheduler: orders the requests of every user of this ADAM by priority, None sends them right away
+        :param single_flight: concurrent reads of the same path share one request, None sends every read
         """
         auth_str = f"{username}:{password}"
         encoded_auth_str = base64.b64encode(auth_str.encode('ascii')).decode('utf-8')
         self.headers = {"Content-Type": "application/x-www-form-urlencoded",
                         "Authorization": "Basic " + encoded_auth_str}
-        self.base_url = f"http://{ip}"
+        self.base_url = f"http://{ip}" if port == 80 else f"http://{ip}:{port}"
+        self.device = ip if port == 80 else f"{ip}:{port}"
+        self.hooks = []
+        self.timeout = timeout
+        self.retry = retry
+        self.breaker = breaker
+        self.scheduler = scheduler
+        self.single_flight = single_flight
+        if breaker is not None:
+            breaker.probe = self._probe
+        self._guarded = timeout is not None or retry is not None or breaker is not None
+        self.pool = ConnectionPool(ip, port, max_size=pool_size, timeout=timeout)
+
+        # urls that do not depend on the arguments are built once
+        self._d_input_all = URI.DIGITAL_INPUT + URI.ALL + URI.VALUE
+        self._d_output_all = URI.DIGITAL_OUTPUT + URI.ALL + URI.VALUE
+        self._a_input_all = URI.ANALOG_INPUT + URI.ALL + URI.VALUE
+        self._a_input_range_all = URI.ANALOG_INPUT + URI.ALL + URI.RANGE
+        self._a_output_all = URI.ANALOG_OUTPUT + URI.ALL + URI.VALUE
+        self._a_output_range_all = URI.ANALOG_OUTPUT + URI.ALL + URI.RANGE
+        self._get_headers = {"Authorization": self.headers["Authorization"]}
+        self._channel_paths = {}
+
+    def _channel_path(self, base: str, channel: int, suffix: str):
+        """
+        :return: path of a single channel, built the first time it is asked for
+        """
+        key = (base, channel, suffix)
+        path = self._channel_paths.get(key)
+        if path is None:
+            path = self._channel_paths[key] = base + "/" + str(channel) + suffix
+        return path
+
+    def instrument(self, hook: TimingHook):
+        """
+        :param hook: TimingHook told about every request from now on, e.g. a MetricsCollector
+        """
+        metrics._add_hook(self, hook)
+
+    def uninstrument(self, hook: TimingHook):
+        metrics._remove_hook(self, hook)
+
+    def _get(self, path: str):
+        if self.single_flight is not None:
+            priority = current_priority()
+            # the read of a read-modify-write needs the current state and must not wait behind a shared read
+            if priority != RequestScheduler.ACTUATION:
+                # reads only share the request of reads of the same priority, they would wait in its queue
+                # and get its StaleRequestError otherwise
+                return self.single_flight.do((path, priority), self._get_scheduled, path)
+        return self._get_scheduled(path)
+
+    def _get_scheduled(self, path: str):
+        if self.scheduler is not None:
+            with self.scheduler.slot(current_priority()):
+                return self._get_now(path)
+        return self._get_now(path)
+
+    def _get_now(self, path: str):
+        if self._guarded or current_timeout(None) is not None:
+            return self._guard("GET", path, None, self._get_headers, self.retry)
+        return self._send("GET", path, None, self._get_headers)
+
+    def _post(self, path: str, data: Union[Dict[str, int], bytes]):
+        # bodies that never change, like the one of on(), are passed already encoded
+        params = data if isinstance(data, bytes) else urlencode(data).encode('utf-8')
+        if self.single_flight is None:
+            return self._post_scheduled(path, params)
+        # reads that overlap the write may see either state, none of them is remembered
+        self._forget(path)
+        try:
+            return self._post_scheduled(path, params)
+        finally:
+            self._forget(path)
+
+    def _forget(self, path: str):
+        for priority in (RequestScheduler.CONTROL, RequestScheduler.BACKGROUND):
+            self.single_flight.forget((path, priority))
+
+    def _post_scheduled(self, path: str, params: bytes):
+        if self.scheduler is not None:
+            with self.scheduler.slot(RequestScheduler.ACTUATION):
+                return self._post_now(path, params)
+        return self._post_now(path, params)
+
+    def _post_now(self, path: str, params: bytes):
+        if self._guarded or current_timeout(None) is not None:
+            # writes are not retried, the first attempt may have reached ADAM
+            return self._guard("POST", path, params, self.headers, None)
+        return self._send("POST", path, params, self.headers)
+
+    def _guard(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str],
+               retry: Optional[RetryPolicy]):
+        breaker = self.breaker
+        if breaker is not None:
+            breaker.check()
+        timeout = current_timeout(self.timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delays = retry.delays() if retry is not None else iter(())
+        failed = False
+        while True:
+            try:
+                data = self._send(method, path, body, headers, deadline)
+            except HTTPError:
+                # ADAM answered, it is reachable
+                if breaker is not None:
+                    breaker.success()
+                raise
+            except LocalTimeoutError:
+                # contention for the local pool is not a failure of the device, unless an attempt before failed
+                if breaker is not None and failed:
+                    breaker.failure()
+                raise
+            except RETRYABLE_ERRORS:
+                failed = True
+                delay = next(delays, None)
+                if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+                    if breaker is not None:
+                        breaker.failure()
+                    raise
+                time.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.success()
+            return data
+
+    def _probe(self):
+        deadline = time.monotonic() + (self.timeout or self.breaker.probe_interval)
+        self._send("GET", self._d_input_all, None, self._get_headers, deadline)
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str],
+              deadline: Optional[float] = None):
+        if self.hooks:
+            return self._timed(method, path, body, headers, deadline)
+        status, reason, response_headers, data = self.pool.request(method, path, body=body, headers=headers,
+                                                                   deadline=deadline)
+        return self._check(path, status, reason, response_headers, data)
+
+    def _timed(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str],
+               deadline: Optional[float]):
+        timing = RequestTiming(self.device, method, path)
+        start = time.perf_counter()
+        try:
+            status, reason, response_headers, data = self.pool.request(method, path, body=body, headers=headers,
+                                                                       timing=timing, deadline=deadline)
+        except Exception as err:
+            timing.status = None
+            timing.error = err
+            timing.total = time.perf_counter() - start
+            metrics._finished(self.hooks, timing)
+            raise
+        metrics._finished(self.hooks, timing)
+        return self._check(path, status, reason, response_headers, data)
+
+    def _check(self, path, status, reason, headers, data):
+        # behave like urlopen did, non 2xx responses are raised
+        if status >= 300:
+            raise HTTPError(self.base_url + path, status, reason, headers, None)
+        return data
+
+    def close(self):
+        """
+        closes the idle persistent connections to ADAM
+        """
+        if self.breaker is not None:
+            self.breaker.close()
+        self.pool.close()
 
     def d_input(self, input_channel_id: Optional[int] = None):
         """
@@ -29,14 +418,10 @@ class Requestor:
         :param input_channel_id: single input is requested, none returns all digital inputs
         :return: ADAM response, xml response with status code/message
         """
-        if input_channel_id:
-            input_channel_id = "/" + str(input_channel_id)
-            url = self.base_url + URI.DIGITAL_INPUT + input_channel_id + URI.VALUE
-        else:
-            url = self.base_url + URI.DIGITAL_INPUT + URI.ALL + URI.VALUE
-        request = Request(url, headers=self.headers)
-        response = urlopen(request)
-        return response.read().decode('utf8')
+        return self._d_input(input_channel_id).decode('utf8')
+
+    # Adam6050D calls its digital input read "input"
+    input = d_input
 
     def d_output(self, data: Optional[Dict[str, int]] = None):
         """
@@ -46,15 +431,7 @@ class Requestor:
         :param data: DigitalOutput object converted to dictionary as {"DO1":1,...}
         :return: ADAM response, xml response with status code/message
         """
-        url = self.base_url + URI.DIGITAL_OUTPUT + URI.ALL + URI.VALUE
-        if data:
-            params = urlencode(data).encode('utf-8')
-            request = Request(url, data=params, headers=self.headers)
-        else:
-            request = Request(url, headers=self.headers)
-
-        response = urlopen(request)
-        return response.read().decode('utf8')
+        return self._d_output(data).decode('utf8')
 
     def a_input(self, input_channel_id: Optional[int] = None):
         """
@@ -64,15 +441,8 @@ class Requestor:
         :param input_channel_id: single input is requested, none returns all analog inputs
         :return: ADAM response, xml response with status code/message
         """
-        if input_channel_id:
-            input_channel_id = "/" + str(input_channel_id)
-            url = self.base_url + URI.ANALOG_INPUT + input_channel_id + URI.VALUE
-        else:
-            url = self.base_url + URI.ANALOG_INPUT + URI.ALL + URI.VALUE
-        request = Request(url, headers=self.headers)
-        response = urlopen(request)
-        return response.read().decode('utf8')
-    
+        return self._a_input(input_channel_id).decode('utf8')
+
     def a_input_range(self, input_channel_id: Optional[int] = None):
         """
         if the requests analog output index is out of bounds,
@@ -81,14 +451,7 @@ class Requestor:
         :param input_channel_id: single input is requested, none returns all analog inputs
         :return: ADAM response, xml response with status code/message
         """
-        if input_channel_id:
-            input_channel_id = "/" + str(input_channel_id)
-            url = self.base_url + URI.ANALOG_INPUT + input_channel_id + URI.RANGE
-        else:
-            url = self.base_url + URI.ANALOG_INPUT + URI.ALL + URI.RANGE
-        request = Request(url, headers=self.headers)
-        response = urlopen(request)
-        return response.read().decode('utf8')
+        return self._a_input_range(input_channel_id).decode('utf8')
 
     def a_output(self, data: Optional[Dict[str, int]] = None):
         """
@@ -98,16 +461,8 @@ class Requestor:
         :param data: ANALOGOutput object converted to dictionary as {"AO1":1,...}
         :return: ADAM response, xml response with status code/message
         """
-        url = self.base_url + URI.ANALOG_OUTPUT + URI.ALL + URI.VALUE
-        if data:
-            params = urlencode(data).encode('utf-8')
-            request = Request(url, data=params, headers=self.headers)
-        else:
-            request = Request(url, headers=self.headers)
-        
-        response = urlopen(request)
-        return response.read().decode('utf8')
-    
+        return self._a_output(data).decode('utf8')
+
     def a_output_range(self, data: Optional[Dict[str, int]] = None):
         """
         if the requests analog output index is out of bounds,
@@ -116,12 +471,36 @@ class Requestor:
         :param data: ANALOGOutput object converted to dictionary as {"AO1":1,...}
         :return: ADAM response, xml response with status code/message
         """
-        url = self.base_url + URI.ANALOG_OUTPUT + URI.ALL + URI.RANGE
+        return self._a_output_range(data).decode('utf8')
+
+    # the ADAM classes read the undecoded responses, the parsers work on the raw bytes
+
+    def _d_input(self, input_channel_id: Optional[int] = None):
+        if input_channel_id:
+            return self._get(self._channel_path(URI.DIGITAL_INPUT, input_channel_id, URI.VALUE))
+        return self._get(self._d_input_all)
+
+    def _d_output(self, data: Optional[Union[Dict[str, int], bytes]] = None):
         if data:
-            params = urlencode(data).encode('utf-8')
-            request = Request(url, data=params, headers=self.headers)
-        else:
-            request = Request(url, headers=self.headers)
-        
-        response = urlopen(request)
-        return response.read().decode('utf8')
\ No newline at end of file
+            return self._post(self._d_output_all, data)
+        return self._get(self._d_output_all)
+
+    def _a_input(self, input_channel_id: Optional[int] = None):
+        if input_channel_id:
+            return self._get(self._channel_path(URI.ANALOG_INPUT, input_channel_id, URI.VALUE))
+        return self._get(self._a_input_all)
+
+    def _a_input_range(self, input_channel_id: Optional[int] = None):
+        if input_channel_id:
+            return self._get(self._channel_path(URI.ANALOG_INPUT, input_channel_id, URI.RANGE))
+        return self._get(self._a_input_range_all)
+
+    def _a_output(self, data: Optional[Union[Dict[str, int], bytes]] = None):
+        if data:
+            return self._post(self._a_output_all, data)
+        return self._get(self._a_output_all)
+
+    def _a_output_range(self, data: Optional[Union[Dict[str, int], bytes]] = None):
+        if data:
+            return self._post(self._a_output_range_all, data)
+        return self._get(self._a_output_range_all)
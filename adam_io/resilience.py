@@ -0,0 +1,179 @@
+"""
+Retries and Circuit Breaker
+===========================
+Keeps an unreachable ADAM from stalling the threads that talk to it
+
+adam = Adam6050D(ip, username, password, timeout=0.5, retry=RetryPolicy(attempts=3),
+                 breaker=CircuitBreaker(failure_threshold=3))
+
+- timeout bounds every call, the retries included; it defaults to DEFAULT_TIMEOUT seconds, None blocks
+  forever, and request_timeout overrides it for the calls of one thread:
+
+with request_timeout(0.2):
+    adam.input()
+
+- reads that fail on a connection error or a timeout are retried with a jittered exponential backoff,
+  writes are never retried
+- after failure_threshold failed calls in a row the breaker opens and every call fails right away
+  with CircuitOpenError, while a background thread probes the device until it answers again
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# seconds a call to ADAM may take unless told otherwise, well above the response time of a healthy device
+DEFAULT_TIMEOUT = 5.0
+
+_local = threading.local()
+
+
+class CircuitOpenError(Exception):
+    """
+    raised instead of making a request while the circuit breaker of the device is open
+    """
+
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff, e.g. attempts=3 backoff=0.05 waits ~0.05s then ~0.1s
+    """
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.05, max_backoff: float = 1.0, jitter: float = 0.5):
+        """
+        :param attempts: total number of attempts, the first one included
+        :param backoff: seconds before the first retry, doubled for every following retry
+        :param max_backoff: upper bound of a single wait
+        :param jitter: fraction of every wait that is randomized, so devices do not get retried in lockstep
+        """
+        if attempts < 1:
+            raise Exception("retry attempts should be at least 1")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def delays(self):
+        """
+        :return: the waits before each retry
+        """
+        for retry in range(self.attempts - 1):
+            delay = min(self.max_backoff, self.backoff * (2 ** retry))
+            yield delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """
+    Per device circuit breaker, do not share one between devices
+
+    - state: CLOSED while calls go through, OPEN while they fail fast
+    - failures: failed calls in a row
+    - rejected: calls refused while open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, failure_threshold: int = 3, probe_interval: float = 2.0):
+        """
+        :param failure_threshold: failed calls in a row that open the breaker
+        :param probe_interval: seconds between two probes of the device while open
+        """
+        if failure_threshold < 1:
+            raise Exception("failure_threshold should be at least 1")
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at = None
+        # set by the Requestor, a cheap request that raises if the device is still unreachable
+        self.probe = None  # type: Optional[Callable[[], object]]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """
+        raises CircuitOpenError if calls should not be made
+        """
+        if self.state is self.CLOSED:
+            return
+        with self._lock:
+            if self.state is self.CLOSED:
+                return
+            # without a probe, let a single call through once in a while to find out
+            if self.probe is None and time.monotonic() - self.opened_at >= self.probe_interval:
+                self.opened_at = time.monotonic()
+                return
+            self.rejected += 1
+        raise CircuitOpenError("device is unreachable, circuit breaker is open")
+
+    def success(self):
+        if self.failures or self.state is not self.CLOSED:
+            with self._lock:
+                self.failures = 0
+                self.state = self.CLOSED
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state is self.CLOSED and self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                logger.warning("circuit breaker opened after %d failures", self.failures)
+                if self.probe is not None and self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._probe_loop, name="adam-breaker-probe",
+                                                    daemon=True)
+                    self._thread.start()
+
+    def _probe_loop(self):
+        try:
+            while not self._stop.wait(self.probe_interval):
+                try:
+                    self.probe()
+                except Exception:
+                    continue
+                self.success()
+                logger.info("circuit breaker closed, device answered the probe")
+                return
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def close(self):
+        """
+        stop probing the device
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+
+@contextmanager
+def request_timeout(seconds: Optional[float]):
+    """
+    :param seconds: seconds every call made by this thread inside the with block may take, instead of the
+        timeout of the device; None keeps the timeout of the device
+    """
+    previous = getattr(_local, "timeout", None)
+    _local.timeout = seconds
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def current_timeout(default: Optional[float]):
+    """
+    :return: the timeout set with request_timeout for this thread, default outside of it
+    """
+    timeout = getattr(_local, "timeout", None)
+    return default if timeout is None else timeout
@@ -0,0 +1,331 @@
+"""
+Sample Log
+==========
+Append-only binary log of digital input states and raw analog values, for long histories
+
+with SampleLog("/data/adam-log", ai_channels=6) as log:
+    log.append("192.168.1.10", adam.input(), adam.a_input())
+
+reader = SampleReader("/data/adam-log")
+samples = reader.read(start, end)       # NumPy record array with timestamp, device, di, ai fields
+
+Every record has the same width; timestamp (float64, time.time()), device id (uint32, IPv4
+addresses are stored as their integer), DI bitmask (uint32) and the raw value of every analog input
+(uint16). Records go into memory-mapped segment files of a fixed number of records, a new segment
+is started when one is full. Timestamps never go backwards, so a time range is found with a binary
+search over the first and last timestamp of the segments, then one inside each segment.
+
+The reader hands out NumPy views straight into the mapped files when NumPy is installed, otherwise
+the records are decoded into tuples.
+"""
+import bisect
+import ipaddress
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .analog_io import AnalogInput
+from .digital_io import DigitalInput
+from typing import List, Optional, Sequence, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"ADAMLOG1"
+# magic, ai channels, record size, capacity, count
+_HEADER = struct.Struct("<8sHHQQ")
+HEADER_SIZE = 64
+# offset of the record count in the header, rewritten after every append
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = 20
+
+
+def device_id(device: Union[int, str]):
+    """
+    :param device: integer id or IPv4 address
+    :return: the id stored in the records
+    """
+    if isinstance(device, str):
+        return int(ipaddress.IPv4Address(device))
+    return device
+
+
+def _record_struct(ai_channels: int):
+    record = struct.Struct(f"<dII{ai_channels}H")
+    # records are padded to 8 bytes so the timestamps stay aligned
+    size = (record.size + 7) // 8 * 8
+    return record, size
+
+
+def _segment_name(number: int):
+    return f"segment-{number:06d}.log"
+
+
+def _segment_number(filename: str):
+    return int(os.path.basename(filename)[len("segment-"):-len(".log")])
+
+
+def _segments(path: str):
+    """
+    :return: segment files of the log, oldest first; older ones may have been deleted
+    """
+    names = [name for name in os.listdir(path) if name.startswith("segment-") and name.endswith(".log")
+             and name[len("segment-"):-len(".log")].isdigit()]
+    return [os.path.join(path, name) for name in sorted(names, key=_segment_number)]
+
+
+class SampleLog:
+    """
+    Writer of a sample log directory, only one writer per directory
+    """
+
+    def __init__(self, path: str, ai_channels: int = 8, segment_records: int = 1 << 20):
+        """
+        :param path: directory of the segment files, created if needed
+        :param ai_channels: number of analog values per record, fixed for the whole log
+        :param segment_records: number of records per segment file
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ai_channels = ai_channels
+        self.segment_records = segment_records
+        self._record, self.record_size = _record_struct(ai_channels)
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._last = float("-inf")
+
+        segments = _segments(path)
+        # numbers keep going up from the newest segment, the oldest ones may have been deleted
+        self._number = _segment_number(segments[-1]) + 1 if segments else 0
+        if segments:
+            self._open(segments[-1])
+            if self._count:
+                self._last = self._record.unpack_from(self._map, self._offset(self._count - 1))[0]
+        else:
+            self._create()
+
+    def _offset(self, index: int):
+        return HEADER_SIZE + index * self.record_size
+
+    def _open(self, filename: str):
+        self._file = open(filename, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, ai_channels, record_size, capacity, count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or ai_channels != self.ai_channels:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            if magic != MAGIC:
+                raise Exception("not a sample log segment ", filename)
+            raise Exception("the log was written with a different number of analog channels ", ai_channels)
+        self._capacity = capacity
+        self._count = count
+
+    def _create(self):
+        filename = os.path.join(self.path, _segment_name(self._number))
+        self._number += 1
+        with open(filename, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, self.ai_channels, self.record_size, self.segment_records, 0))
+            f.truncate(self._offset(self.segment_records))
+        self._open(filename)
+
+    def _rotate(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+        self._create()
+
+    def append(self, device: Union[int, str], di=0, ai: Sequence[int] = (), timestamp: Optional[float] = None):
+        """
+        :param device: device id or IPv4 address
+        :param di: DigitalInput or DI bitmask
+        :param ai: AnalogInput or raw analog values, missing channels are written as 0
+        :param timestamp: time.time() of the sample, defaults to now; may not be older than the previous one
+        """
+        if isinstance(di, DigitalInput):
+            di = di.to_mask()
+        if isinstance(ai, AnalogInput):
+            ai = ai.values()
+        values = list(ai[:self.ai_channels])
+        if len(values) < self.ai_channels:
+            values += [0] * (self.ai_channels - len(values))
+        device = device_id(device)
+        with self._lock:
+            if timestamp is None:
+                timestamp = max(time.time(), self._last)
+            elif timestamp < self._last:
+                raise Exception("sample log timestamps can not go backwards ", timestamp)
+            if self._count == self._capacity:
+                self._rotate()
+            self._record.pack_into(self._map, self._offset(self._count), timestamp, device, di, *values)
+            self._count += 1
+            # the count is written last, readers never see a half written record
+            _COUNT.pack_into(self._map, _COUNT_OFFSET, self._count)
+            self._last = timestamp
+
+    def flush(self):
+        """
+        write the mapped pages to disk
+        """
+        with self._lock:
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _Segment:
+    __slots__ = ("filename", "file", "map", "count", "first", "last")
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = open(filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = 0
+        self.first = self.last = None
+
+
+class SampleReader:
+    """
+    Reader of a sample log directory, can be used while a SampleLog is appending to it
+
+    NumPy views keep their segment mapped; drop them before calling close().
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: directory of the segment files
+        """
+        self.path = path
+        self.segments = []  # type: List[_Segment]
+        self.ai_channels = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        pick up the records and segments appended since the last refresh
+        """
+        known = len(self.segments)
+        newest = _segment_number(self.segments[-1].filename) if self.segments else -1
+        for filename in _segments(self.path):
+            if _segment_number(filename) > newest:
+                self.segments.append(_Segment(filename))
+        for segment in self.segments[max(known - 1, 0):]:
+            magic, ai_channels, record_size, _, count = _HEADER.unpack_from(segment.map)
+            if magic != MAGIC:
+                raise Exception("not a sample log segment ", segment.filename)
+            if self.ai_channels is None:
+                self.ai_channels = ai_channels
+                self._record, self.record_size = _record_struct(ai_channels)
+                if numpy is not None:
+                    self.dtype = numpy.dtype({"names": ["timestamp", "device", "di", "ai"],
+                                              "formats": ["<f8", "<u4", "<u4", ("<u2", (ai_channels,))],
+                                              "offsets": [0, 8, 12, 16], "itemsize": record_size})
+            segment.count = count
+            if count:
+                segment.first = self._timestamp(segment, 0)
+                segment.last = self._timestamp(segment, count - 1)
+        self._firsts = [segment.first for segment in self.segments if segment.count]
+
+    def __len__(self):
+        return sum(segment.count for segment in self.segments)
+
+    def _timestamp(self, segment: _Segment, index: int):
+        return struct.unpack_from("<d", segment.map, HEADER_SIZE + index * self.record_size)[0]
+
+    def _search(self, segment: _Segment, timestamp: float):
+        """
+        :return: index of the first record of the segment at or after timestamp
+        """
+        low, high = 0, segment.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp(segment, middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _view(self, segment: _Segment, start: int, end: int):
+        if numpy is not None:
+            return numpy.frombuffer(segment.map, self.dtype, end - start, HEADER_SIZE + start * self.record_size)
+        return [self._decode(segment, index) for index in range(start, end)]
+
+    def _decode(self, segment: _Segment, index: int):
+        values = self._record.unpack_from(segment.map, HEADER_SIZE + index * self.record_size)
+        return values[0], values[1], values[2], values[3:]
+
+    def ranges(self, start: Optional[float] = None, end: Optional[float] = None):
+        """
+        :param start: first timestamp included, None from the beginning
+        :param end: first timestamp excluded, None to the end
+        :return: one view per segment overlapping [start, end), zero-copy NumPy arrays when NumPy is installed,
+            otherwise lists of (timestamp, device, di, ai values)
+        """
+        segments = [segment for segment in self.segments if segment.count]
+        # segments are in time order, skip the ones that end before start; a segment may end with records
+        # of the timestamp the next one starts with, so the search stops before the first one starting at start
+        first = max(bisect.bisect_left(self._firsts, start) - 1, 0) if start is not None else 0
+        views = []
+        for segment in segments[first:]:
+            if end is not None and segment.first >= end:
+                break
+            if start is not None and segment.last < start:
+                continue
+            low = 0 if start is None else self._search(segment, start)
+            high = segment.count if end is None else self._search(segment, end)
+            if high > low:
+                views.append(self._view(segment, low, high))
+        return views
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None, device: Union[int, str, None] = None):
+        """
+        :param start: first timestamp included, None from the beginning
+        :param end: first timestamp excluded, None to the end
+        :param device: only the records of this device id or IPv4 address
+        :return: records of [start, end), a NumPy record array (a view if it lies in a single segment and
+            no device is given) or a list of (timestamp, device, di, ai values)
+        """
+        views = self.ranges(start, end)
+        if numpy is not None:
+            if not views:
+                samples = numpy.empty(0, self.dtype) if self.ai_channels is not None else numpy.empty(0)
+            else:
+                samples = views[0] if len(views) == 1 else numpy.concatenate(views)
+            if device is not None:
+                samples = samples[samples["device"] == device_id(device)]
+            return samples
+        samples = [record for view in views for record in view]
+        if device is not None:
+            device = device_id(device)
+            samples = [record for record in samples if record[1] == device]
+        return samples
+
+    def close(self):
+        for segment in self.segments:
+            segment.map.close()
+            segment.file.close()
+        self.segments = []
+        self._firsts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,132 @@
+"""
+Engineering Units
+=================
+Range metadata of analog channels and the conversion between raw counts and engineering units
+
+ranges = RangeTable.from_response(adam.requestor.a_input_range(), AI_FULL_SCALE)
+volts = ranges.to_engineering(adam.a_input().values())
+
+Conversions are done for every channel at once with a precomputed gain and offset per channel,
+with NumPy when it is installed.
+"""
+from array import array
+
+from .parser import parse_response
+from typing import List, Optional, Sequence, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# raw value at the top of the range, analog inputs are 16 bit, analog outputs 12 bit
+AI_FULL_SCALE = 0xFFFF
+AO_FULL_SCALE = 0x0FFF
+
+
+class ChannelRange:
+    """
+    Range of a single analog channel as reported by ADAM, e.g. code 0x0143 is "+/- 10 V"
+    """
+
+    __slots__ = ("channel", "code", "name", "minimum", "maximum", "unit", "full_scale")
+
+    def __init__(self, channel: int, code: int, name: Optional[str], minimum: float, maximum: float,
+                 unit: Optional[str], full_scale: int = AI_FULL_SCALE):
+        self.channel = channel
+        self.code = code
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+        self.full_scale = full_scale
+
+    @property
+    def gain(self):
+        """
+        engineering units per raw count
+        """
+        return (self.maximum - self.minimum) / self.full_scale
+
+    def to_engineering(self, raw: int):
+        return self.minimum + raw * self.gain
+
+    def to_raw(self, value: float):
+        if not self.gain:
+            return 0
+        raw = int(round((value - self.minimum) / self.gain))
+        return min(max(raw, 0), self.full_scale)
+
+    def __repr__(self):
+        return f"ChannelRange({self.channel}, {self.code:04X}, {self.name!r})"
+
+
+class RangeTable:
+    """
+    Ranges of every analog input or output channel of a device
+    """
+
+    def __init__(self, ranges: List[ChannelRange]):
+        """
+        :param ranges: one ChannelRange per channel, channel 0 first
+        """
+        self.ranges = ranges
+        self._gains = array('d', [r.gain for r in ranges])
+        self._offsets = array('d', [r.minimum for r in ranges])
+        if numpy is not None:
+            self._np_gains = numpy.array(self._gains)
+            self._np_offsets = numpy.array(self._offsets)
+
+    @classmethod
+    def from_response(cls, xml: Union[bytes, str], full_scale: int = AI_FULL_SCALE):
+        """
+        :param xml: response of /analoginput/all/range or /analogoutput/all/range
+        :param full_scale: AI_FULL_SCALE for inputs, AO_FULL_SCALE for outputs
+        :return: RangeTable
+        """
+        records = [record for record in parse_response(xml).records if "RANGE" in record]
+        records.sort(key=lambda record: int(record["ID"]))
+        return cls([ChannelRange(int(record["ID"]), int(record["RANGE"], 16), record.get("NAME"),
+                                 float(record.get("MIN", 0)), float(record.get("MAX", 0)), record.get("UNIT"),
+                                 full_scale) for record in records])
+
+    def __getitem__(self, channel: int):
+        return self.ranges[channel]
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def units(self):
+        return [r.unit for r in self.ranges]
+
+    def to_engineering(self, raw: Sequence[int]):
+        """
+        :param raw: one raw value per channel, e.g. AnalogInput.values()
+        :return: engineering values, a NumPy array if NumPy is installed otherwise a list
+        """
+        if numpy is not None:
+            n = min(len(raw), len(self.ranges))
+            return numpy.asarray(raw)[:n] * self._np_gains[:n] + self._np_offsets[:n]
+        return [offset + value * gain for value, gain, offset in zip(raw, self._gains, self._offsets)]
+
+    def to_raw(self, values: Sequence[Optional[float]]):
+        """
+        :param values: one engineering value per channel, None leaves the channel out
+        :return: raw values clipped to the range, None where values is None
+        """
+        return [None if value is None else r.to_raw(value) for value, r in zip(values, self.ranges)]
+
+    def channel_to_engineering(self, channel: int, raw: Sequence[int]):
+        """
+        :param channel: channel the samples belong to
+        :param raw: buffered raw samples of the channel, e.g. RingBuffer.channel(channel)
+        :return: engineering values, a NumPy array if NumPy is installed otherwise an array('d')
+        """
+        gain = self._gains[channel]
+        offset = self._offsets[channel]
+        if numpy is not None:
+            return numpy.asarray(raw) * gain + offset
+        return array('d', [offset + value * gain for value in raw])
@@ -0,0 +1,193 @@
+"""
+Request Scheduler
+=================
+Decides which request goes to an ADAM next when more callers want it than it can take
+
+scheduler = RequestScheduler(max_concurrency=2, rate=20, drop_after={RequestScheduler.BACKGROUND: 0.5})
+actuator = Adam6050D(ip, username, password, scheduler=scheduler)
+monitor = Adam6050D(ip, username, password, scheduler=scheduler)
+
+with request_priority(RequestScheduler.BACKGROUND):
+    monitor.input()     # waits behind every write and control read
+
+- writes are ACTUATION and go first, they skip the rate limit and have connections reserved for them
+- reads are CONTROL, or BACKGROUND inside request_priority(RequestScheduler.BACKGROUND); AdamFleet polls
+  in the background
+- requests of the same priority go in the order they came
+- a read that waited longer than drop_after of its priority fails with StaleRequestError instead of being sent,
+  its answer would be too old to be worth the load on the device
+
+Share one scheduler between every ADAM object of the same device, and one device per scheduler.
+A request that is already on the wire is never interrupted, so a write waits at most for a free reserved
+connection.
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from typing import Dict, Optional
+
+_local = threading.local()
+
+
+class StaleRequestError(Exception):
+    """
+    raised instead of sending a read that waited longer than drop_after of its priority
+    """
+
+
+class RequestScheduler:
+    """
+    Per device admission of requests by priority, with a concurrency cap and a rate limit
+
+    - admitted: number of requests let through, per priority
+    - dropped: number of stale reads dropped, per priority
+    - waited: total seconds spent waiting for a turn, per priority
+    """
+
+    ACTUATION = 0
+    CONTROL = 1
+    BACKGROUND = 2
+
+    def __init__(self, max_concurrency: int = 2, reserved: Optional[int] = None, rate: Optional[float] = None,
+                 burst: int = 1, drop_after: Optional[Dict[int, float]] = None):
+        """
+        :param max_concurrency: requests on the wire at the same time, at most the pool_size of the ADAM objects
+        :param reserved: connections only writes may use, defaults to 1 when max_concurrency allows it
+        :param rate: reads per second sent to the device, None does not limit them
+        :param burst: reads that may be sent back to back after an idle time
+        :param drop_after: priority to seconds a read of that priority may wait before it is dropped,
+            writes are never dropped
+        """
+        if max_concurrency < 1:
+            raise Exception("max_concurrency should be at least 1")
+        if reserved is None:
+            reserved = 1 if max_concurrency > 1 else 0
+        if not 0 <= reserved < max_concurrency:
+            raise Exception("reserved should leave at least one connection for the reads ", reserved)
+        self.max_concurrency = max_concurrency
+        self.reserved = reserved
+        self.rate = rate
+        self.burst = burst
+        self.drop_after = dict(drop_after or {})
+        priorities = (self.ACTUATION, self.CONTROL, self.BACKGROUND)
+        self.admitted = dict.fromkeys(priorities, 0)
+        self.dropped = dict.fromkeys(priorities, 0)
+        self.waited = dict.fromkeys(priorities, 0.0)
+        self.active = 0
+        self.active_reads = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._waiting = []
+        self._order = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _blocked(self, priority: int, now: float):
+        """
+        :return: None if a request of this priority can go now, otherwise the seconds to wait, 0 until notified
+        """
+        if self.active >= self.max_concurrency:
+            return 0
+        if priority == self.ACTUATION:
+            return None
+        if self.active_reads >= self.max_concurrency - self.reserved:
+            return 0
+        if self.rate is not None:
+            self._refill(now)
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+        return None
+
+    def acquire(self, priority: int):
+        """
+        Wait for the turn of a request, every acquire has to be followed by a release
+
+        :param priority: ACTUATION, CONTROL or BACKGROUND
+        """
+        start = time.monotonic()
+        # a dropped write would lose a change of the outputs, only reads go stale
+        drop_after = self.drop_after.get(priority) if priority != self.ACTUATION else None
+        deadline = None if drop_after is None else start + drop_after
+        entry = (priority, next(self._order))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._blocked(priority, now) if self._waiting[0] is entry else 0
+                    if wait is None:
+                        break
+                    if deadline is not None:
+                        if now >= deadline:
+                            self.dropped[priority] += 1
+                            raise StaleRequestError("read waited too long for its turn, dropped", priority)
+                        wait = min(wait, deadline - now) if wait else deadline - now
+                    self._condition.wait(wait or None)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self.active += 1
+            if priority != self.ACTUATION:
+                self.active_reads += 1
+            if self.rate is not None and priority != self.ACTUATION:
+                self._tokens -= 1
+            self.admitted[priority] += 1
+            self.waited[priority] += now - start
+            # the next one in line may be able to go as well
+            self._condition.notify_all()
+
+    def release(self, priority: int):
+        with self._condition:
+            self.active -= 1
+            if priority != self.ACTUATION:
+                self.active_reads -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int):
+        """
+        :param priority: ACTUATION, CONTROL or BACKGROUND
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def pending(self):
+        """
+        :return: number of requests waiting for their turn
+        """
+        with self._condition:
+            return len(self._waiting)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """
+    :param priority: priority of the reads made by this thread inside the with block
+    """
+    previous = getattr(_local, "priority", None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority(default: int = RequestScheduler.CONTROL):
+    """
+    :return: the priority set with request_priority for this thread, default outside of it
+    """
+    priority = getattr(_local, "priority", None)
+    return default if priority is None else priority
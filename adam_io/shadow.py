@@ -0,0 +1,54 @@
+"""
+Shadow Register
+===============
+Last known output state of an ADAM, lets output writes skip the read before the write
+"""
+import threading
+import time
+
+from typing import Dict, Optional
+
+
+class ShadowRegister:
+    """
+    Keeps the last known digital or analog output values of a device in the form they are posted,
+    e.g. {"DO0": 1, "DO1": 0, ...}
+
+    The register is refreshed from every read and successful write, and invalidated when a write fails.
+    With max_age set, values older than max_age seconds are not trusted and the next write reads ADAM again.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        """
+        :param max_age: seconds the values are trusted after a refresh, None trusts them until invalidated
+        """
+        self.max_age = max_age
+        self.values = None
+        self.updated = 0.0
+        self.lock = threading.RLock()
+
+    def valid(self):
+        """
+        :return: True if the values can be used instead of reading ADAM
+        """
+        if self.values is None:
+            return False
+        return self.max_age is None or time.monotonic() - self.updated <= self.max_age
+
+    def refresh(self, values: Dict[str, object]):
+        """
+        :param values: the current output values of ADAM
+        """
+        with self.lock:
+            self.values = dict(values)
+            self.updated = time.monotonic()
+
+    def invalidate(self):
+        """
+        forget the values, the next write reads the state from ADAM
+        """
+        with self.lock:
+            self.values = None
+
+    def __repr__(self):
+        return f"ShadowRegister({self.values}, valid={self.valid()})"
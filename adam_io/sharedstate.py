@@ -0,0 +1,368 @@
+"""
+Shared State
+============
+One process polls the ADAMs, any number of processes on the same host read the latest state from
+shared memory, without a request to the devices or a lock
+
+# poller process
+fleet = AdamFleet([("192.168.1.10", "6050", ("root", "00000000"))], period=0.1)
+publisher = StatePublisher.for_fleet(fleet, "adam-state")
+fleet.start()
+
+# any other process
+reader = StateReader("adam-state")
+state = reader.read("192.168.1.10")
+state.di[0]             # DI0 as of state.timestamp
+
+Every device has a fixed slot in the shared memory block, guarded by a sequence counter (seqlock):
+the publisher makes the counter odd, writes the slot and makes it even again. A reader copies the slot
+and keeps it only if the counter was even and did not change meanwhile, otherwise it reads again.
+Reads never block the publisher, and the publisher never waits for the readers.
+
+Needs multiprocessing.shared_memory, Python 3.8 or newer.
+"""
+import multiprocessing
+import struct
+import threading
+import time
+
+from .analog_io import AnalogInput, AnalogOutput
+from .digital_io import DigitalInput, DigitalOutput
+from .profiles import get_profile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+_MAGIC = b"ADAMSHM1"
+# magic, devices, ai channels, ao channels, slot size
+_HEADER = struct.Struct("<8sIHHI")
+_HEADER_SIZE = 64
+# device key and model of every slot
+_NAME = struct.Struct("<48s16s")
+_SEQUENCE = struct.Struct("<Q")
+# blocks created by this process
+_published = set()
+
+_OK = 1
+
+# endpoint names of the ADAM classes to the field they fill
+_FIELDS = {"input": "di", "d_input": "di", "output": "do", "d_output": "do", "a_input": "ai", "a_output": "ao"}
+
+
+def _slot_struct(ai_channels: int, ao_channels: int):
+    """
+    :return: struct of the slot after its sequence counter; values timestamp, poll timestamp, flags,
+        DI and DO bitmasks, DI/DO/AI/AO counts, AI and AO raw values
+    """
+    return struct.Struct(f"<ddIIIBBBB{ai_channels}H{ao_channels}H")
+
+
+def _shared_memory(name: str, create: bool = False, size: int = 0):
+    if shared_memory is None:
+        raise Exception("shared state needs multiprocessing.shared_memory, Python 3.8 or newer")
+    if create:
+        memory = shared_memory.SharedMemory(name, create=True, size=size)
+        _published.add(memory.name)
+        return memory
+    try:
+        # readers should not unlink the block when they exit, only the publisher owns it
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name)
+        # before 3.13 attaching registers the block for removal at exit with the resource tracker. Processes
+        # started by multiprocessing share the tracker of their parent, and with it the registration of the
+        # publisher, which has to stay so that the block is removed if the publisher dies. Only a process
+        # with a tracker of its own takes its registration back.
+        if memory.name not in _published and multiprocessing.parent_process() is None:
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(memory._name, "shared_memory")
+            except Exception:
+                pass
+        return memory
+
+
+class SharedDeviceState:
+    """
+    Consistent copy of the state of a device
+
+    - device: the device key, its ip or ip:port
+    - model: model number, e.g. "6050"
+    - di, do, ai, ao: DigitalInput, DigitalOutput, AnalogInput, AnalogOutput, None for the channels the model has
+      not and before the first poll
+    - timestamp: time.time() of the poll the values come from, None before the first successful poll
+    - polled: time.time() of the latest poll, successful or not
+    - ok: False if the latest poll failed, the values are then the ones of the last successful poll
+    - sequence: even counter of the slot, grows by 2 with every update
+    """
+
+    __slots__ = ("device", "model", "di", "do", "ai", "ao", "timestamp", "polled", "ok", "sequence")
+
+    def __init__(self, device: str, model: str, di, do, ai, ao, timestamp: Optional[float], polled: Optional[float],
+                 ok: bool, sequence: int):
+        self.device = device
+        self.model = model
+        self.di = di
+        self.do = do
+        self.ai = ai
+        self.ao = ao
+        self.timestamp = timestamp
+        self.polled = polled
+        self.ok = ok
+        self.sequence = sequence
+
+    @property
+    def age(self):
+        """
+        :return: seconds since the values were read from the device
+        """
+        return None if self.timestamp is None else time.time() - self.timestamp
+
+    def __repr__(self):
+        return f"SharedDeviceState({self.device}, {self.model}, ok={self.ok}, sequence={self.sequence})"
+
+
+class _Layout:
+    """
+    Offsets of the slots in a shared memory block
+    """
+
+    def __init__(self, devices: int, ai_channels: int, ao_channels: int):
+        self.devices = devices
+        self.ai_channels = ai_channels
+        self.ao_channels = ao_channels
+        self.slot = _slot_struct(ai_channels, ao_channels)
+        # slots are aligned to cache lines so updates of one device do not disturb the readers of another
+        self.slot_size = (_SEQUENCE.size + self.slot.size + 63) // 64 * 64
+        self.slots_offset = _HEADER_SIZE + (devices * _NAME.size + 63) // 64 * 64
+        self.size = self.slots_offset + devices * self.slot_size
+
+    def name_offset(self, index: int):
+        return _HEADER_SIZE + index * _NAME.size
+
+    def slot_offset(self, index: int):
+        return self.slots_offset + index * self.slot_size
+
+
+class StatePublisher:
+    """
+    Owner and only writer of a shared memory block holding the latest state of a list of devices
+    """
+
+    def __init__(self, name: Optional[str], devices: Sequence[Tuple[str, str]]):
+        """
+        :param name: name of the shared memory block the readers attach to, None picks a random one (see .name)
+        :param devices: list of (device key, model), e.g. [("192.168.1.10", "6050"), ...]
+        """
+        profiles = [(device, get_profile(model)) for device, model in devices]
+        if not profiles:
+            raise Exception("shared state needs at least one device")
+        if len({device for device, _ in profiles}) != len(profiles):
+            raise Exception("a device is listed twice ", [device for device, _ in devices])
+        self.layout = _Layout(len(profiles), max(profile.ai for _, profile in profiles),
+                              max(profile.ao for _, profile in profiles))
+        self._memory = _shared_memory(name, create=True, size=self.layout.size)
+        self.name = self._memory.name
+        self.updates = 0
+        self._buffer = self._memory.buf
+        self._lock = threading.Lock()
+        self._index = {}  # type: Dict[str, int]
+        # the values of the last successful poll, republished with the ok flag cleared when a poll fails
+        self._values = {}  # type: Dict[str, tuple]
+        self._counts = {}  # type: Dict[str, Tuple[int, int, int, int]]
+
+        _HEADER.pack_into(self._buffer, 0, _MAGIC, self.layout.devices, self.layout.ai_channels,
+                          self.layout.ao_channels, self.layout.slot_size)
+        for index, (device, profile) in enumerate(profiles):
+            self._index[device] = index
+            self._counts[device] = (profile.di, profile.do, profile.ai, profile.ao)
+            _NAME.pack_into(self._buffer, self.layout.name_offset(index), device.encode(), profile.model.encode())
+
+    @classmethod
+    def for_fleet(cls, fleet, name: Optional[str] = None):
+        """
+        :param fleet: AdamFleet, every sweep of it is published
+        :param name: name of the shared memory block, None picks a random one
+        :return: StatePublisher of the devices of the fleet
+        """
+        publisher = cls(name, [(device, model) for device, (model, _, _) in fleet.devices.items()])
+        fleet.listeners.append(publisher.publish_sweep)
+        return publisher
+
+    def publish(self, device: str, di=None, do=None, ai=None, ao=None, timestamp: Optional[float] = None):
+        """
+        :param device: device key
+        :param di: DigitalInput or DI bitmask
+        :param do: DigitalOutput or DO bitmask
+        :param ai: AnalogInput or raw analog input values
+        :param ao: AnalogOutput or raw analog output values
+        :param timestamp: time.time() of the poll, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if isinstance(di, DigitalInput):
+            di = di.to_mask()
+        if isinstance(do, DigitalOutput):
+            do = do.to_mask()
+        if isinstance(ai, AnalogInput):
+            ai = ai.values()
+        if isinstance(ao, AnalogOutput):
+            ao = [value or 0 for _, value in ao]
+        values = (timestamp, di or 0, do or 0, ai or (), ao or ())
+        with self._lock:
+            self._values[device] = values
+            self._write(device, values, timestamp, _OK)
+
+    def publish_error(self, device: str, timestamp: Optional[float] = None):
+        """
+        mark the latest poll of the device as failed, the values of the last successful poll stay
+
+        :param device: device key
+        :param timestamp: time.time() of the failed poll, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._write(device, self._values.get(device), timestamp, 0)
+
+    def publish_sweep(self, snapshots: Dict[str, object]):
+        """
+        :param snapshots: device key to DeviceSnapshot, as returned by AdamFleet.poll_once
+        """
+        for device, snapshot in snapshots.items():
+            if not snapshot.ok:
+                self.publish_error(device, snapshot.timestamp)
+                continue
+            fields = {_FIELDS[endpoint]: value for endpoint, value in snapshot.values.items() if endpoint in _FIELDS}
+            self.publish(device, timestamp=snapshot.timestamp, **fields)
+
+    def _write(self, device: str, values: Optional[tuple], polled: float, flags: int):
+        if device not in self._index:
+            raise Exception("device is not published ", device)
+        layout = self.layout
+        di_count, do_count, ai_count, ao_count = self._counts[device]
+        if values is None:
+            timestamp, di, do, ai, ao = 0.0, 0, 0, (), ()
+        else:
+            timestamp, di, do, ai, ao = values
+        ai = list(ai[:ai_count]) + [0] * (layout.ai_channels - min(len(ai), ai_count))
+        ao = list(ao[:ao_count]) + [0] * (layout.ao_channels - min(len(ao), ao_count))
+        offset = layout.slot_offset(self._index[device])
+        sequence = _SEQUENCE.unpack_from(self._buffer, offset)[0]
+        # odd while the slot is written, readers retry until it is even again
+        _SEQUENCE.pack_into(self._buffer, offset, sequence + 1)
+        layout.slot.pack_into(self._buffer, offset + _SEQUENCE.size, timestamp, polled, flags, di, do,
+                              di_count, do_count, ai_count, ao_count, *ai, *ao)
+        _SEQUENCE.pack_into(self._buffer, offset, sequence + 2)
+        self.updates += 1
+
+    def close(self):
+        """
+        detach from the shared memory block and remove it, attached readers keep their mapping
+        """
+        if self._memory is None:
+            return
+        self._memory.close()
+        self._memory.unlink()
+        _published.discard(self.name)
+        self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StateReader:
+    """
+    Lock-free reader of the shared memory block of a StatePublisher, in the same or another process
+    """
+
+    def __init__(self, name: str, spin: int = 10000):
+        """
+        :param name: name of the shared memory block
+        :param spin: reads of a slot that is being written before giving up, the publisher died mid write
+        """
+        self._memory = _shared_memory(name)
+        self._buffer = self._memory.buf
+        self.name = name
+        self.spin = spin
+        self.retries = 0
+        magic, devices, ai_channels, ao_channels, slot_size = _HEADER.unpack_from(self._buffer)
+        if magic != _MAGIC:
+            self.close()
+            raise Exception("not an ADAM shared state block ", name)
+        self.layout = _Layout(devices, ai_channels, ao_channels)
+        self._index = {}  # type: Dict[str, Tuple[int, str]]
+        for index in range(devices):
+            device, model = _NAME.unpack_from(self._buffer, self.layout.name_offset(index))
+            self._index[device.rstrip(b"\0").decode()] = (index, model.rstrip(b"\0").decode())
+
+    def devices(self) -> List[str]:
+        """
+        :return: keys of the published devices
+        """
+        return list(self._index)
+
+    def _copy(self, index: int):
+        """
+        :return: (sequence, slot values) of a consistent copy of the slot
+        """
+        offset = self.layout.slot_offset(index)
+        slot = self.layout.slot
+        for attempt in range(self.spin):
+            before = _SEQUENCE.unpack_from(self._buffer, offset)[0]
+            if not before & 1:
+                values = slot.unpack_from(self._buffer, offset + _SEQUENCE.size)
+                if _SEQUENCE.unpack_from(self._buffer, offset)[0] == before:
+                    return before, values
+            self.retries += 1
+            if attempt & 0xFF == 0xFF:
+                time.sleep(0)
+        raise Exception("shared state slot is stuck in a write, is the publisher alive? ", index)
+
+    def read(self, device: str):
+        """
+        :param device: device key
+        :return: SharedDeviceState, a consistent copy of the latest state of the device
+        """
+        if device not in self._index:
+            raise Exception("device is not published ", device)
+        index, model = self._index[device]
+        sequence, values = self._copy(index)
+        timestamp, polled, flags, di, do, di_count, do_count, ai_count, ao_count = values[:9]
+        ai_values = values[9:9 + ai_count]
+        ao_values = values[9 + self.layout.ai_channels:9 + self.layout.ai_channels + ao_count]
+        ao = None
+        if ao_count:
+            ao = AnalogOutput(quantity=ao_count)
+            ao.array(list(ao_values))
+        name = f"ADAM-{model}"
+        return SharedDeviceState(device, model,
+                                 DigitalInput.from_mask(di, di_count, name) if di_count else None,
+                                 DigitalOutput.from_mask(do, do_count) if do_count else None,
+                                 AnalogInput.from_values(ai_values, name) if ai_count else None,
+                                 ao, timestamp or None, polled or None,
+                                 bool(flags & _OK), sequence)
+
+    def read_all(self):
+        """
+        :return: dictionary of device key to SharedDeviceState
+        """
+        return {device: self.read(device) for device in self._index}
+
+    def close(self):
+        if self._memory is None:
+            return
+        self._memory.close()
+        self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,368 @@
+"""
+ADAM Simulator
+==============
+Local stand-in for the web server of an ADAM, serves the same xml formats as the real modules
+(see responses.md) so the library can be tested and benchmarked without hardware.
+
+with AdamSimulator.model("6024", latency=0.002) as server:
+    adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+
+ModbusSimulator answers Modbus/TCP like the port 502 of the same modules.
+
+It can also run on its own;
+
+python -m adam_io.simulator --model 6050 --port 8080 --latency 0.002 --max-connections 4
+python -m adam_io.simulator --model 6024 --port 5020 --modbus
+"""
+import argparse
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import StreamRequestHandler, ThreadingMixIn, ThreadingTCPServer
+from urllib.parse import parse_qsl
+
+from .profiles import PROFILES, get_profile
+from typing import Optional
+
+# range codes the simulator knows, code: (name, min, max, unit)
+RANGES = {
+    0x0143: ("+/- 10 V", -10, 10, "V"),
+    0x0142: ("0 ~ 10 V", 0, 10, "V"),
+    0x0182: ("0 ~ 20 mA", 0, 20, "mA"),
+    0x0180: ("4 ~ 20 mA", 4, 20, "mA"),
+}
+
+
+class AdamRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately, do not let Nagle hold back the body
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.sockets.append(self.connection)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body: str, status: int = 200):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        data = body.encode('utf8')
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _state(self):
+        """
+        :return: (tag, values, channel) of the path, channel is None for /all
+        """
+        parts = self.path.split("/")
+        if len(parts) != 4:
+            return None, None, None
+        tag, values = {"digitalinput": ("DI", self.server.di),
+                       "digitaloutput": ("DO", self.server.do),
+                       "analoginput": ("AI", self.server.ai),
+                       "analogoutput": ("AO", self.server.ao)}.get(parts[1], (None, None))
+        channel = None if parts[2] == "all" else int(parts[2])
+        return tag, values, channel
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(("GET", self.path))
+        tag, values, channel = self._state()
+        if tag is None:
+            return self._reply("", 404)
+        if channel is not None and channel >= len(values):
+            return self._reply("", 501)
+        channels = range(len(values)) if channel is None else [channel]
+        if self.path.endswith("/range"):
+            ranges = self.server.ranges[tag]
+            items = ''.join(f"<{tag}><ID>{i}</ID><RANGE>{ranges[i]:04X}</RANGE><NAME>{name}</NAME>"
+                            f"<MAX>{maximum}</MAX><MIN>{minimum}</MIN><UNIT>{unit}</UNIT></{tag}>"
+                            for i in channels for name, minimum, maximum, unit in [RANGES[ranges[i]]])
+        elif tag in ("AI", "AO"):
+            items = ''.join(f"<{tag}><ID>{i}</ID><VALUE>{values[i]:04X}</VALUE></{tag}>" for i in channels)
+        else:
+            items = ''.join(f"<{tag}><ID>{i}</ID><VALUE>{values[i]}</VALUE></{tag}>" for i in channels)
+        self._reply(f'<?xml version="1.0" ?><{self.server.name} status="OK">{items}</{self.server.name}>')
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode('utf8')
+        with self.server.lock:
+            self.server.requests.append(("POST", self.path))
+        tag, values, _ = self._state()
+        if tag is None:
+            return self._reply("", 404)
+        if self.path.endswith("/range"):
+            values = self.server.ranges.get(tag, [])
+        updates = [(int(key[len(tag):]), value) for key, value in parse_qsl(body)]
+        if any(index >= len(values) for index, _ in updates):
+            return self._reply("", 501)
+        for index, value in updates:
+            values[index] = int(value, 16) if tag in ("AI", "AO") else int(value)
+        self._reply(f'<?xml version="1.0" ?><{self.server.name} status="OK"></{self.server.name}>')
+
+
+class AdamSimulator(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server answering like an ADAM
+
+    - di, do, ai, ao: the current channel values, tests can change them directly
+    - ranges: range codes of the analog channels, {"AI": [...], "AO": [...]}
+    - latency: seconds every response is delayed, like the response time of a real module
+    - max_connections: connections above this are closed right away, ADAM web servers only accept a few
+    - connections: number of accepted connections so far
+    - requests: (method, path) of the latest requests
+    """
+
+    daemon_threads = True
+
+    def __init__(self, name: str = "ADAM-6050", di: int = 12, do: int = 6, ai: int = 0, ao: int = 0,
+                 latency: float = 0.0, max_connections: Optional[int] = None, host: str = "127.0.0.1",
+                 port: int = 0):
+        """
+        :param name: root tag of the responses
+        :param di: number of digital inputs
+        :param do: number of digital outputs
+        :param ai: number of analog inputs
+        :param ao: number of analog outputs
+        :param latency: seconds every response is delayed
+        :param max_connections: maximum number of simultaneously open connections, None for no limit
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free one
+        """
+        super().__init__((host, port), AdamRequestHandler)
+        self.name = name
+        self.di = [0] * di
+        self.do = [0] * do
+        self.ai = [0] * ai
+        self.ao = [0] * ao
+        self.ranges = {"AI": [0x0143] * ai, "AO": [0x0182] * ao}
+        self.latency = latency
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        self.active = 0
+        self.connections = 0
+        self.refused = 0
+        self.sockets = []
+        self.requests = deque(maxlen=10000)
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+
+    @classmethod
+    def model(cls, model: str = "6050", **kwargs):
+        """
+        :param model: a registered model, see profiles.py
+        :return: AdamSimulator with the channels of the model
+        """
+        profile = get_profile(model)
+        return cls(profile.name, profile.di, profile.do, profile.ai, profile.ao, **kwargs)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            refuse = self.max_connections is not None and self.active >= self.max_connections
+            if refuse:
+                self.refused += 1
+            else:
+                self.active += 1
+        if refuse:
+            self.shutdown_request(request)
+            return
+        super().process_request(request, client_address)
+
+    def drop_connections(self):
+        """
+        closes every open socket like an ADAM dropping idle keep-alive connections
+        """
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def start(self):
+        """
+        serve in a background thread
+        """
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.drop_connections()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class ModbusRequestHandler(StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(7)
+            if len(header) < 7:
+                return
+            transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+            pdu = self.rfile.read(length - 1)
+            with self.server.lock:
+                self.server.requests.append(pdu[0])
+            reply = self.server.execute(pdu)
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self.wfile.write(struct.pack(">HHHB", transaction, protocol, len(reply) + 1, unit) + reply)
+
+
+class ModbusSimulator(ThreadingTCPServer):
+    """
+    Threaded Modbus/TCP server answering like an ADAM, with the address map of its profile
+
+    - di, do, ai, ao: the current channel values, tests can change them directly
+    - requests: function codes of the latest requests
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, model: str = "6050", latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        :param model: a registered model, see profiles.py
+        :param latency: seconds every response is delayed
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free one
+        """
+        super().__init__((host, port), ModbusRequestHandler)
+        self.map = get_profile(model).modbus
+        self.di, self.do, self.ai, self.ao = ([0] * self.map.get(tag, (0, 0))[1] for tag in ("DI", "DO", "AI", "AO"))
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = deque(maxlen=10000)
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def _channels(self, tags, address: int, count: int):
+        """
+        :return: [(values, index), ...] of the addresses, None if one of them is not mapped
+        """
+        channels = []
+        for offset in range(address, address + count):
+            for tag, values in tags:
+                first, size = self.map.get(tag, (0, 0))
+                if first <= offset < first + size:
+                    channels.append((values, offset - first))
+                    break
+            else:
+                return None
+        return channels
+
+    def execute(self, pdu: bytes):
+        function = pdu[0]
+        coils = (("DI", self.di), ("DO", self.do))
+        registers = (("AI", self.ai), ("AO", self.ao))
+        if function in (0x01, 0x03):
+            address, count = struct.unpack(">HH", pdu[1:5])
+            channels = self._channels(coils if function == 0x01 else registers, address, count)
+            if channels is None:
+                return bytes((function | 0x80, 2))
+            if function == 0x01:
+                mask = sum(1 << index for index, (values, channel) in enumerate(channels) if values[channel])
+                data = mask.to_bytes((count + 7) // 8, "little")
+            else:
+                data = struct.pack(f">{count}H", *(values[channel] for values, channel in channels))
+            return bytes((function, len(data))) + data
+        if function in (0x0F, 0x10):
+            address, count, size = struct.unpack(">HHB", pdu[1:6])
+            # inputs are read only
+            channels = self._channels(coils[1:] if function == 0x0F else registers[1:], address, count)
+            if channels is None:
+                return bytes((function | 0x80, 2))
+            if function == 0x0F:
+                mask = int.from_bytes(pdu[6:6 + size], "little")
+                new = [(mask >> index) & 1 for index in range(count)]
+            else:
+                new = struct.unpack(f">{count}H", pdu[6:6 + size])
+            with self.lock:
+                for (values, channel), value in zip(channels, new):
+                    values[channel] = value
+            return pdu[:5]
+        return bytes((function | 0x80, 1))
+
+    def start(self):
+        """
+        serve in a background thread
+        """
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local ADAM web server stand-in")
+    parser.add_argument("--model", default="6050", choices=sorted(PROFILES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed")
+    parser.add_argument("--max-connections", type=int, default=None)
+    parser.add_argument("--modbus", action="store_true", help="serve Modbus/TCP instead of http")
+    args = parser.parse_args(argv)
+
+    if args.modbus:
+        server = ModbusSimulator(args.model, latency=args.latency, host=args.host, port=args.port)
+    else:
+        server = AdamSimulator.model(args.model, latency=args.latency, max_connections=args.max_connections,
+                                     host=args.host, port=args.port)
+    # the port is printed first so that a parent process can pick it up
+    print(server.port, flush=True)
+    try:
+        server.serve_forever(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
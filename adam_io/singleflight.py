@@ -0,0 +1,100 @@
+"""
+Single Flight
+=============
+Concurrent identical reads of a device share one request
+
+adam = Adam6050D(ip, username, password, single_flight=True, single_flight_max_age=0.05)
+
+When threads ask for the same endpoint while a request for it is already on its way, they wait for that
+request and all get its response instead of sending their own. With a max_age, a response that is at
+most max_age seconds old is handed out right away without a request. Writes to an endpoint forget its
+response, so reads never see the state from before a write.
+"""
+import threading
+import time
+
+from typing import Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "generation")
+
+    def __init__(self, generation: int):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.generation = generation
+
+
+class SingleFlight:
+    """
+    Deduplication of concurrent calls by key
+
+    - calls: calls that made the request
+    - shared: calls that got the result of another one, in flight or remembered
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        """
+        :param max_age: seconds a result is handed out after its call finished, None only shares calls in flight
+        """
+        self.max_age = max_age
+        self.calls = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._flights = {}  # type: Dict[Hashable, _Call]
+        self._results = {}  # type: Dict[Hashable, tuple]
+        self._generations = {}  # type: Dict[Hashable, int]
+
+    def do(self, key: Hashable, function: Callable, *args):
+        """
+        :param key: identifies the call, e.g. the path of the request
+        :param function: makes the call, called with args
+        :return: the result of function, of this call or one it shares; its exception is raised to every caller
+        """
+        with self._lock:
+            if self.max_age is not None:
+                remembered = self._results.get(key)
+                if remembered is not None and time.monotonic() - remembered[0] <= self.max_age:
+                    self.shared += 1
+                    return remembered[1]
+            call = self._flights.get(key)
+            leader = call is None
+            if leader:
+                call = self._flights[key] = _Call(self._generations.get(key, 0))
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is call:
+                    del self._flights[key]
+                # a result that started before a forget() may hold the state from before a write
+                if self.max_age is not None and call.error is None \
+                        and call.generation == self._generations.get(key, 0):
+                    self._results[key] = (time.monotonic(), call.result)
+            call.done.set()
+        return call.result
+
+    def forget(self, key: Hashable):
+        """
+        drop the remembered result of key, later calls do not join the ones in flight and make a new request
+
+        :param key: identifies the call
+        """
+        with self._lock:
+            self._results.pop(key, None)
+            self._flights.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
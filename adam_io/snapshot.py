@@ -0,0 +1,105 @@
+"""
+Snapshot
+========
+Every channel of an ADAM read at once
+
+snapshot = adam.snapshot()
+snapshot.di[0]          # DI0
+snapshot.ai             # raw value of every analog input
+snapshot.skew           # seconds between the first and the last of the reads
+
+The reads of the channel types (DI, DO, AI, AO) are made concurrently, each on its own pooled
+connection, so the whole state takes about one round trip instead of one per channel type. That needs a
+pool_size of one connection per channel type, e.g. Adam6024D(ip, username, password, pool_size=4);
+with a smaller pool the reads go as many at a time as there are connections.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .scheduler import current_priority, request_priority
+from typing import Callable, Dict, Optional, Tuple
+
+
+class StateSnapshot:
+    """
+    Immutable state of every channel of an ADAM
+
+    - di, do: tuple of the digital input and output values, DIn is di[n], None if the model has none
+    - ai, ao: tuple of the raw analog input and output values, None if the model has none
+    - timestamp: time.time() halfway through the reads
+    - skew: seconds between the middle of the first and the middle of the last read
+    - latency: seconds the whole snapshot took
+    """
+
+    __slots__ = ("di", "do", "ai", "ao", "timestamp", "skew", "latency")
+
+    def __init__(self, di: Optional[Tuple[int, ...]], do: Optional[Tuple[int, ...]], ai: Optional[Tuple[int, ...]],
+                 ao: Optional[Tuple[int, ...]], timestamp: float, skew: float, latency: float):
+        for name, value in zip(self.__slots__, (di, do, ai, ao, timestamp, skew, latency)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StateSnapshot is read-only")
+
+    __delattr__ = __setattr__
+
+    def __eq__(self, other):
+        if not isinstance(other, StateSnapshot):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        channels = ", ".join(f"{name}={getattr(self, name)}" for name in ("di", "do", "ai", "ao")
+                             if getattr(self, name) is not None)
+        return f"StateSnapshot({channels}, skew={self.skew * 1000:.2f}ms)"
+
+
+def _values(state):
+    """
+    :return: tuple of the channel values of a parsed response, None values are kept as None
+    """
+    if hasattr(state, "values") and callable(state.values):
+        return tuple(state.values())
+    return tuple(value for _, value in state)
+
+
+def read_snapshot(reads: Dict[str, Callable[[], object]], executor: Optional[ThreadPoolExecutor] = None):
+    """
+    :param reads: channel type ("di", "do", "ai", "ao") to the read method of that type
+    :param executor: runs all reads but the first, which is made by the calling thread, None reads one after the other
+    :return: StateSnapshot
+    """
+    # the priority is per thread, the reads of the executor are made at the one of the caller
+    priority = current_priority()
+
+    def timed(read):
+        with request_priority(priority):
+            start = time.perf_counter()
+            result = read()
+            return result, start, time.perf_counter()
+
+    wall = time.time()
+    start = time.perf_counter()
+    items = list(reads.items())
+    if executor is None:
+        results = [timed(read) for _, read in items]
+    else:
+        futures = [executor.submit(timed, read) for _, read in items[1:]]
+        try:
+            results = [timed(items[0][1])]
+        finally:
+            # every read is waited for, so none of them is left running when one fails
+            done = [future.exception() for future in futures]
+        for error in done:
+            if error is not None:
+                raise error
+        results += [future.result() for future in futures]
+    end = time.perf_counter()
+
+    middles = [(read_start + read_end) / 2 for _, read_start, read_end in results]
+    values = {kind: _values(result) for (kind, _), (result, _, _) in zip(items, results)}
+    return StateSnapshot(values.get("di"), values.get("do"), values.get("ai"), values.get("ao"),
+                         wall + (end - start) / 2, max(middles) - min(middles), end - start)
@@ -0,0 +1,189 @@
+"""
+Analog Streaming
+================
+Continuous analog input traces at a steady rate into a fixed size ring buffer
+
+streamer = AnalogStreamer(adam, rate=100, capacity=10000)
+streamer.start()
+...
+timestamps = streamer.buffer.timestamps(500)
+ai0 = streamer.buffer.channel(0, 500)
+
+The buffer keeps every sample twice, at its slot and one capacity further, so the latest N samples
+are always contiguous and can be handed out as memoryviews (NumPy arrays if NumPy is installed)
+without copying.
+"""
+import logging
+import threading
+import time
+from array import array
+
+from .analog_io import AnalogInput
+from typing import Optional
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """
+    Preallocated buffer of the latest capacity samples of a number of channels
+
+    The views returned point into the buffer, they are overwritten once capacity newer samples are
+    written; copy them to keep them longer.
+    """
+
+    def __init__(self, capacity: int, channels: int, typecode: str = 'H'):
+        """
+        :param capacity: number of samples kept
+        :param channels: number of channels per sample
+        :param typecode: array typecode of the channel values, 'H' holds the raw ADAM values
+        """
+        if capacity < 1:
+            raise Exception("ring buffer capacity should be at least 1")
+        self.capacity = capacity
+        self.channels = channels
+        self.count = 0
+        self._timestamps = array('d', bytes(2 * capacity * array('d').itemsize))
+        self._values = [array(typecode, bytes(2 * capacity * array(typecode).itemsize)) for _ in range(channels)]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: float, values):
+        """
+        :param timestamp: time of the sample
+        :param values: one value per channel
+        """
+        slot = self.count % self.capacity
+        mirror = slot + self.capacity
+        self._timestamps[slot] = self._timestamps[mirror] = timestamp
+        for channel, value in enumerate(values):
+            if channel >= self.channels:
+                break
+            column = self._values[channel]
+            column[slot] = column[mirror] = value
+        self.count += 1
+
+    def _window(self, n: Optional[int]):
+        available = len(self)
+        n = available if n is None else min(n, available)
+        end = (self.count - 1) % self.capacity + self.capacity + 1 if self.count else 0
+        return end - n, end
+
+    @staticmethod
+    def _view(column, start, end):
+        view = memoryview(column)[start:end]
+        return numpy.frombuffer(view, dtype=column.typecode) if numpy is not None else view
+
+    def timestamps(self, n: Optional[int] = None):
+        """
+        :param n: number of samples, None for every sample kept
+        :return: zero-copy view of the timestamps of the latest n samples, oldest first
+        """
+        start, end = self._window(n)
+        return self._view(self._timestamps, start, end)
+
+    def channel(self, channel: int, n: Optional[int] = None):
+        """
+        :param channel: channel index
+        :param n: number of samples, None for every sample kept
+        :return: zero-copy view of the values of the latest n samples of the channel, oldest first
+        """
+        start, end = self._window(n)
+        return self._view(self._values[channel], start, end)
+
+    def latest(self, n: Optional[int] = None):
+        """
+        :param n: number of samples, None for every sample kept
+        :return: (timestamps, [values of channel 0, values of channel 1, ...])
+        """
+        start, end = self._window(n)
+        return (self._view(self._timestamps, start, end),
+                [self._view(column, start, end) for column in self._values])
+
+
+class AnalogStreamer:
+    """
+    Polls the analog inputs of an ADAM at a target rate into a RingBuffer
+
+    Each sample is timestamped (time.time()) at the middle of its request. Polls are paced on
+    time.monotonic() deadlines; when a poll overruns one or more deadlines they are counted in
+    missed_deadlines and skipped instead of bursting to catch up.
+    """
+
+    def __init__(self, adam, rate: float, capacity: int, channels: Optional[int] = None):
+        """
+        :param adam: Adam6024D or any ADAM with analog inputs
+        :param rate: target samples per second
+        :param capacity: number of samples kept in the buffer
+        :param channels: number of analog inputs, defaults to adam.AI_COUNT
+        """
+        if rate <= 0:
+            raise Exception("rate should be positive")
+        self.adam = adam
+        self.period = 1.0 / rate
+        self.buffer = RingBuffer(capacity, channels if channels is not None else adam.AI_COUNT)
+        self.missed_deadlines = 0
+        self.errors = 0
+        self._ai = AnalogInput()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """
+        Take one sample and append it to the buffer
+
+        :return: timestamp of the sample
+        """
+        start = time.time()
+        response = self.adam.requestor._a_input()
+        end = time.time()
+        # Modbus reads are already parsed
+        ai = response if isinstance(response, AnalogInput) else self._ai.update(response)
+        timestamp = (start + end) / 2
+        self.buffer.append(timestamp, ai.values())
+        return timestamp
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                self.errors += 1
+                logger.exception("analog input poll failed")
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                missed = int((now - deadline) / self.period) + 1
+                self.missed_deadlines += missed
+                deadline += missed * self.period
+            self._stop.wait(deadline - now)
+
+    def start(self):
+        """
+        start streaming in a background thread
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="adam-ai-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
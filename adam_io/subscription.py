@@ -0,0 +1,227 @@
+"""
+Input Subscriptions
+===================
+Call back on digital input edges instead of diffing input() snapshots by hand
+
+watcher = InputWatcher(adam, period=0.02)
+watcher.subscribe([0, 3], on_gate, edge=RISING, debounce=0.05)
+watcher.start()
+
+The poller compares the bitmask of each poll with the debounced state; when nothing changed
+that is a single integer comparison, however many subscribers there are. Changes are handed to a
+dispatcher thread that runs the callbacks, so a slow callback never delays the polling.
+"""
+import logging
+import queue
+import threading
+import time
+
+from .digital_io import DigitalInput, _bits
+from typing import Callable, Iterable, Optional
+
+RISING = "rising"
+FALLING = "falling"
+ANY = "any"
+
+logger = logging.getLogger(__name__)
+
+
+class EdgeEvent:
+    """
+    A debounced change of a digital input
+
+    - channel: DI index
+    - value: new value of the input, 1 for a rising edge, 0 for a falling one
+    - timestamp: time.time() of the poll that committed the change
+    """
+
+    __slots__ = ("channel", "value", "timestamp")
+
+    def __init__(self, channel: int, value: int, timestamp: float):
+        self.channel = channel
+        self.value = value
+        self.timestamp = timestamp
+
+    @property
+    def edge(self):
+        return RISING if self.value else FALLING
+
+    def __repr__(self):
+        return f"EdgeEvent(DI{self.channel}, {self.edge}, {self.timestamp:.3f})"
+
+
+class Subscription:
+    __slots__ = ("mask", "edge", "callback")
+
+    def __init__(self, mask: int, edge: str, callback: Callable[[EdgeEvent], None]):
+        self.mask = mask
+        self.edge = edge
+        self.callback = callback
+
+
+class InputWatcher:
+    """
+    Polls the digital inputs of an ADAM in a background thread and dispatches edges to subscribers
+    """
+
+    def __init__(self, adam, period: float = 0.05):
+        """
+        :param adam: Adam6050D or Adam6024D
+        :param period: seconds between two polls
+        """
+        self.adam = adam
+        self.period = period
+        self.polls = 0
+        self.errors = 0
+        self.state = None
+        self._subscriptions = []
+        self._debounce = {}
+        self._pending = 0
+        self._pending_since = {}
+        self._di = DigitalInput()
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller = None
+        self._dispatcher = None
+
+    def subscribe(self, channels: Iterable[int], callback: Callable[[EdgeEvent], None], edge: str = ANY,
+                  debounce: float = 0.0):
+        """
+        :param channels: DI indexes to watch
+        :param callback: called with an EdgeEvent for every edge, from the dispatcher thread
+        :param edge: RISING, FALLING or ANY
+        :param debounce: seconds a new value has to stay stable before it is reported, the window of
+            a channel is the largest one asked for it
+        :return: the subscription, to pass to unsubscribe
+        """
+        if edge not in (RISING, FALLING, ANY):
+            raise Exception("edge should be one of rising, falling, any")
+        mask = 0
+        with self._lock:
+            for channel in channels:
+                mask |= 1 << channel
+                self._debounce[channel] = max(self._debounce.get(channel, 0.0), debounce)
+            subscription = Subscription(mask, edge, callback)
+            # copy on write, the dispatcher iterates without locking
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def _read_mask(self):
+        response = self.adam.requestor._d_input()
+        if isinstance(response, DigitalInput):
+            # Modbus reads are already parsed
+            return response.to_mask()
+        return self._di.update(response).to_mask()
+
+    def poll_once(self, now: Optional[float] = None):
+        """
+        Read the inputs once and queue the debounced changes
+
+        :param now: time.monotonic() of the poll, for tests
+        :return: bitmask of the inputs whose change was committed by this poll
+        """
+        with self._poll_lock:
+            return self._poll(now)
+
+    def _poll(self, now):
+        raw = self._read_mask()
+        now = time.monotonic() if now is None else now
+        self.polls += 1
+        if self.state is None:
+            self.state = raw
+            return 0
+
+        differs = raw ^ self.state
+        if not differs and not self._pending:
+            return 0
+
+        committed = 0
+        # channels that went back to the stable value before their window passed are dropped
+        for channel in _bits(self._pending & ~differs):
+            del self._pending_since[channel]
+        self._pending &= differs
+        for channel in _bits(differs):
+            since = self._pending_since.setdefault(channel, now)
+            if now - since >= self._debounce.get(channel, 0.0):
+                committed |= 1 << channel
+                del self._pending_since[channel]
+        self._pending = differs & ~committed
+
+        if committed:
+            self.state ^= committed
+            self._events.put((committed, self.state, time.time()))
+        return committed
+
+    def _dispatch(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            committed, state, timestamp = item
+            rising = committed & state
+            falling = committed & ~state
+            for subscription in self._subscriptions:
+                if subscription.edge == RISING:
+                    changed = rising & subscription.mask
+                elif subscription.edge == FALLING:
+                    changed = falling & subscription.mask
+                else:
+                    changed = committed & subscription.mask
+                for channel in _bits(changed):
+                    try:
+                        subscription.callback(EdgeEvent(channel, (state >> channel) & 1, timestamp))
+                    except Exception:
+                        logger.exception("digital input callback failed")
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("digital input poll failed")
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                deadline = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        """
+        start the poller and dispatcher threads
+        """
+        if self._poller is not None:
+            return
+        self._stop.clear()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="adam-di-dispatch", daemon=True)
+        self._dispatcher.start()
+        self._poller = threading.Thread(target=self._run, name="adam-di-poll", daemon=True)
+        self._poller.start()
+
+    def stop(self):
+        """
+        stop polling, the edges already queued are still dispatched
+        """
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+        if self._dispatcher is not None:
+            self._events.put(None)
+            self._dispatcher.join()
+            self._dispatcher = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
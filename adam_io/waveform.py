@@ -0,0 +1,242 @@
+"""
+Analog Output Waveforms
+=======================
+Streams a precomputed table of setpoints to the analog outputs at a fixed rate
+
+player = WaveformPlayer(adam, rate=50, channels=[0])
+report = player.play(ramp(0, 0x0FFF, 500))          # 10 s ramp of AO0, one POST per tick
+print(report.sent, report.missed, report.jitter_max)
+
+player.start(sine(0x07FF, 0x0800, 100), loop=True)  # 2 s period, in the background
+...
+player.stop()
+
+The request body of every setpoint is built before the first tick, a tick is a single POST on the
+persistent connection of the ADAM, without the read of a_output(). Ticks are paced on time.monotonic()
+deadlines; a tick whose deadline passed while the previous one was still on the wire is counted in
+missed and skipped, so the waveform keeps its timing instead of bursting to catch up.
+Every tick invalidates the shadow register of the analog outputs under its lock, so writes of other
+threads read the outputs again instead of merging with stale values.
+
+Setpoints are raw 12 bit counts, 0 to AO_FULL_SCALE.
+"""
+import logging
+import math
+import threading
+import time
+from array import array
+from urllib.parse import urlencode
+
+from .parser import check_update
+from .requestor import Requestor
+from .scaling import AO_FULL_SCALE
+from typing import List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+
+def ramp(start: int, stop: int, steps: int) -> List[int]:
+    """
+    :return: steps setpoints from start to stop, both included
+    """
+    if steps < 2:
+        return [stop] * steps
+    return [round(start + (stop - start) * index / (steps - 1)) for index in range(steps)]
+
+
+def sine(amplitude: int, offset: int, period: int, cycles: int = 1) -> List[int]:
+    """
+    :param amplitude: peak deviation from offset, in counts
+    :param offset: middle of the wave, in counts
+    :param period: ticks per cycle
+    :param cycles: number of cycles
+    """
+    return [round(offset + amplitude * math.sin(2 * math.pi * index / period)) for index in range(period * cycles)]
+
+
+def steps(levels: Sequence[int], hold: int) -> List[int]:
+    """
+    :param levels: setpoint of every step
+    :param hold: ticks every level is held
+    """
+    return [level for level in levels for _ in range(hold)]
+
+
+class WaveformReport:
+    """
+    Timing of a played waveform
+
+    - ticks: deadlines that passed, sent and missed ones
+    - sent: setpoints posted
+    - missed: ticks skipped because the previous POST overran their deadline
+    - errors: POSTs that failed
+    - lateness: seconds every tick that was not skipped started after its deadline
+    """
+
+    __slots__ = ("ticks", "sent", "missed", "errors", "lateness", "duration")
+
+    def __init__(self):
+        self.ticks = 0
+        self.sent = 0
+        self.missed = 0
+        self.errors = 0
+        self.lateness = array('d')
+        self.duration = 0.0
+
+    @property
+    def jitter_mean(self):
+        return sum(self.lateness) / len(self.lateness) if self.lateness else 0.0
+
+    @property
+    def jitter_max(self):
+        return max(self.lateness) if self.lateness else 0.0
+
+    def __repr__(self):
+        return (f"WaveformReport(sent={self.sent}, missed={self.missed}, errors={self.errors}, "
+                f"jitter mean={self.jitter_mean * 1000:.2f}ms max={self.jitter_max * 1000:.2f}ms)")
+
+
+class WaveformPlayer:
+    """
+    Plays setpoint tables on the analog outputs of an ADAM, one waveform at a time
+    """
+
+    def __init__(self, adam, rate: float, channels: Optional[Sequence[int]] = None):
+        """
+        :param adam: Adam6024D or any ADAM with analog outputs
+        :param rate: setpoints per second
+        :param channels: AO channels driven by the tables, defaults to every analog output
+        """
+        if rate <= 0:
+            raise Exception("rate should be positive")
+        self.adam = adam
+        self.period = 1.0 / rate
+        self.channels = list(range(adam.AO_COUNT)) if channels is None else list(channels)
+        if not self.channels:
+            raise Exception("the waveform player needs at least one analog output")
+        self.report = None  # type: Optional[WaveformReport]
+        self._stop = threading.Event()
+        self._thread = None
+
+    def compile(self, table: Sequence[Union[int, Sequence[int]]]):
+        """
+        :param table: one setpoint per tick, a single value for every channel or one value per channel
+        :return: request body of every tick, bytes for the web server and dictionaries for Modbus
+        """
+        encode = isinstance(self.adam.requestor, Requestor)
+        bodies = []
+        built = {}
+        for setpoint in table:
+            values = (setpoint,) * len(self.channels) if isinstance(setpoint, int) else tuple(setpoint)
+            body = built.get(values)
+            if body is None:
+                if len(values) != len(self.channels):
+                    raise Exception("a setpoint needs one value per channel ", setpoint)
+                if any(not 0 <= value <= AO_FULL_SCALE for value in values):
+                    raise Exception("setpoints are raw counts from 0 to 0FFF ", setpoint)
+                data = {f"AO{channel}": f"{value:04X}" for channel, value in zip(self.channels, values)}
+                body = built[values] = urlencode(data).encode('utf-8') if encode else data
+            bodies.append(body)
+        return bodies
+
+    def _play(self, bodies: list, loop: bool, report: WaveformReport):
+        post = self.adam.requestor._a_output
+        # the outputs change behind the shadow register, a tick holds its lock so no read-modify-write of
+        # another thread merges with the values from before the tick
+        shadow = getattr(self.adam, "ao_shadow", None)
+        lock = shadow.lock if shadow is not None else threading.Lock()
+        count = len(bodies)
+        start = deadline = time.monotonic()
+        index = 0
+        try:
+            while not self._stop.is_set() and (loop or index < count):
+                now = time.monotonic()
+                if now < deadline:
+                    if self._stop.wait(deadline - now):
+                        break
+                    now = time.monotonic()
+                report.ticks += 1
+                report.lateness.append(now - deadline)
+                with lock:
+                    try:
+                        check_update(post(bodies[index % count]))
+                        report.sent += 1
+                    except Exception:
+                        report.errors += 1
+                        logger.exception("analog output waveform tick failed")
+                    finally:
+                        if shadow is not None:
+                            shadow.invalidate()
+                index += 1
+                deadline += self.period
+                now = time.monotonic()
+                if now > deadline:
+                    missed = int((now - deadline) / self.period) + 1
+                    if not loop:
+                        # the last setpoint is where the outputs are left, it is never skipped
+                        missed = max(min(missed, count - index - 1), 0)
+                    report.ticks += missed
+                    report.missed += missed
+                    index += missed
+                    deadline += missed * self.period
+        finally:
+            report.duration = time.monotonic() - start
+        return report
+
+    def play(self, table: Sequence[Union[int, Sequence[int]]], loop: bool = False):
+        """
+        Play the table in the calling thread
+
+        :param table: one setpoint per tick
+        :param loop: start over at the end of the table until stop() is called
+        :return: WaveformReport
+        """
+        bodies = self.compile(table)
+        if not bodies:
+            raise Exception("the waveform table is empty")
+        self._stop.clear()
+        self.report = WaveformReport()
+        return self._play(bodies, loop, self.report)
+
+    def start(self, table: Sequence[Union[int, Sequence[int]]], loop: bool = False):
+        """
+        Play the table in a background thread, the report is in .report
+
+        :param table: one setpoint per tick
+        :param loop: start over at the end of the table until stop() is called
+        """
+        if self._thread is not None:
+            raise Exception("a waveform is already playing")
+        bodies = self.compile(table)
+        if not bodies:
+            raise Exception("the waveform table is empty")
+        self._stop.clear()
+        self.report = WaveformReport()
+        self._thread = threading.Thread(target=self._play, args=(bodies, loop, self.report),
+                                        name="adam-ao-waveform", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        :return: WaveformReport once the background waveform is done, None if it is still playing after timeout
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return None
+            self._thread = None
+        return self.report
+
+    def stop(self):
+        """
+        stop the waveform, the outputs keep the last setpoint sent
+        """
+        self._stop.set()
+        return self.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,214 @@
+"""
+ADAM IO benchmarks
+==================
+Measures throughput, latency and allocations of the library against local ADAM simulators
+(adam_io.simulator), each one running in its own process.
+
+python benchmarks/bench_adam.py                    # full run
+python benchmarks/bench_adam.py --quick            # short run for CI
+python benchmarks/bench_adam.py --latency 0.002 --devices 16 --output results.json
+python benchmarks/bench_adam.py --baseline results.json --max-slowdown 1.5
+
+CI compares a --quick run with baseline.json, recorded with --quick --output benchmarks/baseline.json;
+the slowdown allowed there is wide because the CI runners are slower and noisier than the machine
+that recorded it. Record it again when a change makes a benchmark faster or slower on purpose.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from adam_io import Adam6050D, Adam6024D, AdamFleet, AnalogInput, AnalogInputRange, DigitalInput, DigitalOutput
+
+DI_BODY = ('<?xml version="1.0" ?>\n<ADAM-6050 status="OK">\n' +
+           ''.join(f"    <DI>\n        <ID>{i}</ID>\n        <VALUE>{i % 2}</VALUE>\n    </DI>\n" for i in range(12)) +
+           '</ADAM-6050>').encode()
+AI_BODY = ('<?xml version="1.0" ?>\n<ADAM-6024 status="OK">\n' +
+           ''.join(f"    <AI>\n        <ID>{i}</ID>\n        <VALUE>{i * 4096:04X}</VALUE>\n    </AI>\n"
+                   for i in range(6)) + '</ADAM-6024>').encode()
+AI_RANGE_BODY = ('<?xml version="1.0" ?>\n<ADAM-6024 status="OK">\n' +
+                 ''.join(f"    <AI>\n        <ID>{i}</ID>\n        <RANGE>0143</RANGE>\n        <NAME>+/- 10 V</NAME>\n"
+                         f"        <MAX>10</MAX>\n        <MIN>-10</MIN>\n        <UNIT>V</UNIT>\n    </AI>\n"
+                         for i in range(6)) + '</ADAM-6024>').encode()
+
+
+class Simulators:
+    """
+    starts simulators in child processes and stops them on exit
+    """
+
+    def __init__(self, count, model="6050", latency=0.0, max_connections=None, modbus=False):
+        self.processes = []
+        self.ports = []
+        for _ in range(count):
+            command = [sys.executable, "-m", "adam_io.simulator", "--model", model, "--latency", str(latency)]
+            if max_connections:
+                command += ["--max-connections", str(max_connections)]
+            if modbus:
+                command.append("--modbus")
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__))))
+            self.processes.append(process)
+            self.ports.append(int(process.stdout.readline()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        for process in self.processes:
+            process.terminate()
+            process.wait()
+            process.stdout.close()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(name, operation, iterations, operations_per_call=1):
+    """
+    :return: dictionary of the results, latencies are per call, throughput per operation
+    """
+    # warm up, connections are opened and caches filled
+    for _ in range(min(10, iterations)):
+        operation()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(min(iterations, 200)):
+        operation()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_sec": iterations * operations_per_call / elapsed,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "peak_alloc_kib": (peak - before) / 1024,
+        "retained_bytes_per_call": (current - before) / min(iterations, 200),
+    }
+
+
+def bench_parsing(iterations):
+    di = DigitalInput(DI_BODY)
+    ai = AnalogInput(AI_BODY)
+    return [
+        measure("parse DigitalInput", lambda: DigitalInput(DI_BODY), iterations),
+        measure("parse DigitalInput in place", lambda: di.update(DI_BODY), iterations),
+        measure("parse AnalogInput", lambda: AnalogInput(AI_BODY), iterations),
+        measure("parse AnalogInput in place", lambda: ai.update(AI_BODY), iterations),
+        measure("parse AnalogInputRange", lambda: AnalogInputRange(AI_RANGE_BODY), iterations),
+    ]
+
+
+def bench_device(iterations, latency, max_connections):
+    results = []
+    with Simulators(1, "6050", latency, max_connections) as simulators:
+        adam = Adam6050D('127.0.0.1', 'root', '00000000', port=simulators.ports[0])
+        shadowed = Adam6050D('127.0.0.1', 'root', '00000000', port=simulators.ports[0], shadow=True)
+        do = DigitalOutput()
+        state = [0]
+
+        def write(device):
+            state[0] ^= 1
+            do[0] = state[0]
+            device.output(do)
+
+        results.append(measure("read input", adam.input, iterations))
+        results.append(measure("read output", adam.output, iterations))
+        results.append(measure("write output", lambda: write(adam), iterations))
+        results.append(measure("write output shadowed", lambda: write(shadowed), iterations))
+        adam.close()
+        shadowed.close()
+
+    with Simulators(1, "6024", latency, max_connections) as simulators:
+        adam = Adam6024D('127.0.0.1', 'root', '00000000', port=simulators.ports[0])
+        results.append(measure("read analog input", adam.a_input, iterations))
+        adam.close()
+
+    with Simulators(1, "6024", latency, modbus=True) as simulators:
+        adam = Adam6024D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=simulators.ports[0])
+        results.append(measure("read input modbus", adam.d_input, iterations))
+        results.append(measure("read analog input modbus", adam.a_input, iterations))
+        adam.close()
+    return results
+
+
+def bench_fleet(iterations, latency, max_connections, devices):
+    with Simulators(devices, "6050", latency, max_connections) as simulators:
+        fleet = AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), port) for port in simulators.ports],
+                          max_concurrency=devices)
+        result = measure(f"fleet sweep of {devices} devices", fleet.poll_once, iterations, devices)
+        fleet.stop()
+    return [result]
+
+
+def report(results):
+    print(f"{'benchmark':36} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>10} {'B/call':>8}")
+    for result in results:
+        print(f"{result['name']:36} {result['ops_per_sec']:12.0f} {result['p50_us']:10.1f} "
+              f"{result['p99_us']:10.1f} {result['peak_alloc_kib']:10.1f} {result['retained_bytes_per_call']:8.0f}")
+
+
+def compare(results, baseline_file, max_slowdown):
+    """
+    :return: names of the benchmarks that are more than max_slowdown times slower than the baseline
+    """
+    with open(baseline_file) as f:
+        baseline = {result["name"]: result for result in json.load(f)}
+    slower = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous and previous["ops_per_sec"] > result["ops_per_sec"] * max_slowdown:
+            slower.append(result["name"])
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ADAM IO benchmarks")
+    parser.add_argument("--quick", action="store_true", help="few iterations, for CI")
+    parser.add_argument("--iterations", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the simulators delay every response")
+    parser.add_argument("--max-connections", type=int, default=None, help="connection limit of the simulators")
+    parser.add_argument("--devices", type=int, default=8, help="number of simulators in the fleet benchmark")
+    parser.add_argument("--output", help="write the results as json")
+    parser.add_argument("--baseline", help="json results of an earlier run to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=2.0,
+                        help="fail if a benchmark is this many times slower than the baseline")
+    args = parser.parse_args(argv)
+
+    iterations = args.iterations or (200 if args.quick else 2000)
+    results = bench_parsing(iterations * 10)
+    results += bench_device(iterations, args.latency, args.max_connections)
+    results += bench_fleet(max(iterations // 10, 10), args.latency, args.max_connections, args.devices)
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        slower = compare(results, args.baseline, args.max_slowdown)
+        if slower:
+            print("slower than the baseline:", ", ".join(slower))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
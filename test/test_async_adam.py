@@ -0,0 +1,67 @@
+import asyncio
+import time
+import unittest
+
+from adam_io.async_adam import AsyncAdam6050D, AsyncAdam6024D
+from adam_io.digital_io import DigitalOutput
+
+from adam_io.simulator import AdamSimulator
+
+
+class AsyncAdamTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    def test_output_and_input(self):
+        with AdamSimulator() as server:
+            adam = AsyncAdam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+
+            async def scenario():
+                do = DigitalOutput()
+                do[1] = 1
+                self.assertTrue(await adam.output(do))
+                current = await adam.output()
+                di = await adam.input()
+                adam.close()
+                return current, di
+
+            current, di = self.loop.run_until_complete(scenario())
+            self.assertEqual(current[1], 1)
+            self.assertEqual(di[11], 0)
+            self.assertEqual(server.connections, 1)
+
+    def test_timeout(self):
+        with AdamSimulator(latency=1.0) as server:
+            adam = AsyncAdam6050D('127.0.0.1', 'root', '00000000', port=server.port, timeout=0.1)
+
+            async def scenario():
+                start = time.monotonic()
+                with self.assertRaises(asyncio.TimeoutError):
+                    await adam.input()
+                adam.close()
+                return time.monotonic() - start
+
+            self.assertLess(self.loop.run_until_complete(scenario()), 0.5)
+
+    def test_concurrent_requests_across_devices(self):
+        with AdamSimulator() as first, AdamSimulator.model("6024") as second:
+            first.di[3] = 1
+            second.ai[5] = 0x1234
+            adam_6050 = AsyncAdam6050D('127.0.0.1', 'root', '00000000', port=first.port)
+            adam_6024 = AsyncAdam6024D('127.0.0.1', 'root', '00000000', port=second.port)
+
+            async def scenario():
+                reads = [adam_6050.input() for _ in range(4)] + [adam_6024.a_input() for _ in range(4)]
+                results = await asyncio.gather(*reads)
+                adam_6050.close()
+                adam_6024.close()
+                return results
+
+            results = self.loop.run_until_complete(scenario())
+            self.assertTrue(all(result[3] == 1 for result in results[:4]))
+            self.assertTrue(all(result[5] == 0x1234 for result in results[4:]))
+            self.assertLessEqual(first.connections, 2)
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from adam_io import cli
+from adam_io.simulator import AdamSimulator
+
+
+class CliTest(unittest.TestCase):
+
+    def run_cli(self, *argv):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            status = cli.main(list(argv) + ["--username", "root", "--password", "00000000"])
+        return status, stderr.getvalue()
+
+    def test_poll_jsonl(self):
+        with AdamSimulator.model("6024") as first, AdamSimulator.model("6024") as second:
+            first.ai[2] = 0x1234
+            with tempfile.TemporaryDirectory() as directory:
+                output = os.path.join(directory, "poll.jsonl")
+                status, summary = self.run_cli("poll", f"127.0.0.1:{first.port}", f"127.0.0.1:{second.port}",
+                                               "--model", "6024", "--rate", "100", "--count", "3", "-o", output)
+                with open(output) as f:
+                    rows = [json.loads(line) for line in f]
+        self.assertEqual(status, 0)
+        self.assertEqual(len(rows), 6)
+        row = [row for row in rows if row["device"] == f"127.0.0.1:{first.port}"][0]
+        self.assertEqual(row["ai"][2], 0x1234)
+        self.assertIsNone(row["error"])
+        self.assertIn("samples: 6", summary)
+
+    def test_set_and_poll_csv(self):
+        with AdamSimulator() as server:
+            device = f"127.0.0.1:{server.port}"
+            status, _ = self.run_cli("set", device, "DO0=1", "DO5=1")
+            self.assertEqual(status, 0)
+            self.assertEqual(server.do, [1, 0, 0, 0, 0, 1])
+            with tempfile.TemporaryDirectory() as directory:
+                output = os.path.join(directory, "poll.csv")
+                self.run_cli("poll", device, "--count", "1", "--format", "csv", "-o", output)
+                with open(output) as f:
+                    header, row = f.read().splitlines()
+        self.assertEqual(header.split(","), ["time", "device", "di", "do", "latency_ms", "error"])
+        self.assertEqual(row.split(",")[3], str(0b100001))
+
+    def test_csv_header_from_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "poll.csv")
+            # nothing listens on the port, the first row is an error row
+            status, _ = self.run_cli("poll", "127.0.0.1:1", "--model", "6024", "--count", "1", "--timeout", "0.5",
+                                     "--format", "csv", "-o", output)
+            with open(output) as f:
+                header, row = f.read().splitlines()
+        self.assertEqual(status, 1)
+        self.assertEqual(header.split(","), ["time", "device", "di", "do", "ai0", "ai1", "ai2", "ai3", "ai4", "ai5",
+                                             "ao0", "ao1", "latency_ms", "error"])
+        self.assertEqual(len(next(csv.reader([row]))), len(header.split(",")))
+
+    def test_credentials_required(self):
+        environ = {name: os.environ.pop(name) for name in ("ADAM_USERNAME", "ADAM_PASSWORD") if name in os.environ}
+        try:
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                cli.main(["bench", "127.0.0.1"])
+        finally:
+            os.environ.update(environ)
+
+    def test_bench(self):
+        with AdamSimulator() as server:
+            status, summary = self.run_cli("bench", f"127.0.0.1:{server.port}", "--count", "20")
+        self.assertEqual(status, 0)
+        self.assertIn("samples: 20", summary)
+        self.assertIn("p99", summary)
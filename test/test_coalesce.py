@@ -0,0 +1,41 @@
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.analog_io import AnalogOutput
+from adam_io.coalesce import OutputWriteQueue
+from adam_io.digital_io import DigitalOutput
+from adam_io.simulator import AdamSimulator
+
+
+class OutputWriteQueueTest(unittest.TestCase):
+
+    def test_latest_value_wins(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            with OutputWriteQueue(adam, window=0.05) as writer:
+                futures = []
+                for value in (1, 0, 1):
+                    do = DigitalOutput()
+                    do[0] = value
+                    futures.append(writer.submit(do))
+                do = DigitalOutput()
+                do[3] = 1
+                futures.append(writer.submit(do))
+                self.assertTrue(all(future.result(1) for future in futures))
+            adam.close()
+            self.assertEqual(writer.sent, 1)
+            self.assertEqual(server.do, [1, 0, 0, 1, 0, 0])
+            self.assertEqual([method for method, _ in server.requests].count("POST"), 1)
+
+    def test_errors_reach_every_future(self):
+        with AdamSimulator.model("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+            with OutputWriteQueue(adam, window=0.01) as writer:
+                ao = AnalogOutput()
+                ao[5] = '00FF'
+                first = writer.submit(ao)
+                second = writer.submit(ao)
+                with self.assertRaises(Exception):
+                    first.result(1)
+                self.assertIsNotNone(second.exception(1))
+            adam.close()
@@ -0,0 +1,61 @@
+import socket
+import time
+import unittest
+
+from adam_io.fleet import AdamFleet
+from adam_io.resilience import DEFAULT_TIMEOUT
+
+from adam_io.simulator import AdamSimulator
+
+
+def unused_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class AdamFleetTest(unittest.TestCase):
+
+    def test_poll_once(self):
+        with AdamSimulator() as first, AdamSimulator.model("6024") as second:
+            first.di[0] = 1
+            second.ao[1] = 0x0182
+            dead_port = unused_port()
+            fleet = AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), first.port),
+                               ("127.0.0.1", "ADAM-6024D", ("root", "00000000"), second.port),
+                               ("127.0.0.1", "6050", ("root", "00000000"), dead_port)], max_concurrency=2)
+            snapshots = fleet.poll_once()
+            fleet.stop()
+
+        first_key, second_key, dead_key = (f"127.0.0.1:{port}" for port in (first.port, second.port, dead_port))
+        self.assertEqual(snapshots[first_key]["input"][0], 1)
+        self.assertEqual(snapshots[second_key]["a_output"][1], 0x0182)
+        self.assertFalse(snapshots[dead_key].ok)
+        self.assertEqual(fleet.failed(), [dead_key])
+        self.assertLessEqual(snapshots[first_key].timestamp, time.time())
+        self.assertEqual(fleet.devices[dead_key][1].requestor.timeout, DEFAULT_TIMEOUT)
+
+    def test_background_polling(self):
+        with AdamSimulator() as server:
+            with AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), server.port)], period=0.01) as fleet:
+                time.sleep(0.2)
+            self.assertGreater(fleet.sweeps, 2)
+            self.assertTrue(fleet.latest(f"127.0.0.1:{server.port}").ok)
+
+    def test_failing_listener(self):
+        with AdamSimulator() as server:
+            fleet = AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), server.port)], period=0.01)
+            sweeps = []
+
+            def failing(snapshots):
+                raise Exception("publisher failed")
+
+            fleet.listeners += [failing, sweeps.append]
+            with self.assertLogs("adam_io.fleet", level="ERROR"):
+                with fleet:
+                    time.sleep(0.2)
+        # the polling went on, and the listeners after the failing one were still called
+        self.assertGreater(fleet.sweeps, 2)
+        self.assertEqual(len(sweeps), fleet.sweeps)
@@ -0,0 +1,65 @@
+import unittest
+
+from adam_io.digital_io import DigitalInput
+from adam_io.history import InputHistory
+from adam_io.subscription import FALLING, RISING
+
+
+class InputHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = InputHistory(channels=12)
+        # DI0 high from 10 to 20 and from 30 on, DI1 high from 15 to 30, polled every 0.1s until 40
+        for tick in range(301):
+            t = 10 + tick * 0.1
+            di0 = 1 if t < 20 - 1e-9 or t >= 30 - 1e-9 else 0
+            di1 = 1 if 15 - 1e-9 <= t < 30 - 1e-9 else 0
+            self.history.append(t, DigitalInput.from_mask(di0 | di1 << 1))
+
+    def test_runs(self):
+        history = self.history
+        self.assertEqual(history.polls, 301)
+        # one run per change of state, not per poll
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history.nbytes, 4 * 10)
+        with self.assertRaises(Exception):
+            history.append(5.0, 0)
+
+    def test_state_at(self):
+        history = self.history
+        self.assertIsNone(history.state_at(9.9))
+        self.assertEqual(history.state_at(10.0).to_mask(), 0b01)
+        self.assertEqual(history.state_at(17.0)[1], 1)
+        self.assertEqual(history.mask_at(25.0), 0b10)
+        self.assertEqual(history.mask_at(100.0), 0b01)
+
+    def test_edges(self):
+        history = self.history
+        self.assertEqual([(e.value, round(e.timestamp, 1)) for e in history.edges(0)], [(0, 20.0), (1, 30.0)])
+        self.assertEqual([round(e.timestamp, 1) for e in history.edges(1, 0, 29, edge=RISING)], [15.0])
+        self.assertEqual(history.edges(1, 16, 29), [])
+        self.assertEqual([e.edge for e in history.edges(1, edge=FALLING)], [FALLING])
+        self.assertEqual(history.edges(5), [])
+        with self.assertRaises(Exception):
+            history.edges(12)
+
+    def test_duty_cycle(self):
+        history = self.history
+        self.assertAlmostEqual(history.duty_cycle(0), 20 / 30, places=3)
+        self.assertAlmostEqual(history.duty_cycle(1, 10, 20), 0.5, places=3)
+        self.assertAlmostEqual(history.duty_cycle(0, 0, 15), 1.0)
+        self.assertIsNone(history.duty_cycle(0, 50, 60))
+        with self.assertRaises(Exception):
+            history.duty_cycle(-1)
+
+    def test_trim(self):
+        history = self.history
+        history.trim(25.0)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.first, 25.0)
+        self.assertEqual(history.mask_at(26.0), 0b10)
+        self.assertIsNone(history.state_at(20.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from adam_io.analog_io import AnalogInput, AnalogOutput, AnalogOutputRange
+from adam_io.digital_io import DigitalInput, DigitalOutput
+
+
+def response(tag, values, fmt="{}"):
+    items = ''.join(f"<{tag}><ID>{i}</ID><VALUE>{fmt.format(v)}</VALUE></{tag}>" for i, v in enumerate(values))
+    return f'<?xml version="1.0" ?><ADAM-6050 status="OK">{items}</ADAM-6050>'.encode()
+
+
+class DigitalStateTest(unittest.TestCase):
+
+    def test_input_mask(self):
+        di = DigitalInput(response("DI", [1, 0, 1] + [0] * 9))
+        self.assertEqual(di.to_mask(), 0b101)
+        self.assertEqual((di[0], di[1], di[2]), (1, 0, 1))
+        self.assertEqual(dict(di)["DI11"], 0)
+        with self.assertRaises(KeyError):
+            di[12]
+        # parsed responses keep the identity equality and hashing they always had
+        self.assertNotEqual(di, DigitalInput.from_mask(0b101, name="ADAM-6050"))
+        self.assertIn(di, {di})
+
+    def test_input_update_in_place(self):
+        di = DigitalInput(response("DI", [0] * 12))
+        previous = di.to_mask()
+        same = di.update(response("DI", [0, 0, 0, 1] + [0] * 8))
+        self.assertIs(same, di)
+        self.assertEqual(di ^ previous, 1 << 3)
+
+    def test_output_unset_values(self):
+        do = DigitalOutput()
+        do[1] = 1
+        do[4] = 0
+        self.assertEqual(do.as_dict(), {"DO1": 1, "DO4": 0})
+        self.assertIsNone(do[0])
+        self.assertEqual(len(list(do)), 6)
+        do.clear()
+        self.assertEqual(do(), {})
+        self.assertEqual(DigitalOutput.from_mask(0b10).as_dict(), {f"DO{i}": int(i == 1) for i in range(6)})
+
+
+class AnalogStateTest(unittest.TestCase):
+
+    def test_input_array(self):
+        ai = AnalogInput(response("AI", [0, 0x7FFF, 0xFFFF], "{:04X}"))
+        self.assertEqual(ai.values().typecode, 'H')
+        self.assertEqual(list(ai.values()), [0, 0x7FFF, 0xFFFF])
+        buffer = ai.values()
+        ai.update(response("AI", [1, 2, 3], "{:04X}"))
+        self.assertIs(ai.values(), buffer)
+        self.assertEqual(ai[2], 3)
+        self.assertEqual(list(ai.values()), [1, 2, 3])
+
+    def test_output_out_of_range(self):
+        ao = AnalogOutput(quantity=2, array=[0x0FFF, "0800"])
+        self.assertEqual(ao(), {"AO0": "0FFF", "AO1": "0800"})
+        for value in (0x1000, -1):
+            ao[0] = value
+            with self.assertRaises(Exception):
+                ao.as_dict()
+        ranges = AnalogOutputRange(quantity=1)
+        ranges[0] = 0x10000
+        with self.assertRaises(Exception):
+            ranges.as_dict()
@@ -0,0 +1,75 @@
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.analog_io import AnalogInput
+from adam_io.digital_io import DigitalInput
+from adam_io.memo import ResponseCache
+from adam_io.simulator import AdamSimulator
+
+
+def response(values):
+    items = ''.join(f"<DI><ID>{i}</ID><VALUE>{v}</VALUE></DI>" for i, v in enumerate(values))
+    return f'<?xml version="1.0" ?><ADAM-6050 status="OK">{items}</ADAM-6050>'.encode()
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = ResponseCache(size=2)
+        first, unchanged = cache.parse("d_input", DigitalInput, response([0, 1]))
+        self.assertFalse(unchanged)
+        self.assertEqual(first.to_mask(), 0b10)
+        again, unchanged = cache.parse("d_input", DigitalInput, response([0, 1]))
+        self.assertIs(again, first)
+        self.assertTrue(unchanged)
+        other, unchanged = cache.parse("d_input", DigitalInput, response([1, 1]))
+        self.assertFalse(unchanged)
+        # toggling back is served from the cache but is a change
+        back, unchanged = cache.parse("d_input", DigitalInput, response([0, 1]))
+        self.assertIs(back, first)
+        self.assertFalse(unchanged)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        cache.parse("d_input", DigitalInput, response([1, 0]))
+        # [1, 1] was the least recently used
+        self.assertIsNot(cache.parse("d_input", DigitalInput, response([1, 1]))[0], other)
+
+    def test_frozen(self):
+        cache = ResponseCache()
+        di, _ = cache.parse("d_input", DigitalInput, response([0, 1]))
+        self.assertIsInstance(di, DigitalInput)
+        with self.assertRaises(Exception):
+            di.update(response([1, 1]))
+        with self.assertRaises(Exception):
+            di.name = "ADAM"
+        self.assertEqual(cache.parse("d_input", DigitalInput, response([0, 1]))[0].to_mask(), 0b10)
+        items = "".join(f"<AI><ID>{i}</ID><VALUE>{v:04X}</VALUE></AI>" for i, v in enumerate((1, 2)))
+        body = f'<?xml version="1.0" ?><ADAM-6024 status="OK">{items}</ADAM-6024>'.encode()
+        ai, _ = cache.parse("a_input", AnalogInput, body)
+        ai.values()[0] = 7
+        self.assertEqual(ai[0], 1)
+
+    def test_adam(self):
+        with AdamSimulator.model("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, memoize=True)
+            first = adam.d_input()
+            self.assertIs(adam.d_input(), first)
+            self.assertTrue(adam.unchanged["d_input", None])
+            server.di[0] = 1
+            changed = adam.d_input()
+            self.assertFalse(adam.unchanged["d_input", None])
+            self.assertEqual(changed[0], 1)
+            ai = adam.a_input()
+            self.assertIs(adam.a_input(), ai)
+            adam.d_input(1)
+            # a single channel read does not tell about the read of every channel
+            self.assertFalse(adam.unchanged["d_input", 1])
+            self.assertFalse(adam.unchanged["d_input", None])
+            adam.close()
+
+            plain = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            self.assertEqual(plain.unchanged, {})
+            plain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.metrics import MetricsCollector, TimingHook
+from adam_io.simulator import AdamSimulator
+
+
+class Recorder(TimingHook):
+    def __init__(self):
+        self.requests = []
+        self.parses = []
+
+    def on_request(self, timing):
+        self.requests.append(timing)
+
+    def on_parse(self, timing, seconds):
+        self.parses.append((timing, seconds))
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_phases(self):
+        recorder = Recorder()
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            adam.instrument(recorder)
+            adam.input()
+            adam.input()
+            adam.close()
+        first, second = recorder.requests
+        self.assertEqual(first.endpoint, "/digitalinput/all/value")
+        self.assertEqual(first.device, f"127.0.0.1:{server.port}")
+        self.assertEqual(first.status, 200)
+        self.assertEqual(set(first.phases), {"connect", "send", "first_byte", "body", "parse"})
+        # the second request reuses the connection
+        self.assertNotIn("connect", second.phases)
+        self.assertEqual(len(recorder.parses), 2)
+        self.assertGreater(first.bytes_received, 0)
+
+    def test_prometheus(self):
+        metrics = MetricsCollector()
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            adam.instrument(metrics)
+            adam.on()
+            adam.off()
+            with self.assertRaises(Exception):
+                adam.requestor.d_input(20)
+            adam.requestor.uninstrument(metrics)
+            adam.input()
+            adam.close()
+        device = f"127.0.0.1:{server.port}"
+        output = metrics.get(device, "/digitaloutput/all/value")
+        self.assertEqual(output.requests, 2)
+        self.assertEqual(output.latency.count, 2)
+        self.assertGreater(output.bytes_sent, 0)
+        self.assertEqual(metrics.get(device, "/digitalinput/20/value").errors, 1)
+        self.assertIsNone(metrics.get(device, "/digitalinput/all/value"))
+
+        text = metrics.to_prometheus()
+        self.assertIn('adam_requests_total{device="%s",endpoint="/digitaloutput/all/value"} 2' % device, text)
+        self.assertIn('adam_request_duration_seconds_bucket{device="%s",endpoint="/digitaloutput/all/value",'
+                      'le="+Inf"} 2' % device, text)
+        self.assertIn('phase="first_byte"', text)
+        self.assertIn('adam_request_errors_total{device="%s",endpoint="/digitalinput/20/value"} 1' % device, text)
+
+    def test_hooks_copy_on_write(self):
+        first, second = Recorder(), Recorder()
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            adam.instrument(first)
+            adam.instrument(second)
+            # the list a request thread iterates is never changed under it
+            hooks = adam.requestor.hooks
+            adam.requestor.uninstrument(first)
+            self.assertEqual(hooks, [first, second])
+            self.assertEqual(adam.requestor.hooks, [second])
+            adam.input()
+            adam.close()
+        self.assertEqual(len(first.requests), 0)
+        self.assertEqual(len(second.requests), 1)
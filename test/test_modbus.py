@@ -0,0 +1,86 @@
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.analog_io import AnalogInput, AnalogOutput
+from adam_io.digital_io import DigitalInput, DigitalOutput
+from adam_io.metrics import MetricsCollector
+from adam_io.modbus import ModbusRequestor
+from adam_io.simulator import ModbusSimulator
+
+
+class ModbusTest(unittest.TestCase):
+
+    def test_digital(self):
+        with ModbusSimulator("6050") as server:
+            server.di[0] = 1
+            server.di[11] = 1
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port)
+            di = adam.input()
+            self.assertIsInstance(di, DigitalInput)
+            self.assertEqual(di.to_mask(), 0b100000000001)
+            self.assertEqual(di.name, "ADAM-6050")
+
+            do = DigitalOutput()
+            do[1] = 1
+            do[5] = 1
+            self.assertTrue(adam.output(do))
+            self.assertEqual(server.do, [0, 1, 0, 0, 0, 1])
+            # DO2-DO4 are read once so that DO1-DO5 go in a single write
+            self.assertEqual(list(server.requests), [0x01, 0x01, 0x0F])
+            do = DigitalOutput()
+            do[3] = 1
+            do[4] = 1
+            self.assertTrue(adam.output(do))
+            # adjacent channels are written without reading first
+            self.assertEqual(list(server.requests)[3:], [0x0F])
+            self.assertEqual(server.do, [0, 1, 0, 1, 1, 1])
+            self.assertEqual(adam.output().to_mask(), 0b111010)
+            self.assertEqual(server.connections, 1)
+            adam.close()
+
+    def test_analog(self):
+        with ModbusSimulator("6024") as server:
+            server.ai[:] = [0, 0x7FFF, 0xFFFF, 3, 4, 5]
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port, shadow=True)
+            ai = adam.a_input()
+            self.assertIsInstance(ai, AnalogInput)
+            self.assertEqual(list(ai.values()), [0, 0x7FFF, 0xFFFF, 3, 4, 5])
+
+            ao = AnalogOutput(quantity=2)
+            ao[0] = 0x0FFF
+            ao[1] = 0x0800
+            self.assertTrue(adam.a_output(ao))
+            self.assertEqual(server.ao, [0x0FFF, 0x0800])
+            self.assertEqual(adam.a_output()[1], 0x0800)
+            adam.close()
+
+    def test_reconnect_and_errors(self):
+        with ModbusSimulator("6050") as server:
+            requestor = ModbusRequestor('127.0.0.1', port=server.port)
+            requestor.d_input()
+            requestor._sock.shutdown(2)
+            # the dropped socket is replaced transparently
+            self.assertEqual(requestor.d_input().to_mask(), 0)
+            self.assertEqual(requestor.reconnects, 1)
+            with self.assertRaises(Exception):
+                requestor.a_input()
+            with self.assertRaises(Exception):
+                requestor.read_coils(100, 1)
+            requestor.close()
+
+    def test_instrument(self):
+        metrics = MetricsCollector()
+        with ModbusSimulator("6050") as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port)
+            adam.instrument(metrics)
+            adam.input()
+            adam.on()
+            with self.assertRaises(Exception):
+                adam.requestor.read_coils(100, 1)
+            adam.requestor.uninstrument(metrics)
+            adam.input()
+            adam.close()
+        device = f"127.0.0.1:{server.port}"
+        self.assertEqual(metrics.get(device, "/modbus/read_coils/0").requests, 1)
+        self.assertEqual(metrics.get(device, "/modbus/write_coils/16").requests, 1)
+        self.assertEqual(metrics.get(device, "/modbus/read_coils/100").errors, 1)
@@ -0,0 +1,70 @@
+import unittest
+
+from adam_io.analog_io import AnalogInput, AnalogInputRange, AnalogOutput
+from adam_io.digital_io import DigitalInput, DigitalOutput
+from adam_io.parser import parse_response, check_update
+
+AI_RANGE = b"""<?xml version="1.0" ?>
+<ADAM-6024 status="OK">
+    <AI>
+        <ID>0</ID>
+        <RANGE>0143</RANGE>
+        <NAME>+/- 10 V</NAME>
+        <MAX>10</MAX>
+        <MIN>-10</MIN>
+        <UNIT>V</UNIT>
+    </AI>
+    <AI>
+        <ID>1</ID>
+        <RANGE>0182</RANGE>
+        <NAME>0 ~ 20 mA</NAME>
+        <MAX>20</MAX>
+        <MIN>0</MIN>
+        <UNIT>mA</UNIT>
+    </AI>
+</ADAM-6024>
+"""
+
+DI = b"""<?xml version="1.0" ?>
+<ADAM-6024 status="OK">
+    <DI>
+        <ID>0</ID>
+        <VALUE>1</VALUE>
+    </DI>
+    <DI>
+        <ID>1</ID>
+        <VALUE>0</VALUE>
+    </DI>
+</ADAM-6024>
+"""
+
+
+class ParserTest(unittest.TestCase):
+
+    def test_single_pass_fields(self):
+        response = parse_response(AI_RANGE)
+        self.assertEqual(response.name, "ADAM-6024")
+        self.assertEqual(response.records[1], {"ID": "1", "RANGE": "0182", "NAME": "0 ~ 20 mA",
+                                               "MAX": "20", "MIN": "0", "UNIT": "mA"})
+        self.assertEqual(response.column("UNIT"), ["V", "mA"])
+
+    def test_fallback_matches_fast_path(self):
+        escaped = AI_RANGE.replace(b"0 ~ 20 mA", b"0 &amp; 20 mA")
+        response = parse_response(escaped)
+        self.assertEqual(response.records[1]["NAME"], "0 & 20 mA")
+        self.assertEqual(response.records[0], parse_response(AI_RANGE).records[0])
+
+    def test_status(self):
+        with self.assertRaises(Exception):
+            parse_response(b'<ADAM-6050 status="Fail"></ADAM-6050>')
+        self.assertEqual(check_update(b'<ADAM-6050 status="OK"></ADAM-6050>').records, [])
+
+    def test_io_classes(self):
+        di = DigitalInput(DI)
+        self.assertEqual((di.name, di[0], di[1]), ("ADAM-6024", 1, 0))
+        self.assertEqual(DigitalOutput(xml_string=DI.replace(b"DI>", b"DO>")).as_dict(), {"DO0": 1, "DO1": 0})
+        ranges = AnalogInputRange(AI_RANGE)
+        self.assertEqual((ranges[1], ranges.units["AI1"]), (0x182, "mA"))
+        ai = AnalogInput(DI.replace(b"<VALUE>1</VALUE>", b"<VALUE>FFFF</VALUE>").decode())
+        self.assertEqual(ai[0], 0xFFFF)
+        self.assertEqual(AnalogOutput(xml_string=DI.replace(b"DI>", b"AO>")).as_dict(), {"AO0": "0001", "AO1": "0000"})
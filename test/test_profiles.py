@@ -0,0 +1,60 @@
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D, device_class
+from adam_io.digital_io import DigitalOutput
+from adam_io.fleet import AdamFleet
+from adam_io.profiles import DeviceProfile, PROFILES, get_profile, register_profile
+from adam_io.simulator import AdamSimulator, ModbusSimulator
+
+
+class ProfileTest(unittest.TestCase):
+
+    def test_registry(self):
+        self.assertIs(get_profile("ADAM-6050D"), PROFILES["6050"])
+        self.assertEqual(get_profile("6052").name, "ADAM-6052")
+        self.assertEqual(get_profile("6024").modbus, {"DI": (0, 2), "DO": (16, 2), "AI": (0, 6), "AO": (10, 2)})
+        with self.assertRaises(Exception):
+            get_profile("9999")
+        self.assertEqual((Adam6050D.DI_COUNT, Adam6050D.DO_COUNT), (12, 6))
+        self.assertEqual((Adam6024D.AI_COUNT, Adam6024D.AO_COUNT), (6, 2))
+        self.assertEqual(len(list(DigitalOutput())), 6)
+
+    def test_generated_class(self):
+        adam_class = device_class("6052")
+        self.assertIs(adam_class, device_class("ADAM-6052"))
+        self.assertEqual(adam_class.__name__, "Adam6052")
+        self.assertTrue(hasattr(adam_class, "d_input"))
+        self.assertFalse(hasattr(adam_class, "a_input"))
+        self.assertIs(device_class("6050"), Adam6050D)
+
+        with AdamSimulator.model("6052") as server:
+            adam = adam_class('127.0.0.1', 'root', '00000000', port=server.port)
+            server.di[7] = 1
+            self.assertEqual(adam.d_input().to_mask(), 1 << 7)
+            server.requests.clear()
+            self.assertTrue(adam.on())
+            # the body of on() is built once for the class, no read first
+            self.assertEqual(list(server.requests), [("POST", "/digitaloutput/all/value")])
+            self.assertEqual(server.do, [1] * 8)
+            do = DigitalOutput(quantity=8)
+            do[3] = 0
+            self.assertTrue(adam.d_output(do))
+            self.assertEqual(server.do, [1, 1, 1, 0, 1, 1, 1, 1])
+            adam.close()
+
+    def test_registered_model(self):
+        register_profile(DeviceProfile("6056", do=12, description="12 digital outputs"))
+        try:
+            with ModbusSimulator("6056") as server:
+                adam = device_class("6056")('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port)
+                adam.on()
+                self.assertEqual(server.do, [1] * 12)
+                self.assertEqual(adam.d_output().to_mask(), (1 << 12) - 1)
+                adam.close()
+            self.assertEqual(AdamFleet._profile_endpoints("6056")[1], ("d_output",))
+        finally:
+            del PROFILES["6056"]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import time
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.pulse import PulseScheduler
+from adam_io.simulator import AdamSimulator
+
+
+class PulseSchedulerTest(unittest.TestCase):
+
+    def test_pulse(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            with PulseScheduler(adam) as scheduler:
+                pulse = scheduler.pulse(2, 0.1)
+                time.sleep(0.05)
+                self.assertEqual(server.do[2], 1)
+                self.assertTrue(pulse.wait(1))
+            adam.close()
+            self.assertEqual(server.do[2], 0)
+            on, off = pulse.steps
+            self.assertAlmostEqual(off.scheduled - on.scheduled, 0.1)
+            for step in pulse.steps:
+                self.assertIsNone(step.error)
+                self.assertGreaterEqual(step.lateness, 0)
+                self.assertLess(step.lateness, 0.05)
+
+    def test_due_steps_are_merged(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            with PulseScheduler(adam, tick=0.01) as scheduler:
+                start = time.monotonic() + 0.02
+                sequence = scheduler.sequence([(0.0, 0, 1), (0.0, 1, 1), (0.05, 0, 0)], start=start)
+                self.assertTrue(sequence.wait(1))
+            adam.close()
+            self.assertEqual(scheduler.writes, 2)
+            self.assertEqual(server.do[:2], [0, 1])
+            first, second, third = sequence.report()
+            self.assertEqual(first[3], second[3])
+            self.assertNotEqual(first[3], third[3])
+            for step in sequence.steps:
+                self.assertGreaterEqual(step.lateness, 0)
+
+    def test_short_pulse_is_not_merged(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            with PulseScheduler(adam, tick=0.01) as scheduler:
+                pulse = scheduler.pulse(3, 0.0005, delay=0.02)
+                self.assertTrue(pulse.wait(1))
+            adam.close()
+            # the on and the off step are both written, in that order
+            self.assertEqual(scheduler.writes, 2)
+            on, off = pulse.steps
+            self.assertLess(on.actual, off.actual)
+            self.assertEqual(server.do[3], 0)
+            for step in pulse.steps:
+                self.assertGreaterEqual(step.lateness, 0)
@@ -0,0 +1,71 @@
+import time
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.digital_io import DigitalOutput
+from adam_io.requestor import Requestor
+
+from adam_io.simulator import AdamSimulator
+
+
+class RequestorPoolTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = AdamSimulator().start()
+        self.requestor = Requestor('127.0.0.1', 'root', '00000000', port=self.server.port)
+
+    def tearDown(self) -> None:
+        self.requestor.close()
+        self.server.stop()
+
+    def test_connection_is_reused(self):
+        for _ in range(5):
+            self.assertIn('status="OK"', self.requestor.d_input())
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.requestor.pool.stats.misses, 1)
+        self.assertEqual(self.requestor.pool.stats.hits, 4)
+
+    def test_reconnect_after_device_drops_socket(self):
+        self.requestor.d_input()
+        self.server.drop_connections()
+        time.sleep(0.05)
+        self.assertIn('status="OK"', self.requestor.d_output())
+        self.assertEqual(self.requestor.pool.stats.reconnects, 1)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_write_after_device_drops_socket(self):
+        self.requestor.d_input()
+        self.server.drop_connections()
+        time.sleep(0.05)
+        self.assertIn('status="OK"', self.requestor.d_output({"DO0": 1}))
+        self.assertEqual(self.server.do[0], 1)
+        self.assertEqual(self.requestor.pool.stats.reconnects, 1)
+
+    def test_writes_are_not_resent(self):
+        self.requestor.d_input()
+        methods = []
+
+        def reset(connection, method, *args):
+            methods.append(method)
+            raise ConnectionResetError()
+
+        self.requestor.pool._send = reset
+        with self.assertRaises(ConnectionResetError):
+            self.requestor.d_output({"DO0": 1})
+        self.assertEqual(methods, ["POST"])
+        del self.requestor.pool._send
+        self.requestor.d_input()
+        self.requestor.pool._send = reset
+        with self.assertRaises(ConnectionResetError):
+            self.requestor.d_input()
+        # a read on a reused connection is retried once on a new one
+        self.assertEqual(methods, ["POST", "GET", "GET"])
+
+    def test_adam_output_over_pool(self):
+        adam = Adam6050D('127.0.0.1', 'root', '00000000', port=self.server.port)
+        do = DigitalOutput()
+        do[2] = 1
+        self.assertTrue(adam.output(do))
+        self.assertEqual(adam.output()[2], 1)
+        adam.close()
+        self.assertEqual(self.server.connections, 1)
@@ -0,0 +1,81 @@
+import socket
+import time
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.requestor import LocalTimeoutError, Requestor
+from adam_io.resilience import DEFAULT_TIMEOUT, CircuitBreaker, CircuitOpenError, RetryPolicy, request_timeout
+from adam_io.simulator import AdamSimulator
+
+
+class ResilienceTest(unittest.TestCase):
+
+    def test_deadline(self):
+        with AdamSimulator(latency=1.0) as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, timeout=0.1)
+            start = time.monotonic()
+            with self.assertRaises(socket.timeout):
+                adam.input()
+            self.assertLess(time.monotonic() - start, 0.5)
+            adam.close()
+
+    def test_request_timeout(self):
+        with AdamSimulator(latency=1.0) as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            self.assertEqual(adam.requestor.timeout, DEFAULT_TIMEOUT)
+            start = time.monotonic()
+            with request_timeout(0.1), self.assertRaises(socket.timeout):
+                adam.input()
+            self.assertLess(time.monotonic() - start, 0.5)
+            adam.close()
+
+    def test_reads_are_retried_writes_are_not(self):
+        with AdamSimulator(max_connections=0) as server:
+            requestor = Requestor('127.0.0.1', 'root', '00000000', port=server.port,
+                                  retry=RetryPolicy(attempts=3, backoff=0.001))
+            with self.assertRaises(Exception):
+                requestor.d_input()
+            self.assertEqual(server.refused, 3)
+            with self.assertRaises(Exception):
+                requestor.d_output({"DO0": 1})
+            self.assertEqual(server.refused, 4)
+            requestor.close()
+
+    def test_delays(self):
+        delays = list(RetryPolicy(attempts=4, backoff=0.1, max_backoff=0.3, jitter=0.5).delays())
+        self.assertEqual(len(delays), 3)
+        for delay, base in zip(delays, (0.1, 0.2, 0.3)):
+            self.assertTrue(base / 2 <= delay <= base)
+
+    def test_pool_contention_is_not_a_device_failure(self):
+        with AdamSimulator() as server:
+            breaker = CircuitBreaker(failure_threshold=1)
+            requestor = Requestor('127.0.0.1', 'root', '00000000', port=server.port, pool_size=1, breaker=breaker)
+            connection, _ = requestor.pool.acquire()
+            with request_timeout(0.05), self.assertRaises(LocalTimeoutError):
+                requestor.d_input()
+            requestor.pool.release(connection)
+            self.assertEqual((breaker.state, breaker.failures), (CircuitBreaker.CLOSED, 0))
+            requestor.close()
+
+    def test_circuit_breaker(self):
+        with AdamSimulator(max_connections=0) as server:
+            breaker = CircuitBreaker(failure_threshold=2, probe_interval=0.02)
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, breaker=breaker)
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    adam.input()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            refused = server.refused
+            with self.assertRaises(CircuitOpenError):
+                adam.input()
+            self.assertEqual(breaker.rejected, 1)
+
+            server.max_connections = None
+            deadline = time.monotonic() + 2
+            while breaker.state is not CircuitBreaker.CLOSED and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertGreaterEqual(server.refused, refused)
+            self.assertEqual(adam.input()[0], 0)
+            adam.close()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from adam_io.analog_io import AnalogInput
+from adam_io.digital_io import DigitalInput
+from adam_io.samplelog import SampleLog, SampleReader, device_id, numpy
+
+
+class SampleLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_rotation_and_ranges(self):
+        with SampleLog(self.path, ai_channels=2, segment_records=4) as log:
+            for i in range(10):
+                log.append(i % 2, i, [i, 2 * i], timestamp=float(i))
+            with self.assertRaises(Exception):
+                log.append(0, 0, timestamp=5.0)
+
+        with SampleReader(self.path) as reader:
+            self.assertEqual(len(reader.segments), 3)
+            self.assertEqual(len(reader), 10)
+            samples = reader.read(3.0, 7.0)
+            if numpy is not None:
+                self.assertEqual(list(samples["timestamp"]), [3.0, 4.0, 5.0, 6.0])
+                self.assertEqual(list(samples["ai"][:, 1]), [6, 8, 10, 12])
+                self.assertEqual(list(reader.read(device=1)["di"]), [1, 3, 5, 7, 9])
+                del samples
+            else:
+                self.assertEqual([s[0] for s in samples], [3.0, 4.0, 5.0, 6.0])
+                self.assertEqual([s[3][1] for s in samples], [6, 8, 10, 12])
+                self.assertEqual([s[2] for s in reader.read(device=1)], [1, 3, 5, 7, 9])
+            self.assertEqual(len(reader.read(10.0)), 0)
+            self.assertEqual(len(reader.ranges(0.5, 3.5)), 1)
+
+    def test_numbers_after_deleted_segments(self):
+        with SampleLog(self.path, ai_channels=1, segment_records=2) as log:
+            for i in range(6):
+                log.append(0, i, [i], timestamp=float(i))
+        reader = SampleReader(self.path)
+        # retention removed the oldest segment
+        os.remove(os.path.join(self.path, "segment-000000.log"))
+        with SampleLog(self.path, ai_channels=1, segment_records=2) as log:
+            for i in range(6, 9):
+                log.append(0, i, [i], timestamp=float(i))
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ["segment-000001.log", "segment-000002.log", "segment-000003.log", "segment-000004.log"])
+        reader.refresh()
+        self.assertEqual(len(reader), 9)
+        reader.close()
+        with SampleReader(self.path) as reader:
+            self.assertEqual(len(reader), 7)
+            self.assertEqual(len(reader.read(4.0, 5.0)), 1)
+
+    def test_equal_timestamps_across_segments(self):
+        with SampleLog(self.path, ai_channels=1, segment_records=2) as log:
+            for i, timestamp in enumerate((0.0, 1.0, 1.0, 2.0)):
+                log.append(0, i, [i], timestamp=timestamp)
+        with SampleReader(self.path) as reader:
+            self.assertEqual(len(reader.read(1.0)), 3)
+
+    def test_reopen_and_refresh(self):
+        di = DigitalInput.from_mask(0b101, 12)
+        ai = AnalogInput.from_values([1, 2, 3])
+        with SampleLog(self.path, ai_channels=3) as log:
+            log.append("192.168.1.10", di, ai)
+        reader = SampleReader(self.path)
+        self.assertEqual(len(reader), 1)
+        with SampleLog(self.path, ai_channels=3) as log:
+            log.append("192.168.1.10", 0, array('H', [4, 5, 6]))
+            reader.refresh()
+            self.assertEqual(len(reader), 2)
+        with self.assertRaises(Exception):
+            SampleLog(self.path, ai_channels=4)
+        first = reader.read()[0]
+        self.assertEqual(first[1], device_id("192.168.1.10"))
+        self.assertEqual(first[2], 0b101)
+        self.assertEqual(list(first[3]), [1, 2, 3])
+        del first
+        reader.close()
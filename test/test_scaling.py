@@ -0,0 +1,46 @@
+import unittest
+
+from adam_io.adam import Adam6024D
+from adam_io.analog_io import AnalogOutputRange
+from adam_io.scaling import AO_FULL_SCALE, RangeTable
+from adam_io.simulator import AdamSimulator
+
+AO_RANGE = b"""<?xml version="1.0" ?>
+<ADAM-6024 status="OK">
+    <AO><ID>0</ID><RANGE>0182</RANGE><NAME>0 ~ 20 mA</NAME><MAX>20</MAX><MIN>0</MIN><UNIT>mA</UNIT></AO>
+    <AO><ID>1</ID><RANGE>0182</RANGE><NAME>0 ~ 20 mA</NAME><MAX>20</MAX><MIN>0</MIN><UNIT>mA</UNIT></AO>
+</ADAM-6024>
+"""
+
+
+class RangeTableTest(unittest.TestCase):
+
+    def test_both_directions(self):
+        ranges = RangeTable.from_response(AO_RANGE, AO_FULL_SCALE)
+        self.assertEqual(ranges.units(), ["mA", "mA"])
+        # 0x00FF is 1.245 mA in the 0-20 mA range
+        self.assertAlmostEqual(float(ranges.to_engineering([0x00FF, 0])[0]), 1.245, places=3)
+        self.assertEqual(ranges.to_raw([1.245, None]), [0x00FF, None])
+        self.assertEqual(ranges.to_raw([25.0, -1.0]), [AO_FULL_SCALE, 0])
+        self.assertEqual(list(ranges.channel_to_engineering(1, [0, AO_FULL_SCALE])), [0.0, 20.0])
+
+
+class AdamRangesTest(unittest.TestCase):
+
+    def test_cached_ranges(self):
+        with AdamSimulator.model("6024") as server:
+            server.ai[:] = [0, 0xFFFF, 0x8000, 0, 0, 0]
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+            volts = adam.a_input_scaled()
+            adam.a_input_scaled()
+            self.assertEqual([float(v) for v in volts[:2]], [-10.0, 10.0])
+            self.assertEqual(sum(1 for _, path in server.requests if path.endswith("/range")), 1)
+
+            self.assertTrue(adam.a_output_scaled([10.0, None]))
+            self.assertEqual(server.ao, [0x0800, 0])
+
+            ranges = AnalogOutputRange(quantity=1)
+            ranges[0] = "0180"
+            adam.a_output_range(ranges)
+            self.assertEqual(adam.ao_ranges()[0].minimum, 4.0)
+            adam.close()
@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.digital_io import DigitalOutput
+from adam_io.fleet import AdamFleet
+from adam_io.scheduler import RequestScheduler, StaleRequestError, request_priority
+from adam_io.simulator import AdamSimulator
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_priority_order(self):
+        scheduler = RequestScheduler(max_concurrency=1)
+        order = []
+        scheduler.acquire(RequestScheduler.CONTROL)
+
+        def request(priority, name):
+            with scheduler.slot(priority):
+                order.append(name)
+
+        threads = []
+        for priority, name in ((RequestScheduler.BACKGROUND, "poll"), (RequestScheduler.CONTROL, "read"),
+                               (RequestScheduler.ACTUATION, "write")):
+            threads.append(threading.Thread(target=request, args=(priority, name)))
+            threads[-1].start()
+            while scheduler.pending() < len(threads):
+                time.sleep(0.001)
+        scheduler.release(RequestScheduler.CONTROL)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["write", "read", "poll"])
+
+    def test_reserved_and_stale(self):
+        scheduler = RequestScheduler(max_concurrency=2, drop_after={RequestScheduler.BACKGROUND: 0.05})
+        scheduler.acquire(RequestScheduler.CONTROL)
+        # the second connection is kept for writes
+        start = time.monotonic()
+        with self.assertRaises(StaleRequestError):
+            scheduler.acquire(RequestScheduler.BACKGROUND)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(scheduler.dropped[RequestScheduler.BACKGROUND], 1)
+        with scheduler.slot(RequestScheduler.ACTUATION):
+            self.assertEqual(scheduler.active, 2)
+        scheduler.release(RequestScheduler.CONTROL)
+        self.assertEqual((scheduler.active, scheduler.pending()), (0, 0))
+
+    def test_writes_are_not_dropped(self):
+        scheduler = RequestScheduler(max_concurrency=1, drop_after={RequestScheduler.ACTUATION: 0.01})
+        scheduler.acquire(RequestScheduler.CONTROL)
+        errors = []
+
+        def write():
+            try:
+                with scheduler.slot(RequestScheduler.ACTUATION):
+                    pass
+            except Exception as err:
+                errors.append(err)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.05)
+        scheduler.release(RequestScheduler.CONTROL)
+        writer.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(scheduler.admitted[RequestScheduler.ACTUATION], 1)
+
+    def test_rate(self):
+        scheduler = RequestScheduler(max_concurrency=1, rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            with scheduler.slot(RequestScheduler.CONTROL):
+                pass
+        # the first read goes right away, then one every 20ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        start = time.monotonic()
+        with scheduler.slot(RequestScheduler.ACTUATION):
+            pass
+        self.assertLess(time.monotonic() - start, 0.01)
+
+    def test_write_preempts_polling(self):
+        with AdamSimulator(latency=0.02) as server:
+            scheduler = RequestScheduler(max_concurrency=2)
+            fleet = AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), server.port)],
+                              schedulers={f"127.0.0.1:{server.port}": scheduler})
+            pollers = [threading.Thread(target=lambda: [fleet.poll_once() for _ in range(10)]) for _ in range(4)]
+            for poller in pollers:
+                poller.start()
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, scheduler=scheduler)
+            time.sleep(0.05)
+            start = time.perf_counter()
+            do = DigitalOutput()
+            do[0] = 1
+            with request_priority(RequestScheduler.BACKGROUND):
+                # writes, and the read before them, are always ACTUATION
+                adam.output(do)
+            elapsed = time.perf_counter() - start
+            for poller in pollers:
+                poller.join()
+            fleet.stop()
+            adam.close()
+        # the read before the write and the write, each at most behind one request on the wire
+        self.assertLess(elapsed, 0.15)
+        self.assertGreater(scheduler.admitted[RequestScheduler.BACKGROUND], 0)
+        self.assertEqual(scheduler.admitted[RequestScheduler.ACTUATION], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
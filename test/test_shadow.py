@@ -0,0 +1,54 @@
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.analog_io import AnalogOutput
+from adam_io.digital_io import DigitalOutput
+
+from adam_io.simulator import AdamSimulator
+
+
+class ShadowRegisterTest(unittest.TestCase):
+
+    def test_writes_are_single_post(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, shadow=True)
+            do = DigitalOutput()
+            do[0] = 1
+            self.assertTrue(adam.output(do))
+            do[0] = 0
+            self.assertTrue(adam.output(do))
+            adam.close()
+            self.assertEqual([method for method, _ in server.requests], ["GET", "POST", "POST"])
+            self.assertEqual(server.do, [0] * 6)
+
+    def test_unchanged_write_is_skipped(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, shadow=True)
+            adam.output()
+            self.assertTrue(adam.off())
+            adam.close()
+            self.assertEqual([method for method, _ in server.requests], ["GET"])
+
+    def test_failed_write_invalidates(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, shadow=True)
+            adam.output()
+            self.assertTrue(adam.do_shadow.valid())
+            do = DigitalOutput(quantity=8)
+            do[7] = 1
+            with self.assertRaises(Exception):
+                adam.output(do)
+            self.assertFalse(adam.do_shadow.valid())
+            adam.close()
+
+    def test_analog_output_merge(self):
+        with AdamSimulator.model("6024") as server:
+            server.ao[1] = 0x0182
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, shadow=True)
+            ao = AnalogOutput()
+            ao[0] = '00FF'
+            self.assertTrue(adam.a_output(ao))
+            self.assertTrue(adam.a_output(ao))
+            adam.close()
+            self.assertEqual(server.ao, [0x00FF, 0x0182])
+            self.assertEqual([method for method, _ in server.requests], ["GET", "POST"])
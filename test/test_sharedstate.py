@@ -0,0 +1,88 @@
+import multiprocessing
+import threading
+import unittest
+
+from adam_io import sharedstate
+from adam_io.fleet import AdamFleet
+from adam_io.sharedstate import StatePublisher, StateReader
+from adam_io.simulator import AdamSimulator
+
+
+def _read_in_child(name, queue):
+    with StateReader(name) as reader:
+        state = reader.read("dev1")
+        queue.put((state.di.to_mask(), list(state.ai.values()), state.ok))
+
+
+@unittest.skipUnless(sharedstate.shared_memory, "multiprocessing.shared_memory needs Python 3.8 or newer")
+class SharedStateTest(unittest.TestCase):
+
+    def test_publish_read(self):
+        with StatePublisher(None, [("dev1", "6024"), ("dev2", "6050")]) as publisher:
+            reader = StateReader(publisher.name)
+            self.assertEqual(reader.devices(), ["dev1", "dev2"])
+            state = reader.read("dev1")
+            self.assertIsNone(state.timestamp)
+            self.assertFalse(state.ok)
+
+            publisher.publish("dev1", di=0b10, do=0b01, ai=[1, 2, 3, 4, 5, 6], ao=[0x0FFF, 0], timestamp=100.0)
+            state = reader.read("dev1")
+            self.assertTrue(state.ok)
+            self.assertEqual(state.timestamp, 100.0)
+            self.assertEqual(state.di.to_mask(), 0b10)
+            self.assertEqual(state.do.to_mask(), 0b01)
+            self.assertEqual(list(state.ai.values()), [1, 2, 3, 4, 5, 6])
+            self.assertEqual(state.ao[0], 0x0FFF)
+            self.assertEqual(state.sequence, 2)
+            self.assertIsNone(reader.read("dev2").ai)
+
+            publisher.publish_error("dev1", timestamp=101.0)
+            state = reader.read("dev1")
+            self.assertFalse(state.ok)
+            self.assertEqual((state.timestamp, state.polled), (100.0, 101.0))
+            self.assertEqual(state.di.to_mask(), 0b10)
+
+            # another process sees the same state
+            queue = multiprocessing.get_context("spawn").Queue()
+            child = multiprocessing.get_context("spawn").Process(target=_read_in_child, args=(publisher.name, queue))
+            child.start()
+            self.assertEqual(queue.get(timeout=30), (0b10, [1, 2, 3, 4, 5, 6], False))
+            child.join()
+            reader.close()
+
+    def test_consistent_reads(self):
+        with StatePublisher(None, [("dev1", "6050")]) as publisher, StateReader(publisher.name) as reader:
+            stop = threading.Event()
+
+            def write():
+                value = 0
+                while not stop.is_set():
+                    value = (value + 1) & 0x3F
+                    publisher.publish("dev1", di=value, do=value)
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            try:
+                for _ in range(5000):
+                    state = reader.read("dev1")
+                    if state.ok:
+                        self.assertEqual(state.di.to_mask(), state.do.to_mask())
+            finally:
+                stop.set()
+                writer.join()
+
+    def test_fleet(self):
+        with AdamSimulator() as server:
+            server.di[3] = 1
+            fleet = AdamFleet([("127.0.0.1", "6050", ("root", "00000000"), server.port)])
+            with StatePublisher.for_fleet(fleet) as publisher, StateReader(publisher.name) as reader:
+                fleet.poll_once()
+                requests = len(server.requests)
+                for _ in range(3):
+                    self.assertEqual(reader.read(f"127.0.0.1:{server.port}").di.to_mask(), 1 << 3)
+                self.assertEqual(len(server.requests), requests)
+            fleet.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.digital_io import DigitalOutput
+from adam_io.scheduler import RequestScheduler, request_priority
+from adam_io.simulator import AdamSimulator
+from adam_io.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_shared_call(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait()
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while flight.calls + flight.shared < 8:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual((len(calls), flight.calls, flight.shared), (1, 1, 7))
+        # nothing is remembered without a max_age
+        flight.do("key", slow)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_and_max_age(self):
+        flight = SingleFlight(max_age=60)
+
+        def fail():
+            raise OSError("unreachable")
+
+        with self.assertRaises(OSError):
+            flight.do("key", fail)
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+        self.assertEqual(flight.do("key", lambda: 2), 1)
+        flight.forget("key")
+        self.assertEqual(flight.do("key", lambda: 3), 3)
+
+    def test_adam(self):
+        with AdamSimulator.model("6024", latency=0.05) as server:
+            server.ai[0] = 0x1234
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, pool_size=8, single_flight=True)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(adam.a_input())) for _ in range(8)]
+            server.requests.clear()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([ai[0] for ai in results], [0x1234] * 8)
+            # every thread got its own parsed copy
+            self.assertEqual(len({id(ai) for ai in results}), 8)
+            self.assertLess(len(server.requests), 8)
+            adam.close()
+
+    def test_write_forgets(self):
+        with AdamSimulator() as server:
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, single_flight=True,
+                             single_flight_max_age=60)
+            self.assertEqual(adam.output().to_mask(), 0)
+            self.assertEqual(adam.output().to_mask(), 0)
+            self.assertEqual([method for method, _ in server.requests], ["GET"])
+            adam.on()
+            self.assertEqual(adam.output().to_mask(), 0b111111)
+            adam.close()
+
+    def test_scheduler(self):
+        with AdamSimulator(latency=0.05) as server:
+            scheduler = RequestScheduler(max_concurrency=2, drop_after={RequestScheduler.BACKGROUND: 0.1})
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port, scheduler=scheduler,
+                             single_flight=True)
+            stale = []
+
+            def poll():
+                with request_priority(RequestScheduler.BACKGROUND):
+                    try:
+                        adam.output()
+                    except Exception as err:
+                        stale.append(err)
+
+            pollers = [threading.Thread(target=poll) for _ in range(2)]
+            # one background read on the wire and another one waiting in the queue
+            scheduler.acquire(RequestScheduler.CONTROL)
+            for poller in pollers:
+                poller.start()
+            while scheduler.pending() < 1:
+                time.sleep(0.001)
+            do = DigitalOutput()
+            do[2] = 1
+            # the read before the write does not join the queued background read
+            self.assertTrue(adam.output(do))
+            scheduler.release(RequestScheduler.CONTROL)
+            for poller in pollers:
+                poller.join()
+            self.assertEqual(server.do[2], 1)
+            self.assertEqual(scheduler.admitted[RequestScheduler.ACTUATION], 2)
+            adam.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import time
+import unittest
+
+from adam_io.adam import Adam6050D, Adam6024D
+from adam_io.scheduler import RequestScheduler, request_priority
+from adam_io.simulator import AdamSimulator, ModbusSimulator
+from adam_io.snapshot import StateSnapshot
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_6024(self):
+        with AdamSimulator.model("6024", latency=0.05) as server:
+            server.di[1] = 1
+            server.do[0] = 1
+            server.ai[:] = [10, 20, 30, 40, 50, 60]
+            server.ao[:] = [0x0FFF, 0]
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, pool_size=4)
+            adam.snapshot()
+            start = time.perf_counter()
+            snapshot = adam.snapshot()
+            elapsed = time.perf_counter() - start
+            adam.close()
+        self.assertEqual(snapshot.di, (0, 1))
+        self.assertEqual(snapshot.do, (1, 0))
+        self.assertEqual(snapshot.ai, (10, 20, 30, 40, 50, 60))
+        self.assertEqual(snapshot.ao, (0x0FFF, 0))
+        # the four reads overlap, one after the other they would take 0.2s
+        self.assertLess(elapsed, 0.15)
+        self.assertLess(snapshot.skew, 0.05)
+        self.assertAlmostEqual(snapshot.timestamp, time.time(), delta=5)
+        with self.assertRaises(AttributeError):
+            snapshot.di = (1, 1)
+
+    def test_default_pool(self):
+        with AdamSimulator.model("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+            self.assertEqual(adam.requestor.pool.max_size, 2)
+            snapshot = adam.snapshot()
+            adam.close()
+            # the four reads share the two connections of the pool
+            self.assertLessEqual(server.connections, 2)
+        self.assertEqual(snapshot.ai, (0,) * 6)
+
+    def test_priority(self):
+        with AdamSimulator.model("6024") as server:
+            scheduler = RequestScheduler(max_concurrency=4)
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, scheduler=scheduler)
+            with request_priority(RequestScheduler.BACKGROUND):
+                adam.snapshot()
+            adam.close()
+        # the reads made by the executor threads keep the priority of the caller
+        self.assertEqual(scheduler.admitted[RequestScheduler.BACKGROUND], 4)
+        self.assertEqual(scheduler.admitted[RequestScheduler.CONTROL], 0)
+
+    def test_6050(self):
+        with AdamSimulator() as server:
+            server.di[11] = 1
+            adam = Adam6050D('127.0.0.1', 'root', '00000000', port=server.port)
+            snapshot = adam.snapshot()
+            self.assertIsInstance(snapshot, StateSnapshot)
+            self.assertEqual(snapshot.di, (0,) * 11 + (1,))
+            self.assertEqual(snapshot.do, (0,) * 6)
+            self.assertIsNone(snapshot.ai)
+            self.assertEqual(snapshot, adam.snapshot().__class__(snapshot.di, snapshot.do, None, None,
+                                                                  snapshot.timestamp, snapshot.skew, snapshot.latency))
+            server.stop()
+            with self.assertRaises(Exception):
+                adam.snapshot()
+            adam.close()
+
+    def test_modbus(self):
+        with ModbusSimulator("6024") as server:
+            server.ai[0] = 0x7FFF
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port)
+            snapshot = adam.snapshot()
+            self.assertEqual(snapshot.ai[0], 0x7FFF)
+            self.assertEqual(len(snapshot.ao), 2)
+            adam.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
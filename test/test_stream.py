@@ -0,0 +1,49 @@
+import time
+import unittest
+
+from adam_io.adam import Adam6024D
+from adam_io.simulator import AdamSimulator
+from adam_io.stream import AnalogStreamer, RingBuffer
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_latest_window_wraps(self):
+        buffer = RingBuffer(4, 2)
+        for i in range(6):
+            buffer.append(float(i), [i, 100 + i])
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(list(buffer.timestamps()), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(buffer.channel(1, 3)), [103, 104, 105])
+        timestamps, channels = buffer.latest(10)
+        self.assertEqual(list(channels[0]), [2, 3, 4, 5])
+
+    def test_views_are_not_copies(self):
+        buffer = RingBuffer(4, 1)
+        buffer.append(0.0, [1])
+        view = buffer.channel(0)
+        buffer.append(1.0, [2])
+        buffer.append(2.0, [3])
+        buffer.append(3.0, [4])
+        buffer.append(4.0, [5])
+        # the slot of the oldest sample was overwritten under the view
+        self.assertEqual(list(view), [5])
+
+
+class AnalogStreamerTest(unittest.TestCase):
+
+    def test_stream(self):
+        with AdamSimulator.model("6024") as server:
+            server.ai[:] = [1, 2, 3, 4, 5, 6]
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+            streamer = AnalogStreamer(adam, rate=200, capacity=16)
+            before = time.time()
+            with streamer:
+                time.sleep(0.2)
+            adam.close()
+        self.assertGreater(streamer.buffer.count, 5)
+        self.assertEqual(set(streamer.buffer.channel(5)), {6})
+        timestamps = list(streamer.buffer.timestamps())
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertGreater(timestamps[0], before)
+        self.assertEqual(streamer.errors, 0)
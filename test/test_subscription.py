@@ -0,0 +1,49 @@
+import threading
+import unittest
+
+from adam_io.adam import Adam6050D
+from adam_io.simulator import AdamSimulator
+from adam_io.subscription import InputWatcher, RISING, FALLING
+
+
+class InputWatcherTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = AdamSimulator().start()
+        self.adam = Adam6050D('127.0.0.1', 'root', '00000000', port=self.server.port)
+
+    def tearDown(self) -> None:
+        self.adam.close()
+        self.server.stop()
+
+    def test_debounce(self):
+        watcher = InputWatcher(self.adam)
+        watcher.subscribe([2], lambda event: None, debounce=0.1)
+        watcher.poll_once(now=0.0)
+        self.server.di[2] = 1
+        self.assertEqual(watcher.poll_once(now=1.0), 0)
+        # bounce back before the window passed, nothing is reported
+        self.server.di[2] = 0
+        self.assertEqual(watcher.poll_once(now=1.05), 0)
+        self.server.di[2] = 1
+        self.assertEqual(watcher.poll_once(now=1.1), 0)
+        self.assertEqual(watcher.poll_once(now=1.25), 1 << 2)
+        self.assertEqual(watcher.state, 1 << 2)
+
+    def test_callbacks_by_edge(self):
+        rising, falling = [], []
+        done = threading.Event()
+        watcher = InputWatcher(self.adam, period=60)
+        watcher.subscribe([0, 1], rising.append, edge=RISING)
+        watcher.subscribe([1], lambda event: (falling.append(event), done.set()), edge=FALLING)
+        watcher.start()
+        watcher.poll_once()
+        self.server.di[0] = 1
+        self.server.di[1] = 1
+        watcher.poll_once()
+        self.server.di[1] = 0
+        watcher.poll_once()
+        self.assertTrue(done.wait(1))
+        watcher.stop()
+        self.assertEqual(sorted(event.channel for event in rising), [0, 1])
+        self.assertEqual([(event.channel, event.edge) for event in falling], [(1, FALLING)])
@@ -0,0 +1,72 @@
+import time
+import unittest
+
+from adam_io.adam import Adam6024D
+from adam_io.analog_io import AnalogOutput
+from adam_io.simulator import AdamSimulator, ModbusSimulator
+from adam_io.waveform import WaveformPlayer, ramp, sine, steps
+
+
+class WaveformTest(unittest.TestCase):
+
+    def test_tables(self):
+        self.assertEqual(ramp(0, 100, 5), [0, 25, 50, 75, 100])
+        self.assertEqual(steps([1, 2], 2), [1, 1, 2, 2])
+        wave = sine(100, 200, 4, cycles=2)
+        self.assertEqual(wave, [200, 300, 200, 100] * 2)
+
+    def test_play(self):
+        with AdamSimulator.model("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port)
+            player = WaveformPlayer(adam, rate=200, channels=[0, 1])
+            with self.assertRaises(Exception):
+                player.compile([0x1000])
+            server.requests.clear()
+            start = time.monotonic()
+            report = player.play([(value, 0x0FFF - value) for value in ramp(0, 0x0FFF, 20)])
+            elapsed = time.monotonic() - start
+            self.assertEqual(server.ao, [0x0FFF, 0])
+            # one POST per tick, no reads
+            self.assertEqual({method for method, _ in server.requests}, {"POST"})
+            self.assertEqual(report.sent + report.missed, 20)
+            self.assertEqual(len(server.requests), report.sent)
+            self.assertEqual(report.errors, 0)
+            self.assertGreaterEqual(elapsed, 19 / 200)
+            self.assertGreaterEqual(report.jitter_max, 0)
+            adam.close()
+
+    def test_background_loop(self):
+        with ModbusSimulator("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', modbus=True, modbus_port=server.port)
+            player = WaveformPlayer(adam, rate=100, channels=[1])
+            player.start(steps([0x0100, 0x0200], 2), loop=True)
+            time.sleep(0.1)
+            report = player.stop()
+            self.assertGreater(report.sent, 4)
+            self.assertIn(server.ao[1], (0x0100, 0x0200))
+            self.assertEqual(server.ao[0], 0)
+            self.assertIsNone(player._thread)
+            adam.close()
+
+    def test_shadow(self):
+        with AdamSimulator.model("6024") as server:
+            adam = Adam6024D('127.0.0.1', 'root', '00000000', port=server.port, shadow=True)
+            adam.a_output()
+            self.assertTrue(adam.ao_shadow.valid())
+            player = WaveformPlayer(adam, rate=200, channels=[0])
+            player.start(ramp(0, 0x0800, 10))
+            # a write while the waveform plays merges with the outputs of the latest tick, not stale values
+            time.sleep(0.02)
+            output = AnalogOutput(quantity=2)
+            output[1] = 0x0123
+            adam.a_output(output)
+            player.wait()
+            self.assertFalse(adam.ao_shadow.valid())
+            output[1] = 0x0456
+            adam.a_output(output)
+            self.assertEqual(server.ao, [0x0800, 0x0456])
+            adam.close()
+
+
+if __name__ == '__main__':
+    unittest.main()